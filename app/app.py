@@ -1,26 +1,24 @@
 #!/usr/bin/python3
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_bcrypt import Bcrypt
-from flasgger import Swagger
-from os import getenv
+from os import getenv, path
 from datetime import timezone, timedelta
+from app.utils.replicas import RoutingSession, replica_binds, init_replicas
 
 
 local_timezone = timezone(timedelta(hours=2))
 
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
 limiter = Limiter(get_remote_address, default_limits=["200 per day", "50 per hour"])
 bcrypt = Bcrypt()
-swagger = Swagger()
 
-def create_app():
+def create_app(config=None):
+    """ Create the app, `config` overrides the settings before the extensions are initialized """
     app = Flask(__name__)
 
 
@@ -34,15 +32,119 @@ def create_app():
 
     # app.config["SQLALCHEMY_DATABASE_URI"] = f"mysql+mysqldb://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
     app.config["SQLALCHEMY_DATABASE_URI"] = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+    # A full URI overrides the DB_* variables (e.g. a throwaway database for benchmarks)
+    if getenv("DATABASE_URL"):
+        app.config["SQLALCHEMY_DATABASE_URI"] = getenv("DATABASE_URL")
     app.config['SECRET_KEY'] = f"{SECRET_KEY}"
+    # Uploaded photos (stored content-addressed) and their thumbnails
+    app.config["PHOTO_FOLDER"] = getenv("PHOTO_FOLDER", path.join(app.instance_path, "photos"))
+    app.config["MAX_PHOTO_SIZE"] = int(getenv("MAX_PHOTO_SIZE", 5 * 1024 * 1024))
+    app.config["THUMBNAIL_SIZE"] = int(getenv("THUMBNAIL_SIZE", 256))
+    app.config["THUMBNAIL_WORKERS"] = int(getenv("THUMBNAIL_WORKERS", 2))
+
+    # Seconds before a teacher-day of the session overlap index is reloaded
+    app.config["SESSION_INDEX_TTL"] = int(getenv("SESSION_INDEX_TTL", 60))
+
+    # Seconds between two runs of the in-process package expiry sweeper, 0 disables it
+    # (e.g. when `flask packages expire` runs from cron instead)
+    app.config["PACKAGE_EXPIRY_INTERVAL"] = int(getenv("PACKAGE_EXPIRY_INTERVAL", 300))
+
+    # Seconds between two in-process refreshes of the revenue aggregates, 0 disables it
+    app.config["REVENUE_REFRESH_INTERVAL"] = int(getenv("REVENUE_REFRESH_INTERVAL", 300))
+
+    # Connection pool (ignored for SQLite), DB_STATEMENT_TIMEOUT is in milliseconds (0 disables it)
+    # and DB_PGBOUNCER=true sets it per transaction for PgBouncer in transaction pooling mode
+    app.config["DB_POOL_SIZE"] = int(getenv("DB_POOL_SIZE", 5))
+    app.config["DB_MAX_OVERFLOW"] = int(getenv("DB_MAX_OVERFLOW", 10))
+    app.config["DB_POOL_TIMEOUT"] = int(getenv("DB_POOL_TIMEOUT", 30))
+    app.config["DB_POOL_RECYCLE"] = int(getenv("DB_POOL_RECYCLE", 1800))
+    app.config["DB_POOL_PRE_PING"] = getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    app.config["DB_STATEMENT_TIMEOUT"] = int(getenv("DB_STATEMENT_TIMEOUT", 0))
+    app.config["DB_PGBOUNCER"] = getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+    # Read replicas (comma separated URIs) for the GET requests, and how long a user
+    # reads from the primary after a write
+    app.config["SQLALCHEMY_BINDS"] = replica_binds(getenv("DB_REPLICA_URLS"))
+    app.config["REPLICA_PIN_SECONDS"] = int(getenv("REPLICA_PIN_SECONDS", 10))
+
+    # Rate limiting (turned off for load tests)
+    app.config["RATELIMIT_ENABLED"] = getenv("RATELIMIT_ENABLED", "true").lower() == "true"
+
+    # Bearer token required by GET /metrics, unset leaves it open (e.g. behind the private network)
+    app.config["METRICS_TOKEN"] = getenv("METRICS_TOKEN")
+
+    # In debug mode, log the statements a single request repeats this many times (N+1 queries)
+    app.config["QUERY_REPEAT_THRESHOLD"] = int(getenv("QUERY_REPEAT_THRESHOLD", 5))
+
+    # "serve" for the WSGI workers: no migrations, Swagger UI nor CLI commands, they
+    # only matter to `flask` commands and development (faster worker startup)
+    app.config["APP_MODE"] = getenv("APP_MODE", "default")
+
+    # Run the listing endpoints (groups, their students, pending requests) on an asyncio
+    # driver (asyncpg), their independent queries concurrently. ASYNC_DATABASE_URI overrides
+    # the URI derived from SQLALCHEMY_DATABASE_URI
+    app.config["ASYNC_READS"] = getenv("ASYNC_READS", "false").lower() == "true"
+    app.config["ASYNC_DATABASE_URI"] = getenv("ASYNC_DATABASE_URI")
+    # Pool of the async engine, on top of DB_POOL_SIZE + DB_MAX_OVERFLOW in the
+    # connections budget of a worker (DB_MAX_CONNECTIONS, see gunicorn.conf.py)
+    app.config["DB_ASYNC_POOL_SIZE"] = int(getenv("DB_ASYNC_POOL_SIZE", 4))
+    app.config["DB_ASYNC_MAX_OVERFLOW"] = int(getenv("DB_ASYNC_MAX_OVERFLOW", 0))
+
+    # Seconds the group listing pages and facet counts are cached in memory, 0 disables it.
+    # A change to the groups or their days (in the change feed) drops them sooner
+    app.config["GROUPS_CACHE_TTL"] = int(getenv("GROUPS_CACHE_TTL", 30))
+
+    # Responses compressed (brotli or gzip) from this size in bytes, 0 disables it. Brotli 4
+    # and gzip 5 keep most of the size gain of the higher levels for a fraction of the CPU
+    app.config["COMPRESS_MIN_SIZE"] = int(getenv("COMPRESS_MIN_SIZE", 1024))
+    app.config["COMPRESS_LEVEL_BROTLI"] = int(getenv("COMPRESS_LEVEL_BROTLI", 4))
+    app.config["COMPRESS_LEVEL_GZIP"] = int(getenv("COMPRESS_LEVEL_GZIP", 5))
+
+    # Idempotency-Key: seconds a stored response is replayed, seconds before the lock of a
+    # request that died is released (renewed while it runs), seconds a retry waits for the first request
+    # (0 answers 409 straight away) and seconds between two in-process purges (0 disables it)
+    app.config["IDEMPOTENCY_TTL"] = int(getenv("IDEMPOTENCY_TTL", 24 * 3600))
+    app.config["IDEMPOTENCY_LOCK_TIMEOUT"] = int(getenv("IDEMPOTENCY_LOCK_TIMEOUT", 60))
+    app.config["IDEMPOTENCY_WAIT"] = float(getenv("IDEMPOTENCY_WAIT", 2))
+    app.config["IDEMPOTENCY_PURGE_INTERVAL"] = int(getenv("IDEMPOTENCY_PURGE_INTERVAL", 3600))
+
+    # Days the change feed (GET /changes) is kept, older cursors get a 410 and resync,
+    # and seconds between two in-process purges of it (0 disables it)
+    app.config["CHANGE_LOG_RETENTION_DAYS"] = int(getenv("CHANGE_LOG_RETENTION_DAYS", 7))
+    app.config["CHANGE_LOG_PURGE_INTERVAL"] = int(getenv("CHANGE_LOG_PURGE_INTERVAL", 3600))
+
+    # JSON backend of the API responses: "default" (Flask) or "orjson"
+    app.config["JSON_BACKEND"] = getenv("JSON_BACKEND", "default")
+
+    if app.config["JSON_BACKEND"] == "orjson":
+        from app.utils.serialization import OrjsonProvider
+        app.json = OrjsonProvider(app)
+
+    if config:
+        app.config.update(config)
+
+    from app.utils.db_pool import engine_options, init_pool
+    from app.utils.query_stats import init_query_stats
+    from app.utils.compression import init_compression
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
 
     # Initialize the app
     db.init_app(app)
-    migrate.init_app(app, db)
+    init_pool(app, db)
+    init_replicas(app, db)
+    init_query_stats(app)
+    init_compression(app)
     login_manager.init_app(app)
     limiter.init_app(app)
     bcrypt.init_app(app)
-    swagger.init_app(app)
+
+    serving = app.config["APP_MODE"] == "serve"
+    if not serving:
+        # Alembic and Flasgger are slow to import
+        from flask_migrate import Migrate
+        from flasgger import Swagger
+        Migrate(app, db)
+        Swagger(app)
 
 
     from app.models.user import User
@@ -50,22 +152,100 @@ def create_app():
     from app.models.language import Language
     from app.models.reset_token import ResetToken
     from app.models.group import Group
+    from app.models.day import Day
+    from app.models.group_day import GroupDay
+    from app.models.group_request import GroupRequest
     from app.models.user_group import UserGroup
     from app.models.session import Session
     from app.models.user_session import UserSession
     from app.models.package import Package
     from app.models.user_package import UserPackage
+    from app.models.account_deletion import AccountDeletion
+    from app.models.teacher_minutes import TeacherDailyMinutes, TeacherMonthlyMinutes
+    from app.models.package_revenue import PackageRevenue, ReportWatermark
+    from app.models.idempotency_key import IdempotencyKey
+    from app.models.change_log import ChangeLog
+    from app.utils import payroll  # registers the listeners keeping the teacher minutes rollups up to date
+    from app.utils import changes  # registers the listener writing the change feed outbox
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(user_id)
+        user = User.query.get(user_id)
+        # deleted accounts stay inactive until the purger removes them
+        if user and not user.is_active:
+            return None
+        return user
 
     # import Blueprints
     from app.views.auth.auth import auth
     from app.views.auth.profile import profile
+    from app.views.group.groups import groups
+    from app.views.session.sessions import sessions
+    from app.views.report.reports import reports
+    from app.views.change.changes import changes
+    from app.views.metrics.metrics import metrics
 
     # Register blueprints
     app.register_blueprint(auth, url_prefix="/auth")
     app.register_blueprint(profile, url_prefix="/profile")
+    app.register_blueprint(groups, url_prefix="/groups")
+    app.register_blueprint(sessions, url_prefix="/sessions")
+    app.register_blueprint(reports, url_prefix="/reports")
+    app.register_blueprint(changes, url_prefix="/changes")
+    app.register_blueprint(metrics, url_prefix="/metrics")
+
+    # CLI commands, not imported in serve mode
+    if not serving:
+        from app.commands.accounts import accounts_cli
+        from app.commands.packages import packages_cli
+        from app.commands.reports import reports_cli
+        from app.commands.seed import seed_cli
+        from app.commands.idempotency import idempotency_cli
+        from app.commands.changes import changes_cli
+        from app.commands.ids import ids_cli
+        from app.commands.groups import groups_cli
+
+        app.cli.add_command(accounts_cli)
+        app.cli.add_command(packages_cli)
+        app.cli.add_command(reports_cli)
+        app.cli.add_command(seed_cli)
+        app.cli.add_command(idempotency_cli)
+        app.cli.add_command(changes_cli)
+        app.cli.add_command(ids_cli)
+        app.cli.add_command(groups_cli)
+
+    # Periodic tasks, started with the first request of each (forked) worker
+    if app.config["PACKAGE_EXPIRY_INTERVAL"] > 0:
+        from app.tasks.background import start_periodic
+        from app.tasks.package_expiry import expire_packages
+
+        @app.before_request
+        def start_package_expiry():
+            start_periodic(app, app.config["PACKAGE_EXPIRY_INTERVAL"], expire_packages)
+
+    if app.config["REVENUE_REFRESH_INTERVAL"] > 0:
+        from app.tasks.background import start_periodic
+        from app.utils.revenue import refresh_revenue
+
+        @app.before_request
+        def start_revenue_refresh():
+            start_periodic(app, app.config["REVENUE_REFRESH_INTERVAL"], refresh_revenue)
+
+    if app.config["IDEMPOTENCY_PURGE_INTERVAL"] > 0:
+        from app.tasks.background import start_periodic
+        from app.tasks.idempotency import purge_idempotency_keys
+
+        @app.before_request
+        def start_idempotency_purge():
+            start_periodic(app, app.config["IDEMPOTENCY_PURGE_INTERVAL"], purge_idempotency_keys)
+
+    if app.config["CHANGE_LOG_PURGE_INTERVAL"] > 0:
+        from app.tasks.background import start_periodic
+        from app.tasks.change_log import purge_change_log
+
+        @app.before_request
+        def start_change_log_purge():
+            start_periodic(app, app.config["CHANGE_LOG_PURGE_INTERVAL"], purge_change_log,
+                           app.config["CHANGE_LOG_RETENTION_DAYS"])
 
     return app
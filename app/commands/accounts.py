@@ -0,0 +1,27 @@
+#!/usr/bin/python3
+import click
+from flask.cli import AppGroup
+from app.models.account_deletion import AccountDeletion
+from app.tasks.account_deletion import purge_pending_accounts, BATCH_SIZE
+
+
+accounts_cli = AppGroup("accounts", help="Manage the deleted accounts queue.")
+
+
+@accounts_cli.command("purge")
+@click.option("--batch-size", default=BATCH_SIZE, show_default=True, help="Rows removed per statement.")
+def purge(batch_size):
+    """ Drain the deleted accounts queue """
+    purged = purge_pending_accounts(batch_size)
+    click.echo(f"{purged} account(s) purged.")
+
+
+@accounts_cli.command("status")
+def status():
+    """ Show the deletions that are not done yet """
+    deletions = AccountDeletion.query.filter(AccountDeletion.status != "done").order_by(AccountDeletion.id).all()
+    if not deletions:
+        click.echo("The deleted accounts queue is empty.")
+    for deletion in deletions:
+        click.echo(f"{deletion.user_id}  {deletion.status:<8} step={deletion.current_step or '-'}  "
+                   f"rows_deleted={deletion.rows_deleted}  requested_at={deletion.requested_at}")
@@ -0,0 +1,20 @@
+#!/usr/bin/python3
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app.tasks.change_log import purge_change_log, BATCH_SIZE
+
+
+changes_cli = AppGroup("changes", help="Manage the change feed (GET /changes).")
+
+
+@changes_cli.command("purge")
+@click.option("--retention-days", type=int, default=None,
+              help="Changes kept, in days (CHANGE_LOG_RETENTION_DAYS by default).")
+@click.option("--batch-size", default=BATCH_SIZE, show_default=True, help="Rows deleted per statement.")
+def purge(retention_days, batch_size):
+    """ Delete the changes older than the retention """
+    if retention_days is None:
+        retention_days = current_app.config["CHANGE_LOG_RETENTION_DAYS"]
+    purged = purge_change_log(retention_days, batch_size)
+    click.echo(f"{purged} change(s) purged.")
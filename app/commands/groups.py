@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+import click
+from flask.cli import AppGroup
+from time import perf_counter
+from app.app import db
+from app.utils.rollover import Rollover, RolloverConflict, name_rule
+
+
+groups_cli = AppGroup("groups", help="Manage the groups.")
+
+
+@groups_cli.command("rollover")
+@click.option("--source-start", type=click.DateTime(["%Y-%m-%d"]), required=True, help="First start date of the source term.")
+@click.option("--source-end", type=click.DateTime(["%Y-%m-%d"]), required=True, help="Last start date of the source term.")
+@click.option("--target-start", type=click.DateTime(["%Y-%m-%d"]), required=True, help="Start of the new term.")
+@click.option("--name-pattern", default="{name} (copy)", show_default=True, help="New name, {name} is the old one.")
+@click.option("--rename", nargs=2, default=None, metavar="OLD NEW", help="Replace OLD with NEW in the names instead.")
+@click.option("--status", "statuses", multiple=True, type=click.Choice(["coming", "running", "finished"]),
+              help="Only the groups with this status (repeatable).")
+@click.option("--search", help="Only the groups whose name contains this.")
+@click.option("--copy-teachers", is_flag=True, help="Keep the teachers of the groups.")
+@click.option("--dry-run", is_flag=True, help="Show what would be cloned and the conflicts, write nothing.")
+def rollover_command(source_start, source_end, target_start, name_pattern, rename, statuses, search,
+                     copy_teachers, dry_run):
+    """ Clone the groups of a term and their days into a new term, in one transaction """
+    start = perf_counter()
+    try:
+        rule = name_rule(replace=rename) if rename else name_rule(pattern=name_pattern)
+        rollover = Rollover(source_start.date(), source_end.date(), target_start.date(), rule,
+                            statuses=list(statuses), search=search, copy_teachers=copy_teachers)
+        summary = rollover.preview() if dry_run else rollover.run()
+    except RolloverConflict as error:
+        db.session.rollback()
+        for conflict in error.conflicts:
+            click.echo(f"{conflict['source_group']} -> {conflict['group']}: {conflict['reason']}")
+        raise click.ClickException(str(error))
+    except ValueError as error:
+        raise click.ClickException(str(error))
+
+    for clone in summary["preview"]:
+        click.echo(f"{clone['source_group']} -> {clone['group']}  {clone['start_date']} - {clone['end_date']}  "
+                   f"{clone['status']}")
+    if len(summary["preview"]) < summary["groups"]:
+        click.echo(f"... and {summary['groups'] - len(summary['preview'])} more")
+    for conflict in summary["conflicts"]:
+        click.echo(f"{conflict['source_group']} -> {conflict['group']}: {conflict['reason']}")
+
+    if dry_run:
+        click.echo(f"{summary['groups']} group(s) and {summary['group_days']} day(s) would be cloned "
+                   f"({summary['shift_days']:+d} days), {len(summary['conflicts'])} conflict(s).")
+        return
+    db.session.commit()
+    click.echo(f"{summary['groups']} group(s) and {summary['group_days']} day(s) cloned "
+               f"({summary['shift_days']:+d} days) in {perf_counter() - start:.1f}s.")
@@ -0,0 +1,15 @@
+#!/usr/bin/python3
+import click
+from flask.cli import AppGroup
+from app.tasks.idempotency import purge_idempotency_keys, BATCH_SIZE
+
+
+idempotency_cli = AppGroup("idempotency", help="Manage the stored Idempotency-Key responses.")
+
+
+@idempotency_cli.command("purge")
+@click.option("--batch-size", default=BATCH_SIZE, show_default=True, help="Rows deleted per statement.")
+def purge(batch_size):
+    """ Delete the expired idempotency keys """
+    purged = purge_idempotency_keys(batch_size)
+    click.echo(f"{purged} idempotency key(s) purged.")
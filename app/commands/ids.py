@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+import click
+from flask.cli import AppGroup
+from sqlalchemy import inspect, text
+from app.app import db
+from app.utils.ids import UuidString
+
+
+ids_cli = AppGroup("ids", help="Primary keys of the users.")
+
+
+def _user_id_columns(inspector):
+    """ (table, column) of users.id and of every column holding a user id, existing and not yet native UUIDs """
+    columns = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        current_types = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if isinstance(column.type, UuidString) and column.name in current_types \
+                    and current_types[column.name].__visit_name__.lower() != "uuid":
+                columns.append((table.name, column.name))
+    # the users first, the referencing columns follow
+    return sorted(columns, key=lambda column: column != ("users", "id"))
+
+
+def _migration(connection):
+    """ The statements moving the user ids from VARCHAR to the native uuid type """
+    inspector = inspect(connection)
+    quote = connection.dialect.identifier_preparer.quote
+    columns = _user_id_columns(inspector)
+    if not columns:
+        return []
+
+    # the foreign keys to users.id are dropped while both sides change type, then recreated as they were
+    foreign_keys = [
+        (table, foreign_key) for table in inspector.get_table_names()
+        for foreign_key in inspector.get_foreign_keys(table) if foreign_key["referred_table"] == "users"
+    ]
+    statements = [f"ALTER TABLE {quote(table)} DROP CONSTRAINT {quote(foreign_key['name'])}"
+                  for table, foreign_key in foreign_keys]
+    statements += [f"ALTER TABLE {quote(table)} ALTER COLUMN {quote(column)} TYPE uuid USING {quote(column)}::uuid"
+                   for table, column in columns]
+    for table, foreign_key in foreign_keys:
+        ondelete = foreign_key.get("options", {}).get("ondelete")
+        statements.append(
+            f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(foreign_key['name'])} "
+            f"FOREIGN KEY ({', '.join(map(quote, foreign_key['constrained_columns']))}) "
+            f"REFERENCES users ({', '.join(map(quote, foreign_key['referred_columns']))})"
+            + (f" ON DELETE {ondelete}" if ondelete else "")
+        )
+    statements += [f"ANALYZE {quote(table)}" for table in dict.fromkeys(table for table, _ in columns)]
+    return statements
+
+
+@ids_cli.command("migrate-to-uuid")
+@click.option("--dry-run", is_flag=True, help="Print the statements without running them.")
+def migrate_to_uuid(dry_run):
+    """
+    Convert users.id and the columns referencing it from VARCHAR(50) to the
+    native uuid type (Postgres), in one transaction. The tables are rewritten
+    under an exclusive lock: run it in a maintenance window. The existing ids
+    keep their value, the new ones are time-ordered.
+    """
+    if db.engine.dialect.name != "postgresql":
+        raise click.ClickException("Only Postgres has a native uuid type, nothing to migrate.")
+
+    with db.engine.begin() as connection:
+        statements = _migration(connection)
+        if not statements:
+            click.echo("The user ids are already native UUIDs.")
+            return
+        for statement in statements:
+            click.echo(f"{statement};")
+            if not dry_run:
+                connection.execute(text(statement))
+    if not dry_run:
+        click.echo(f"{len(statements)} statement(s) run.")
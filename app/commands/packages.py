@@ -0,0 +1,23 @@
+#!/usr/bin/python3
+import click
+from flask.cli import AppGroup
+from app.tasks.package_expiry import expire_packages, BATCH_SIZE
+from app.utils.metering import backfill_remaining_sessions
+
+
+packages_cli = AppGroup("packages", help="Manage the user packages.")
+
+
+@packages_cli.command("expire")
+@click.option("--batch-size", default=BATCH_SIZE, show_default=True, help="Rows updated per statement.")
+def expire(batch_size):
+    """ Deactivate the expired user packages """
+    expired = expire_packages(batch_size)
+    click.echo(f"{expired} package(s) expired.")
+
+
+@packages_cli.command("backfill-sessions")
+def backfill_sessions():
+    """ Set the remaining sessions of the packages from before the counter (NULL) """
+    updated = backfill_remaining_sessions()
+    click.echo(f"{updated} package(s) updated.")
@@ -0,0 +1,42 @@
+#!/usr/bin/python3
+import click
+from flask.cli import AppGroup
+from datetime import datetime
+from app.utils.payroll import payroll, rebuild_rollups
+from app.utils.revenue import refresh_revenue
+
+
+reports_cli = AppGroup("reports", help="Reports and their rollup tables.")
+
+
+def _parse_month(value):
+    return datetime.strptime(value, "%Y-%m").date() if value else None
+
+
+@reports_cli.command("payroll")
+@click.option("--month", help="YYYY-MM, the current month by default.")
+def payroll_command(month):
+    """ Print the teachers payroll of a month """
+    month = _parse_month(month) or datetime.today().date().replace(day=1)
+    teachers = payroll(month)
+    click.echo(f"{'teacher':<20} {'sessions':>8} {'hours':>8} {'rate':>8} {'amount':>10}")
+    for teacher in teachers:
+        click.echo(f"{teacher['username'] or '(deleted)':<20} {teacher['sessions']:>8} {teacher['hours']:>8} "
+                   f"{teacher['hourly_rate'] or 0:>8} {teacher['amount']:>10}")
+    click.echo(f"{'total':<20} {'':>8} {round(sum(t['hours'] for t in teachers), 2):>8} "
+               f"{'':>8} {round(sum(t['amount'] for t in teachers), 2):>10}")
+
+
+@reports_cli.command("rebuild-rollups")
+@click.option("--since", help="YYYY-MM, rebuild from this month only (everything by default).")
+def rebuild_rollups_command(since):
+    """ Recompute the teacher minutes rollups from the sessions """
+    rebuilt = rebuild_rollups(_parse_month(since))
+    click.echo(f"{rebuilt} teacher-day(s) rebuilt.")
+
+
+@reports_cli.command("refresh-revenue")
+def refresh_revenue_command():
+    """ Add the new user packages to the revenue aggregates """
+    touched = refresh_revenue()
+    click.echo(f"{touched} revenue row(s) updated.")
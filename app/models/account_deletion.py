@@ -0,0 +1,24 @@
+#!/usr/bin/python3
+from app.app import db, local_timezone
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime, Enum
+from app.utils.ids import UuidString
+
+
+class AccountDeletion(db.Model):
+    __tablename__ = "account_deletions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # no foreign key, the user row is the last one removed by the purger
+    user_id = Column(UuidString, nullable=False, unique=True)
+    status = Column(Enum("pending", "running", "done", name="deletion_status"), nullable=False, default="pending", index=True)
+    current_step = Column(String(50), nullable=True)
+    rows_deleted = Column(Integer, nullable=False, default=0)
+    # purger holding a running deletion, and the last time it renewed its claim
+    claimed_by = Column(String(32), nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    requested_at = Column(DateTime, default=lambda: datetime.now(local_timezone))
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<AccountDeletion user_id={self.user_id}, status={self.status}, rows_deleted={self.rows_deleted}>"
@@ -1,13 +1,61 @@
 #!/usr/bin/python3
-from uuid import uuid4
 from app.app import db, local_timezone
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import Column, String,  DateTime
+from sqlalchemy import Column, DateTime, inspect
+from sqlalchemy.orm import load_only, joinedload, selectinload
+from app.utils.serialization import model_encoder
+from app.utils.ids import UuidString, new_id
 
 
 class BaseModel(db.Model):
     __abstract__ = True  # This makes the class abstract and not directly mapped to a table
 
-    id = Column(String(50), primary_key=True, default=lambda: str(uuid4()))
+    # native UUID, time-ordered (version 7), exposed as its string form
+    id = Column(UuidString, primary_key=True, default=new_id)
     created_at = Column(DateTime, default=lambda: datetime.now(local_timezone))
     updated_at = Column(DateTime, default=lambda: datetime.now(local_timezone), onupdate=lambda: datetime.now(local_timezone))
+
+    # Fields of the API response, see compile_encoder for how a field is described
+    api_fields = {}
+    # Attributes (columns or relationships) read by a field, when not the field name itself
+    api_field_attributes = {}
+
+    # Convert to dictionary for API response, only the requested fields when given
+    def to_dict(self, fields=None):
+        return model_encoder(type(self), frozenset(fields) if fields is not None else None)(self)
+
+    @classmethod
+    def parse_fields(cls, fields):
+        """ Parse the `fields` query parameter (comma separated), None means all fields """
+        if not fields:
+            return None
+
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown_fields = requested - cls.api_fields.keys()
+        if unknown_fields:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown_fields))}")
+
+        return requested
+
+    @classmethod
+    def load_options(cls, fields=None):
+        """
+        Query options loading only what the requested fields read:
+        the columns behind them, and their relationships in one batch per query
+        """
+        mapper = inspect(cls)
+        columns = {"id": cls.id}
+        relationships = {}
+
+        for name in cls.api_fields if fields is None else fields:
+            for attribute in cls.api_field_attributes.get(name, (name,)):
+                if attribute in mapper.relationships:
+                    # collections in a second query, single rows joined to the first one
+                    loader = selectinload if mapper.relationships[attribute].uselist else joinedload
+                    relationships[attribute] = loader(getattr(cls, attribute))
+                elif attribute in mapper.column_attrs:
+                    columns[attribute] = getattr(cls, attribute)
+
+        if fields is None:
+            return list(relationships.values())
+        return [load_only(*columns.values()), *relationships.values()]
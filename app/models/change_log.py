@@ -0,0 +1,29 @@
+#!/usr/bin/python3
+from app.app import db, local_timezone
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Enum, Index
+from app.utils.ids import UuidString
+
+
+class ChangeLog(db.Model):
+    """ Outbox of the changes to the groups, their days, members and requests, read by GET /changes """
+    __tablename__ = "change_log"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    # transaction that wrote the change (Postgres, 0 elsewhere), the feed is read in (txid, id) order
+    txid = Column(BigInteger, nullable=False, default=0)
+    table_name = Column(String(30), nullable=False)
+    operation = Column(Enum("insert", "update", "delete", name="change_operation"), nullable=False)
+    # key of the changed row: the group, and the user, day or request id depending on the table
+    group_id = Column(Integer, nullable=True)
+    user_id = Column(UuidString, nullable=True)
+    item_id = Column(Integer, nullable=True)
+    changed_at = Column(DateTime, nullable=False, default=lambda: datetime.now(local_timezone))
+
+    __table_args__ = (
+        Index("ix_change_log_cursor", "txid", "id"),
+        Index("ix_change_log_changed_at", "changed_at"),
+    )
+
+    def __repr__(self):
+        return f"<ChangeLog {self.txid}.{self.id} {self.operation} {self.table_name} group_id={self.group_id}>"
@@ -1,7 +1,9 @@
 #!/usr/bin/python3
 from app.models.base import BaseModel
+from app.utils.serialization import format_datetime, format_time
 from sqlalchemy import Column, String, Integer, Date, Enum, ForeignKey
 from sqlalchemy.orm import relationship
+from app.utils.ids import UuidString
 
 class Group(BaseModel):
     __tablename__ = "groups"
@@ -13,7 +15,7 @@ class Group(BaseModel):
     start_date = Column(Date, nullable=False)
     end_date = Column(Date, nullable=False)
 
-    teacher_id = Column(String(50), ForeignKey("users.id"), nullable=True)
+    teacher_id = Column(UuidString, ForeignKey("users.id"), nullable=True)
 
     group_days = relationship("GroupDay", back_populates="group", cascade="all, delete-orphan", passive_deletes=True, overlaps="days")
 
@@ -25,29 +27,30 @@ class Group(BaseModel):
         return f"<group: {self.group}, size: {self.size}, status: {self.status}>"
 
 
-    # Convert to dictionary for API response
-    def to_dict(self):
-        TIME = "%a, %d %b %Y %I:%M:%S %p"
-        TIME_WITH_AMPM = "%I:%M:%S %p"
-
-        days_with_time = [
+    def days_with_time(self):
+        return [
             {
                 "id": day.id,
                 "day": day.day,
-                "time": group_day.time.strftime(TIME_WITH_AMPM)  # Format time with AM/PM
+                "time": format_time(group_day.time)  # Format time with AM/PM
             }
             for day, group_day in zip(self.days, self.group_days)  # Pair days with group_days
         ]
 
-        return {
-            "id": self.id,
-            "group": self.group,
-            "size": self.size,
-            "days": days_with_time,
-            "days_per_week": len(days_with_time),
-            "status": self.status,
-            "start_date": self.start_date.strftime(TIME),
-            "end_date": self.end_date.strftime(TIME),
-            "created_at": self.created_at.strftime(TIME),
-            "updated_at": self.updated_at.strftime(TIME),
-        }
+    # Fields of the API response
+    api_fields = {
+        "id": "id",
+        "group": "group",
+        "size": "size",
+        "days": lambda group: group.days_with_time(),
+        "days_per_week": lambda group: min(len(group.days), len(group.group_days)),  # days paired with times
+        "status": "status",
+        "start_date": ("start_date", format_datetime),
+        "end_date": ("end_date", format_datetime),
+        "created_at": ("created_at", format_datetime),
+        "updated_at": ("updated_at", format_datetime),
+    }
+    api_field_attributes = {
+        "days": ("days", "group_days"),
+        "days_per_week": ("days", "group_days"),
+    }
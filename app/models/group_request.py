@@ -1,13 +1,15 @@
 #!/user/bin/python3
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, DateTime, Text
+from sqlalchemy import Column, Integer, ForeignKey, Enum, DateTime, Text
 from sqlalchemy.orm import relationship
 from app.models.base import BaseModel
+from app.utils.serialization import format_datetime
+from app.utils.ids import UuidString
 
 class GroupRequest(BaseModel):
     __tablename__ = "group_requests"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(String(50), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(UuidString, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     group_id = Column(Integer, ForeignKey("groups.id", ondelete="CASCADE"), nullable=False)
     action = Column(Enum("join", "leave", name="request_action"), nullable=False)
     role = Column(Enum("student", "teacher", "admin", name="request_role"), nullable=False)
@@ -17,17 +19,15 @@ class GroupRequest(BaseModel):
     def __repr__(self):
         return f"<Request ID: {self.id} user_id={self.user_id}, group_id={self.group_id}, role={self.role}, status={self.status}>"
 
-    # Convert to dictionary for API response
-    def to_dict(self):
-        TIME = "%a, %d %b %Y %I:%M:%S %p"
-        return {
-            "id": self.id,
-            "user_id": self.user_id,
-            "group_id": self.group_id,
-            "role": self.role,
-            "status": self.status,
-            "action": self.action,
-            "note": self.note,
-            "created_at": self.created_at.strftime(TIME),
-            "updated_at": self.updated_at.strftime(TIME)
-        }
+    # Fields of the API response
+    api_fields = {
+        "id": "id",
+        "user_id": "user_id",
+        "group_id": "group_id",
+        "role": "role",
+        "status": "status",
+        "action": "action",
+        "note": "note",
+        "created_at": ("created_at", format_datetime),
+        "updated_at": ("updated_at", format_datetime)
+    }
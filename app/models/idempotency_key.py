@@ -0,0 +1,28 @@
+#!/usr/bin/python3
+from app.app import db, local_timezone
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, DateTime, LargeBinary
+
+
+class IdempotencyKey(db.Model):
+    __tablename__ = "idempotency_keys"
+
+    # endpoint and user of the request, a client only replays its own keys
+    scope = Column(String(150), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    # hash of the method, path and body, a key cannot be reused for another request
+    request_hash = Column(String(64), nullable=False)
+    # token of the request holding the lock, its lease (expires_at) is renewed while it runs
+    holder = Column(String(32), nullable=False)
+    # set in the transaction of the view's writes: once committed the view never runs again for the key
+    executed_at = Column(DateTime, nullable=True)
+    # NULL while the first request runs
+    status_code = Column(Integer, nullable=True)
+    # zlib compressed response body
+    body = Column(LargeBinary, nullable=True)
+    content_type = Column(String(100), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=lambda: datetime.now(local_timezone))
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey scope={self.scope}, key={self.key}, status_code={self.status_code}>"
@@ -1,7 +1,6 @@
 #!/usr/bin/python3
 from app.app import db, local_timezone
 from app.models.base import BaseModel
-from app.models.user import User
 from datetime import datetime
 from sqlalchemy import Column, Integer, Enum, Float, String, Text
 
@@ -0,0 +1,22 @@
+#!/usr/bin/python3
+from app.app import db
+from sqlalchemy import Column, String, Integer, Float, Date, DateTime, ForeignKey
+
+
+class PackageRevenue(db.Model):
+    """ Subscriptions and revenue per month, package and country, refreshed from user_packages """
+    __tablename__ = "package_revenue"
+
+    month = Column(Date, nullable=False, primary_key=True)  # first day of the month
+    package_id = Column(Integer, ForeignKey("packages.id", ondelete="CASCADE"), nullable=False, primary_key=True)
+    country = Column(String(15), nullable=False, primary_key=True)
+    subscriptions = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+
+class ReportWatermark(db.Model):
+    """ How far an incrementally refreshed report has read its source table """
+    __tablename__ = "report_watermarks"
+
+    report = Column(String(50), primary_key=True)
+    refreshed_until = Column(DateTime, nullable=False)
@@ -2,6 +2,7 @@
 from app.app import db, local_timezone
 from datetime import datetime, timedelta
 from sqlalchemy import Column, String, Integer, DateTime, Boolean, ForeignKey
+from app.utils.ids import UuidString
 
 
 class ResetToken(db.Model):
@@ -13,7 +14,7 @@ class ResetToken(db.Model):
     is_used = Column(Boolean, default=False, nullable=False)
     expiry_date = Column(DateTime)
 
-    user_id = Column(String(50), ForeignKey("users.id"), nullable=False)
+    user_id = Column(UuidString, ForeignKey("users.id"), nullable=False)
 
     def set_expiry_date(self, minutes):
         self.created_at = datetime.now(local_timezone)
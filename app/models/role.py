@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 from app.models.base import BaseModel
+from app.utils.serialization import format_datetime
 from sqlalchemy import Column, String, Integer, Text
 from sqlalchemy.orm import relationship
 
@@ -16,13 +17,14 @@ class Role(BaseModel):
     def __repr__(self):
         return f"<Role ID: {self.id}, Role Name: {self.role}>"
 
-    # Convert to dictionary for API response
-    def to_dict(self):
-        TIME = "%a, %d %b %Y %I:%M:%S %p"
-        return {
-            "id": self.id,
-            "name": self.role,
-            "description": self.description,
-            "created_at": self.created_at.strftime(TIME),
-            "updated_at": self.updated_at.strftime(TIME)
-        }
+    # Fields of the API response
+    api_fields = {
+        "id": "id",
+        "name": "role",
+        "description": "description",
+        "created_at": ("created_at", format_datetime),
+        "updated_at": ("updated_at", format_datetime)
+    }
+    api_field_attributes = {
+        "name": ("role",)
+    }
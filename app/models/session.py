@@ -1,21 +1,27 @@
 #!/usr/bin/python3
 from app.app import db, local_timezone
-from app.models.user import User
+from app.utils.serialization import format_datetime, format_time
 from datetime import datetime, timedelta
-from sqlalchemy import Column, DateTime, Integer, Enum, Time, Float, ForeignKey, String
+from sqlalchemy import Column, DateTime, Date, Integer, Enum, Time, Float, ForeignKey, Index
+from app.utils.ids import UuidString
 
 
 class Session(db.Model):
     __tablename__ = "sessions"
+    # range queries ("my sessions this week") by teacher and date
+    __table_args__ = (Index("ix_sessions_user_id_date", "user_id", "date"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     created_at = Column(DateTime, default=lambda: datetime.now(local_timezone))
+    date = Column(Date, nullable=False)
     start_time = Column(Time, nullable=False)
     end_time = Column(Time, nullable=False)
     length = Column(Float, nullable=False)
     type = Column(Enum("private", "group", name="session_type"), nullable=False)
 
-    user_id = Column(String(50), ForeignKey("users.id"), nullable=False)
+    user_id = Column(UuidString, ForeignKey("users.id"), nullable=False)
+    # the group taught in a group session
+    group_id = Column(Integer, ForeignKey("groups.id", ondelete="SET NULL"), nullable=True)
 
     # def __init__(self, *args, **kwargs):
     #     super().__init__(*args, **kwargs)
@@ -27,10 +33,23 @@ class Session(db.Model):
     #         raise ValueError("A session must created by teacher only")
     #     self.users.append(teacher)
 
+    def __repr__(self):
+        return f"<Session ID: {self.id}, user_id={self.user_id}, date={self.date}, {self.start_time}-{self.end_time}>"
+
     def set_length(self):
-        session_length = timedelta(
-            hours=self.end_time.hour - self.start_time.hour,
-            minutes=self.end_time.minute - self.start_time.minute,
-            seconds=self.end_time.second - self.start_time.second
-        )
+        session_length = datetime.combine(self.date, self.end_time) - datetime.combine(self.date, self.start_time)
         self.length = session_length.total_seconds() / 60  # in minutes
+
+    # Convert to dictionary for API response
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "teacher_id": self.user_id,
+            "group_id": self.group_id,
+            "date": format_datetime(self.date),
+            "start_time": format_time(self.start_time),
+            "end_time": format_time(self.end_time),
+            "length": self.length,
+            "type": self.type,
+            "created_at": format_datetime(self.created_at)
+        }
@@ -0,0 +1,26 @@
+#!/usr/bin/python3
+from app.app import db
+from sqlalchemy import Column, Integer, Float, Date
+from app.utils.ids import UuidString
+
+
+# Rollups of Session.length per teacher, maintained as sessions are written
+# (app/utils/payroll.py), rebuilt with `flask reports rebuild-rollups`. They are
+# the payroll history: no foreign key, they outlive a deleted teacher account
+
+class TeacherDailyMinutes(db.Model):
+    __tablename__ = "teacher_daily_minutes"
+
+    user_id = Column(UuidString, nullable=False, primary_key=True)
+    day = Column(Date, nullable=False, primary_key=True)
+    minutes = Column(Float, nullable=False, default=0)
+    sessions = Column(Integer, nullable=False, default=0)
+
+
+class TeacherMonthlyMinutes(db.Model):
+    __tablename__ = "teacher_monthly_minutes"
+
+    user_id = Column(UuidString, nullable=False, primary_key=True)
+    month = Column(Date, nullable=False, primary_key=True)  # first day of the month
+    minutes = Column(Float, nullable=False, default=0)
+    sessions = Column(Integer, nullable=False, default=0)
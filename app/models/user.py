@@ -1,5 +1,6 @@
 #!/usr/bin/python3
 from app.models.base import BaseModel
+from app.utils.serialization import format_datetime
 from flask_login import UserMixin
 from sqlalchemy import Column, String, Boolean, DateTime, Enum, Integer, Date, Float, ForeignKey
 from sqlalchemy.orm import relationship
@@ -26,7 +27,7 @@ class User(BaseModel, UserMixin):
     parent_phone_number = Column(String(20), nullable=True)
     level = Column(Integer, nullable=True)
     national_id = Column(String(30), nullable=True, unique=True)
-    salary = Column(Float, nullable=True)
+    salary = Column(Float, nullable=True)  # teachers: hourly rate of the payroll
     privileges = Column(String(100), nullable=True)
     position = Column(String(50), nullable=True)
     is_active = Column(Boolean, default=True, nullable=False)
@@ -55,32 +56,35 @@ class User(BaseModel, UserMixin):
     def check_password(self, password):
         return bcrypt.check_password_hash(self.password, password)
 
-    # Convert to dictionary for API response
-    def to_dict(self):
-        TIME = "%a, %d %b %Y %I:%M:%S %p"
-        return {
-            "id": self.id,
-            "username": self.username,
-            "email": self.email,
-            "first_name": self.first_name,
-            "last_name": self.last_name,
-            "phone_number": self.phone_number,
-            "photo": self.photo,
-            "birth_date": self.birth_date,
-            "gender": self.gender,
-            "nationality": self.nationality,
-            "country": self.country,
-            "time_zone": self.time_zone,
-            "parent_phone_number": self.parent_phone_number,
-            "level": self.level,
-            "national_id": self.national_id,
-            "salary": self.salary,
-            "privileges": self.privileges,
-            "position": self.position,
-            "last_login": self.last_login.strftime(TIME),
-            "created_at": self.created_at.strftime(TIME),
-            "updated_at": self.updated_at.strftime(TIME),
-            "is_active": self.is_active,
-            "role": self.role.role,
-            "language": self.language.language
-        }
+    # Fields of the API response
+    api_fields = {
+        "id": "id",
+        "username": "username",
+        "email": "email",
+        "first_name": "first_name",
+        "last_name": "last_name",
+        "phone_number": "phone_number",
+        "photo": "photo",
+        "birth_date": "birth_date",
+        "gender": "gender",
+        "nationality": "nationality",
+        "country": "country",
+        "time_zone": "time_zone",
+        "parent_phone_number": "parent_phone_number",
+        "level": "level",
+        "national_id": "national_id",
+        "salary": "salary",
+        "privileges": "privileges",
+        "position": "position",
+        "last_login": ("last_login", format_datetime),
+        "created_at": ("created_at", format_datetime),
+        "updated_at": ("updated_at", format_datetime),
+        "is_active": "is_active",
+        "role": "role.role",
+        "language": "language.language"
+    }
+    # role and language are read through their foreign keys
+    api_field_attributes = {
+        "role": ("role_id", "role"),
+        "language": ("language_id", "language")
+    }
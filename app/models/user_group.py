@@ -1,12 +1,13 @@
 #!/usr/bin/python3
 from app.app import db, local_timezone
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from app.utils.ids import UuidString
 
 
 class UserGroup(db.Model):
     __tablename__ = "user_groups"
 
-    user_id = Column(String(50), ForeignKey("users.id"), nullable=False, primary_key=True)
+    user_id = Column(UuidString, ForeignKey("users.id"), nullable=False, primary_key=True)
     group_id = Column(Integer, ForeignKey("groups.id"), nullable=False, primary_key=True)
     timestamp = Column(DateTime, default=lambda: datetime.now(local_timezone))
@@ -1,21 +1,46 @@
 #!/usr/bin/python3
 from app.app import db, local_timezone
 from datetime import datetime, timedelta
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Boolean, Index, select
+from app.models.package import Package
+from app.utils.ids import UuidString
+
+
+def _package_sessions(context):
+    """ Default of remaining_sessions: the sessions of the package subscribed to """
+    package_id = context.get_current_parameters()["package_id"]
+    return context.connection.scalar(select(Package.max_sessions).where(Package.id == package_id))
 
 
 class UserPackage(db.Model):
     __tablename__ = "user_packages"
 
-    user_id = Column(String(50), ForeignKey("users.id"), nullable=False, primary_key=True)
+    user_id = Column(UuidString, ForeignKey("users.id"), nullable=False, primary_key=True)
     package_id = Column(Integer, ForeignKey("packages.id"), nullable=False, primary_key=True)
     timestamp = Column(DateTime, default=lambda: datetime.now(local_timezone))
     expiry_date = Column(DateTime)
     is_active = Column(Boolean, default=False, nullable=False)
+    # sessions left, decremented atomically when a session is attended (app/utils/metering.py).
+    # NULL on the rows from before the counter, until `flask packages backfill-sessions` fills them
+    remaining_sessions = Column(Integer, default=_package_sessions, nullable=True)
+
+    # the expiry sweeper looks up the active rows by expiry date
+    __table_args__ = (
+        Index("ix_user_packages_active_expiry_date", expiry_date,
+              postgresql_where=is_active, sqlite_where=is_active),
+    )
 
     def set_expiry_date(self, days):
+        """ Start a new period (subscription or renewal): its expiry date and the sessions of the package """
         self.timestamp = datetime.now(local_timezone)
         if days == 0:
             self.expiry_date = self.timestamp
         else:
             self.expiry_date = self.timestamp + timedelta(days=days)
+        self.set_remaining_sessions()
+
+    def set_remaining_sessions(self, max_sessions=None):
+        if max_sessions is None:
+            # the package's sessions, read in the UPDATE (or INSERT) itself
+            max_sessions = select(Package.max_sessions).where(Package.id == self.package_id).scalar_subquery()
+        self.remaining_sessions = max_sessions
@@ -1,12 +1,15 @@
 #!/usr/bin/python3
 from app.app import db, local_timezone
 from datetime import datetime
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Boolean, true
+from app.utils.ids import UuidString
 
 
 class UserSession(db.Model):
     __tablename__ = "user_sessions"
 
-    user_id = Column(String(50), ForeignKey("users.id"), nullable=False, primary_key=True)
+    user_id = Column(UuidString, ForeignKey("users.id"), nullable=False, primary_key=True)
     session_id = Column(Integer, ForeignKey("sessions.id"), nullable=False, primary_key=True)
     timestamp = Column(DateTime, default=lambda: datetime.now(local_timezone))
+    # attended with a package session (POST /sessions/attend), false for the free bulk attendance
+    metered = Column(Boolean, nullable=False, default=True, server_default=true())
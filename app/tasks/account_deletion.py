@@ -0,0 +1,166 @@
+#!/usr/bin/python3
+from app.app import db, local_timezone
+from app.models.account_deletion import AccountDeletion
+from app.models.user import User
+from app.models.group import Group
+from app.models.session import Session
+from app.models.reset_token import ResetToken
+from app.models.user_group import UserGroup
+from app.models.user_session import UserSession
+from app.models.user_package import UserPackage
+from app.models.group_request import GroupRequest
+from app.utils.changes import KEYS, record_changes
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, update, tuple_, and_, or_
+from uuid import uuid4
+
+
+BATCH_SIZE = 1000
+# a running deletion whose purger has not renewed its claim for this long is taken over
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def _touch_groups(group_ids):
+    """ Bump updated_at of groups whose members changed, so their ETags change """
+    if group_ids:
+        groups = Group.__table__
+        db.session.execute(update(groups).where(groups.c.id.in_(group_ids))
+                           .values(updated_at=datetime.now(local_timezone)))
+
+
+def _delete_batch(table, condition, batch_size, touch_groups=False):
+    """
+    Delete up to `batch_size` rows of `table` matching `condition`, return the count.
+    With `touch_groups`, the groups of the deleted rows get a new updated_at
+    """
+    keys = list(table.primary_key.columns)
+    batch = select(*keys).where(condition).limit(batch_size)
+    if len(keys) == 1:
+        statement = delete(table).where(keys[0].in_(batch.scalar_subquery()))
+    else:
+        statement = delete(table).where(tuple_(*keys).in_(batch))
+
+    if table.name not in KEYS:
+        return db.session.execute(statement).rowcount
+    # rows of the change feed, recorded in the same transaction
+    columns = KEYS[table.name]
+    deleted = [dict(zip(columns, row)) for row in
+               db.session.execute(statement.returning(*(table.c[name] for name in columns.values())))]
+    record_changes(db.session.connection(), table.name, "delete", deleted)
+    if touch_groups:
+        _touch_groups({row["group_id"] for row in deleted})
+    return len(deleted)
+
+
+def _unassign_teacher_batch(user_id, batch_size):
+    """ Remove the user as teacher of up to `batch_size` groups, return the count """
+    groups = Group.__table__
+    batch = select(groups.c.id).where(groups.c.teacher_id == user_id).limit(batch_size)
+    statement = update(groups).where(groups.c.id.in_(batch.scalar_subquery())).values(
+        teacher_id=None, updated_at=datetime.now(local_timezone)
+    )
+    updated = db.session.execute(statement.returning(groups.c.id)).scalars().all()
+    record_changes(db.session.connection(), "groups", "update", [{"group_id": group_id} for group_id in updated])
+    return len(updated)
+
+
+def _purge_steps(user_id):
+    """
+    (step name, batch function) of every row depending on the user, children first.
+    The teacher minutes rollups stay, they are the payroll history
+    """
+    created_sessions = select(Session.id).where(Session.user_id == user_id).scalar_subquery()
+    tables = [
+        ("reset_tokens", ResetToken.__table__, ResetToken.user_id == user_id, False),
+        # the rosters change, their groups get a new ETag in the same batch
+        ("user_groups", UserGroup.__table__, UserGroup.user_id == user_id, True),
+        ("user_packages", UserPackage.__table__, UserPackage.user_id == user_id, False),
+        ("group_requests", GroupRequest.__table__, GroupRequest.user_id == user_id, False),
+        ("user_sessions", UserSession.__table__, UserSession.user_id == user_id, False),
+        # attendance of the sessions the user created, then the sessions
+        ("session_attendance", UserSession.__table__, UserSession.session_id.in_(created_sessions), False),
+        ("sessions", Session.__table__, Session.user_id == user_id, False),
+    ]
+    steps = [
+        (name, lambda batch_size, table=table, condition=condition, touch_groups=touch_groups:
+         _delete_batch(table, condition, batch_size, touch_groups))
+        for name, table, condition, touch_groups in tables
+    ]
+    steps.append(("groups", lambda batch_size: _unassign_teacher_batch(user_id, batch_size)))
+    steps.append(("users", lambda batch_size: _delete_batch(User.__table__, User.id == user_id, batch_size)))
+    return steps
+
+
+def _claimable(now):
+    """ Condition of the deletions a purger can claim: pending, or running with an expired claim """
+    deletions = AccountDeletion.__table__
+    expired = or_(deletions.c.heartbeat_at.is_(None), deletions.c.heartbeat_at < now - CLAIM_LEASE)
+    return or_(deletions.c.status == "pending", and_(deletions.c.status == "running", expired))
+
+
+def claim_next_deletion():
+    """ Claim the oldest claimable deletion in one statement, return (id, user_id, claim token), or None """
+    deletions = AccountDeletion.__table__
+    now = datetime.now(local_timezone)
+    token = uuid4().hex
+    oldest = (
+        select(deletions.c.id).where(_claimable(now)).order_by(deletions.c.id).limit(1)
+        .with_for_update(skip_locked=True).scalar_subquery()
+    )
+    # the condition is checked again on the row, of two purgers racing for it only one updates it
+    claimed = db.session.execute(
+        update(deletions).where(deletions.c.id == oldest, _claimable(now))
+        .values(status="running", claimed_by=token, heartbeat_at=now)
+        .returning(deletions.c.id, deletions.c.user_id)
+    ).first()
+    db.session.commit()
+    return (claimed.id, claimed.user_id, token) if claimed else None
+
+
+def _renew_claim(deletion_id, token, **values):
+    """ Renew the claim and write `values` (the progress), False when another purger took the deletion over """
+    deletions = AccountDeletion.__table__
+    return db.session.execute(
+        update(deletions).where(deletions.c.id == deletion_id, deletions.c.claimed_by == token,
+                                deletions.c.status == "running")
+        .values(heartbeat_at=datetime.now(local_timezone), **values)
+    ).rowcount == 1
+
+
+def purge_account(deletion_id, user_id, token, batch_size=BATCH_SIZE):
+    """
+    Remove the rows of a claimed account deletion with bounded set-based statements,
+    committing the progress after every batch so it can resume where it stopped.
+    Return False when the claim was lost (the batch is rolled back, its new owner redoes it)
+    """
+    deletions = AccountDeletion.__table__
+    for step, delete_batch in _purge_steps(user_id):
+        while True:
+            count = delete_batch(batch_size)
+            if not _renew_claim(deletion_id, token, current_step=step,
+                                rows_deleted=deletions.c.rows_deleted + count):
+                db.session.rollback()
+                return False
+            db.session.commit()
+            if count < batch_size:
+                break
+
+    finished = _renew_claim(deletion_id, token, status="done", current_step=None,
+                            finished_at=datetime.now(local_timezone))
+    db.session.commit()
+    return finished
+
+
+def purge_pending_accounts(batch_size=BATCH_SIZE):
+    """
+    Drain the deletion queue (pending deletions and those a stopped purger left
+    running), return the accounts purged. Each deletion is claimed first, so the
+    purgers of several workers and the CLI never purge the same account together
+    """
+    purged = 0
+    while True:
+        claim = claim_next_deletion()
+        if claim is None:
+            return purged
+        if purge_account(*claim, batch_size=batch_size):
+            purged += 1
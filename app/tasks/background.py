@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+from flask import current_app
+from os import register_at_fork
+from threading import Thread, Event, Lock
+
+
+# periodic tasks started in this process, by name
+_periodic_tasks = {}
+_periodic_lock = Lock()
+
+# background workers started in this process, by name: the event waking them
+_workers = {}
+_workers_lock = Lock()
+
+
+def _reset_in_child():
+    # threads do not survive a fork, each (preforked) worker starts its own tasks
+    global _periodic_lock, _workers_lock
+    _periodic_tasks.clear()
+    _periodic_lock = Lock()
+    _workers.clear()
+    _workers_lock = Lock()
+
+
+register_at_fork(after_in_child=_reset_in_child)
+
+
+def wake_worker(func):
+    """
+    Run `func` in the one daemon worker thread this process keeps for it, inside
+    an application context: the first call starts the worker, later calls wake
+    it (calls made while it runs are coalesced into one more run)
+    """
+    app = current_app._get_current_object()
+    wake = _workers.get(func.__name__)
+    if wake is None:
+        with _workers_lock:
+            wake = _workers.get(func.__name__)
+            if wake is None:
+                wake = _workers[func.__name__] = Event()
+                Thread(target=_work, args=(app, func, wake), name=func.__name__, daemon=True).start()
+    wake.set()
+
+
+def _work(app, func, wake):
+    while True:
+        wake.wait()
+        wake.clear()
+        with app.app_context():
+            try:
+                func()
+            except Exception:
+                app.logger.exception(f"Background task {func.__name__} failed")
+
+
+def start_periodic(app, interval, func, *args, **kwargs):
+    """
+    Run `func` every `interval` seconds in a daemon thread of this process,
+    once per process (the first call wins, later calls are no-ops)
+    """
+    if func.__name__ in _periodic_tasks:
+        return _periodic_tasks[func.__name__]
+
+    with _periodic_lock:
+        if func.__name__ in _periodic_tasks:
+            return _periodic_tasks[func.__name__]
+
+        stopped = Event()
+
+        def run():
+            while not stopped.wait(interval):
+                with app.app_context():
+                    try:
+                        func(*args, **kwargs)
+                    except Exception:
+                        app.logger.exception(f"Periodic task {func.__name__} failed")
+
+        thread = Thread(target=run, name=func.__name__, daemon=True)
+        thread.start()
+        _periodic_tasks[func.__name__] = stopped
+        return stopped
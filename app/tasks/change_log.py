@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+from app.app import db, local_timezone
+from app.models.change_log import ChangeLog
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete
+
+
+BATCH_SIZE = 1000
+
+
+def purge_change_log(retention_days, batch_size=BATCH_SIZE):
+    """
+    Delete the changes older than `retention_days` in chunks, driven by the
+    index on changed_at. The last change is always kept, it is the cursor
+    position of the clients that are up to date.
+    Return the number of changes deleted.
+    """
+    change_log = ChangeLog.__table__
+    cutoff = datetime.now(local_timezone) - timedelta(days=retention_days)
+    last_id = db.session.execute(
+        select(change_log.c.id).order_by(change_log.c.txid.desc(), change_log.c.id.desc()).limit(1)
+    ).scalar()
+    purged = 0
+
+    while True:
+        batch = select(change_log.c.id).where(
+            change_log.c.changed_at < cutoff, change_log.c.id != last_id
+        ).limit(batch_size)
+        count = db.session.execute(
+            delete(change_log).where(change_log.c.id.in_(batch.scalar_subquery()))
+        ).rowcount
+        db.session.commit()
+
+        purged += count
+        if count < batch_size:
+            return purged
@@ -0,0 +1,30 @@
+#!/usr/bin/python3
+from app.app import db, local_timezone
+from app.models.idempotency_key import IdempotencyKey
+from datetime import datetime
+from sqlalchemy import select, delete, tuple_
+
+
+BATCH_SIZE = 1000
+
+
+def purge_idempotency_keys(batch_size=BATCH_SIZE):
+    """
+    Delete the expired idempotency keys (stored responses and abandoned locks)
+    in chunks, driven by the index on expires_at.
+    Return the number of keys deleted.
+    """
+    keys = IdempotencyKey.__table__
+    now = datetime.now(local_timezone)
+    purged = 0
+
+    while True:
+        batch = select(keys.c.scope, keys.c.key).where(keys.c.expires_at <= now).limit(batch_size)
+        count = db.session.execute(
+            delete(keys).where(tuple_(keys.c.scope, keys.c.key).in_(batch))
+        ).rowcount
+        db.session.commit()
+
+        purged += count
+        if count < batch_size:
+            return purged
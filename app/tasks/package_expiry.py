@@ -0,0 +1,40 @@
+#!/usr/bin/python3
+from app.app import db, local_timezone
+from app.models.user_package import UserPackage
+from app.utils.sql import try_advisory_lock
+from datetime import datetime
+from sqlalchemy import select, update, tuple_
+
+
+BATCH_SIZE = 1000
+
+
+def expire_packages(batch_size=BATCH_SIZE):
+    """
+    Deactivate the expired user packages with chunked set-based UPDATEs,
+    driven by the partial index on the active rows' expiry_date.
+    Return the number of packages deactivated.
+    Each chunk holds an advisory lock, a sweeper (of another worker, or the
+    CLI) finding it taken stops there instead of updating the same rows.
+    """
+    user_packages = UserPackage.__table__
+    now = datetime.now(local_timezone)
+    expired = 0
+
+    while True:
+        if not try_advisory_lock(db.session, "expire_packages"):
+            db.session.rollback()
+            return expired
+        batch = select(user_packages.c.user_id, user_packages.c.package_id).where(
+            user_packages.c.is_active, user_packages.c.expiry_date <= now
+        ).limit(batch_size)
+        count = db.session.execute(
+            update(user_packages)
+            .where(tuple_(user_packages.c.user_id, user_packages.c.package_id).in_(batch))
+            .values(is_active=False)
+        ).rowcount
+        db.session.commit()
+
+        expired += count
+        if count < batch_size:
+            return expired
@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+import asyncio
+from math import ceil
+from os import register_at_fork
+from threading import Thread, Lock
+from sqlalchemy import select, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from app.app import db
+from app.utils.replicas import read_replica
+from app.utils import query_stats
+
+
+# Async read path (ASYNC_READS): the listing endpoints hand their queries to
+# one event loop per process, running on the asyncio driver (asyncpg), so
+# the independent queries of a request (the page and its count) run
+# concurrently, and a request only holds a connection while a query runs:
+# the sync session gives its connection back before the async queries start.
+
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+_loop = None
+_engines = {}
+_lock = Lock()
+
+
+def _reset_in_child():
+    # the loop thread does not survive a fork, the connections belong to the parent
+    global _loop, _lock
+    _loop = None
+    _engines.clear()
+    _lock = Lock()
+
+
+register_at_fork(after_in_child=_reset_in_child)
+
+
+def async_uri(config, uri=None):
+    """ The database URI (the primary by default) with the asyncio driver of its dialect """
+    if uri is None:
+        if config.get("ASYNC_DATABASE_URI"):
+            return config["ASYNC_DATABASE_URI"]
+        uri = config["SQLALCHEMY_DATABASE_URI"]
+    url = make_url(uri)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]).render_as_string(hide_password=False)
+
+
+def _engine_options(config):
+    options = {key: value for key, value in config["SQLALCHEMY_ENGINE_OPTIONS"].items()
+               if key in ("pool_timeout", "pool_recycle", "pool_pre_ping")}
+    if "pool_size" in config["SQLALCHEMY_ENGINE_OPTIONS"]:
+        # its own share of the connections budget, not a copy of the sync pool
+        options["pool_size"] = config["DB_ASYNC_POOL_SIZE"]
+        options["max_overflow"] = config["DB_ASYNC_MAX_OVERFLOW"]
+    if config["DB_PGBOUNCER"]:
+        # transaction pooling: no prepared statements kept on a server connection
+        options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+    elif config["DB_STATEMENT_TIMEOUT"] and config["SQLALCHEMY_DATABASE_URI"].startswith("postgresql"):
+        options["connect_args"] = {"server_settings": {"statement_timeout": str(config["DB_STATEMENT_TIMEOUT"])}}
+    return options
+
+
+def _get_loop():
+    global _loop
+    if _loop is None:
+        with _lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                Thread(target=loop.run_forever, name="async-reads", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def _get_engine(config):
+    # the replica of the request, when it reads from one (see app.utils.replicas)
+    replica = read_replica()
+    uri = async_uri(config, config["SQLALCHEMY_BINDS"][replica] if replica else None)
+    if uri not in _engines:
+        with _lock:
+            if uri not in _engines:
+                _engines[uri] = create_async_engine(uri, **_engine_options(config))
+    return _engines[uri]
+
+
+def run(config, *queries):
+    """
+    Run the `queries` (async functions taking an AsyncSession) concurrently,
+    each with its own session, and return their results. Their statements are
+    counted in the stats of the request (app/utils/query_stats.py)
+    """
+    engine = _get_engine(config)
+    stats = query_stats.current_stats()
+    # the objects already loaded stay usable, detached
+    db.session.close()
+
+    async def run_query(query):
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            return await query(session)
+
+    async def run_all():
+        query_stats.async_stats.set(stats)
+        return await asyncio.gather(*(run_query(query) for query in queries))
+
+    return asyncio.run_coroutine_threadsafe(run_all(), _get_loop()).result()
+
+
+class Page:
+    """ A page of results, with the attributes of Flask-SQLAlchemy's Pagination used by the views """
+
+    def __init__(self, items, total, page, per_page):
+        self.items = items
+        self.total = total
+        self.page = page
+        self.per_page = per_page
+        self.pages = ceil(total / per_page) if total else 0
+        self.has_prev = page > 1
+        self.prev_num = page - 1 if self.has_prev else None
+        self.has_next = page < self.pages
+        self.next_num = page + 1 if self.has_next else None
+
+
+def _items(statement, page, per_page):
+    async def items(session):
+        result = await session.scalars(statement.limit(per_page).offset((page - 1) * per_page))
+        return result.unique().all()
+    return items
+
+
+def paginate(config, statement, page, per_page):
+    """ Page `page` of the ORM select `statement`, the rows and the count are queried concurrently """
+
+    async def total(session):
+        return await session.scalar(select(func.count()).select_from(statement.order_by(None).subquery()))
+
+    rows, count = run(config, _items(statement, page, per_page), total)
+    return Page(rows, count, page, per_page)
+
+
+def page_items(config, statement, page, per_page, other=None):
+    """
+    The items of page `page` of the ORM select `statement`, without counting them,
+    and the rows of the select `other` (e.g. an aggregate giving the total) queried concurrently
+    """
+    if other is None:
+        return run(config, _items(statement, page, per_page))[0], None
+
+    async def rows(session):
+        return (await session.execute(other)).all()
+
+    return tuple(run(config, _items(statement, page, per_page), rows))
@@ -0,0 +1,43 @@
+#!/usr/bin/python3
+from app.app import db, local_timezone
+from app.models.user_session import UserSession
+from datetime import datetime
+from app.utils.sql import upsert, supports_upsert
+from sqlalchemy import select, insert
+
+
+PAGE_SIZE = 1000  # rows per multi-row INSERT
+
+
+def record_attendance(session_id, user_ids):
+    """
+    Insert the user_sessions rows of `user_ids` for a session with multi-row
+    INSERTs, in the current transaction. Rows that already exist are skipped,
+    so re-submitting the same attendance is harmless. No package session is
+    consumed (see attend_session for the metered path).
+    Return the number of rows inserted.
+    """
+    if not user_ids:
+        return 0
+
+    now = datetime.now(local_timezone)
+    connection = db.session.connection()
+    user_sessions = UserSession.__table__
+    rows = [{"user_id": user_id, "session_id": session_id, "timestamp": now, "metered": False}
+            for user_id in user_ids]
+
+    if supports_upsert(connection):
+        # one INSERT ... VALUES (...), (...) ON CONFLICT DO NOTHING per PAGE_SIZE rows (insertmanyvalues),
+        # through the SQLAlchemy connection, so its event listeners see the statements
+        statement = upsert(connection, user_sessions).on_conflict_do_nothing().returning(user_sessions.c.user_id)
+        return len(connection.execute(statement.execution_options(insertmanyvalues_page_size=PAGE_SIZE), rows).all())
+
+    # other databases: skip the recorded rows first, then executemany
+    recorded = set(connection.execute(
+        select(user_sessions.c.user_id).where(
+            user_sessions.c.session_id == session_id, user_sessions.c.user_id.in_(user_ids))
+    ).scalars())
+    rows = [row for row in rows if row["user_id"] not in recorded]
+    if rows:
+        connection.execute(insert(user_sessions), rows)
+    return len(rows)
@@ -0,0 +1,191 @@
+#!/usr/bin/python3
+from app.app import db, local_timezone
+from app.models.change_log import ChangeLog
+from app.models.group import Group
+from app.models.group_day import GroupDay
+from app.models.group_request import GroupRequest
+from app.models.user import User
+from app.models.user_group import UserGroup
+from app.utils.replicas import RoutingSession
+from datetime import datetime
+from sqlalchemy import event, select, insert, inspect, func, literal, tuple_
+from sqlalchemy.orm import attributes
+
+
+# Change feed: every flush writing groups, group_days, user_groups (the
+# memberships, usually through Group.users) or group_requests adds their keys
+# to the change_log outbox, in the same transaction. GET /changes reads it
+# from a cursor, (txid, id) of the last change read.
+#
+# On Postgres only the changes of the transactions older than every running
+# one are read (txid below the xmin of the snapshot), so a transaction that
+# commits late never lands behind a cursor already handed out. SQLite has a
+# single writer, the ids are in commit order.
+#
+# Bulk statements (INSERT ... SELECT, batched DELETEs) skip the ORM, they
+# record their changes with record_changes or record_changes_from. A deleted group takes its days,
+# members and requests with it, only the group delete is recorded.
+
+TABLES = {
+    Group: "groups",
+    GroupDay: "group_days",
+    UserGroup: "user_groups",
+    GroupRequest: "group_requests",
+}
+
+# key columns of the change_log per table, from the attributes of its rows
+KEYS = {
+    "groups": {"group_id": "id"},
+    "group_days": {"group_id": "group_id", "item_id": "day_id"},
+    "user_groups": {"group_id": "group_id", "user_id": "user_id"},
+    "group_requests": {"group_id": "group_id", "user_id": "user_id", "item_id": "id"},
+}
+
+
+def txid(connection):
+    """ SQL expression of the id of the current transaction (0 without one) """
+    if connection.dialect.name == "postgresql":
+        return func.txid_current()
+    return literal(0)
+
+
+def visible_txids(connection):
+    """ Condition keeping the changes of the finished transactions, None when they all are """
+    if connection.dialect.name == "postgresql":
+        return ChangeLog.txid < select(func.txid_snapshot_xmin(func.txid_current_snapshot())).scalar_subquery()
+    return None
+
+
+def record_changes(connection, table_name, operation, rows):
+    """ Add changes to the change log, `rows` are dictionaries of the key columns (see KEYS) """
+    if not rows:
+        return
+    now = datetime.now(local_timezone)
+    connection.execute(
+        insert(ChangeLog).values(txid=txid(connection)),
+        [{"table_name": table_name, "operation": operation, "group_id": row.get("group_id"),
+          "user_id": row.get("user_id"), "item_id": row.get("item_id"), "changed_at": now} for row in rows]
+    )
+
+
+def record_changes_from(connection, table_name, operation, keys):
+    """ Add the rows of `keys` (a select of key columns labelled as in KEYS) to the change log, INSERT ... SELECT """
+    keys = keys.subquery()
+    columns = [name for name in ("group_id", "user_id", "item_id") if name in keys.c]
+    rows = select(txid(connection), literal(table_name), literal(operation),
+                  literal(datetime.now(local_timezone), ChangeLog.changed_at.type), *(keys.c[name] for name in columns))
+    return connection.execute(insert(ChangeLog).from_select(
+        ["txid", "table_name", "operation", "changed_at", *columns], rows
+    )).rowcount
+
+
+def _key(table_name, target, deleted=False):
+    state = inspect(target)
+    key = {}
+    for column, name in KEYS[table_name].items():
+        # a deleted row may be expired, read what was loaded instead of reloading it
+        value = state.attrs[name].loaded_value if deleted else getattr(target, name)
+        key[column] = None if value is attributes.NO_VALUE else value
+    return key
+
+
+def _membership_changes(target, collection, inserted, deleted):
+    history = attributes.get_history(target, collection, passive=attributes.PASSIVE_NO_INITIALIZE)
+    for other in history.added:
+        user, group = (other, target) if isinstance(target, Group) else (target, other)
+        inserted.add((user.id, group.id))
+    for other in history.deleted:
+        user, group = (other, target) if isinstance(target, Group) else (target, other)
+        deleted.add((user.id, group.id))
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _record_flush(session, flush_context):
+    changes = {}
+    memberships_inserted, memberships_deleted = set(), set()
+
+    for target in session.new:
+        table_name = TABLES.get(type(target))
+        if table_name:
+            changes.setdefault((table_name, "insert"), []).append(_key(table_name, target))
+    for target in session.dirty:
+        table_name = TABLES.get(type(target))
+        if table_name and session.is_modified(target, include_collections=False):
+            changes.setdefault((table_name, "update"), []).append(_key(table_name, target))
+    for target in session.deleted:
+        table_name = TABLES.get(type(target))
+        if table_name:
+            changes.setdefault((table_name, "delete"), []).append(_key(table_name, target, deleted=True))
+
+    # memberships written through the many-to-many relationship (Group.users, User.groups)
+    for target in session.new | session.dirty:
+        if isinstance(target, Group):
+            _membership_changes(target, "users", memberships_inserted, memberships_deleted)
+        elif isinstance(target, User):
+            _membership_changes(target, "groups", memberships_inserted, memberships_deleted)
+    for operation, memberships in (("insert", memberships_inserted), ("delete", memberships_deleted)):
+        if memberships:
+            changes.setdefault(("user_groups", operation), []).extend(
+                {"user_id": user_id, "group_id": group_id} for user_id, group_id in sorted(memberships))
+
+    if changes:
+        # still flushing, the connection is the one of the flush (the primary)
+        connection = session.connection()
+        for (table_name, operation), rows in changes.items():
+            record_changes(connection, table_name, operation, rows)
+
+
+def parse_cursor(cursor):
+    """ (txid, id) of a cursor string, ValueError when malformed """
+    txid_part, _, id_part = cursor.partition(".")
+    position = (int(txid_part), int(id_part))
+    if position[0] < 0 or position[1] < 0:
+        raise ValueError(cursor)
+    return position
+
+
+def format_cursor(position):
+    return f"{position[0]}.{position[1]}"
+
+
+def read_changes(since, limit, user=None):
+    """
+    Up to `limit` changes after the cursor position `since`, only those visible
+    to `user` (their own memberships and requests) when given, and whether more follow
+    """
+    query = select(ChangeLog).where(tuple_(ChangeLog.txid, ChangeLog.id) > since)
+    condition = visible_txids(db.session.connection())
+    if condition is not None:
+        query = query.where(condition)
+    if user is not None:
+        query = query.where(
+            ChangeLog.table_name.in_(("groups", "group_days")) | (ChangeLog.user_id == user.id)
+        )
+    rows = db.session.scalars(query.order_by(ChangeLog.txid, ChangeLog.id).limit(limit + 1)).all()
+    return rows[:limit], len(rows) > limit
+
+
+def latest_cursor(tables=None):
+    """ Position of the last readable change (of `tables` when given), (0, 0) when there is none """
+    query = select(ChangeLog.txid, ChangeLog.id)
+    condition = visible_txids(db.session.connection())
+    if condition is not None:
+        query = query.where(condition)
+    if tables:
+        query = query.where(ChangeLog.table_name.in_(tables))
+    row = db.session.execute(query.order_by(ChangeLog.txid.desc(), ChangeLog.id.desc()).limit(1)).first()
+    return tuple(row) if row else (0, 0)
+
+
+def is_expired(since):
+    """ Whether changes after `since` were purged from the change log (the client must resync) """
+    if since == (0, 0):
+        # from the oldest change kept, a client only starts there after a full listing
+        return False
+    oldest = db.session.execute(
+        select(ChangeLog.txid, ChangeLog.id).order_by(ChangeLog.txid, ChangeLog.id).limit(1)
+    ).first()
+    if oldest is None or since >= tuple(oldest):
+        return False
+    # the change of the cursor was purged (the purge always keeps the last change)
+    return db.session.get(ChangeLog, since[1]) is None
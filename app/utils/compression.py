@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+from flask import request
+from time import thread_time
+import zlib
+from app.utils.metrics import registry, Counter, Histogram
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+
+# Negotiated response compression (brotli or gzip) of the JSON, CSV and text
+# responses above COMPRESS_MIN_SIZE bytes, streamed responses included.
+
+COMPRESSIBLE_MIMETYPES = frozenset(("application/json", "text/csv", "text/plain", "text/html"))
+
+compression_time = registry.register(Histogram(
+    "http_response_compression_seconds", "CPU time spent compressing a response",
+    labels=("encoding",), buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+))
+bytes_in = registry.register(Counter(
+    "http_response_compression_input_bytes_total", "Response bytes before compression", labels=("encoding",)
+))
+bytes_out = registry.register(Counter(
+    "http_response_compression_output_bytes_total", "Response bytes after compression", labels=("encoding",)
+))
+
+
+class _Gzip:
+    def __init__(self, level):
+        # wbits 31: gzip container
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        # emit what is buffered, the stream goes on
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, level):
+        self.compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+def _compressor(encoding, config):
+    if encoding == "br":
+        return _Brotli(config["COMPRESS_LEVEL_BROTLI"])
+    return _Gzip(config["COMPRESS_LEVEL_GZIP"])
+
+
+def _record(encoding, cpu_time, size_in, size_out):
+    compression_time.observe(cpu_time, encoding=encoding)
+    bytes_in.inc(size_in, encoding=encoding)
+    bytes_out.inc(size_out, encoding=encoding)
+
+
+def _compress_stream(chunks, compressor, encoding):
+    """ Compress a streamed body, each chunk is sent as soon as it is compressed """
+    cpu_time = size_in = size_out = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            start = thread_time()
+            data = compressor.compress(chunk) + compressor.flush()
+            cpu_time += thread_time() - start
+            size_in += len(chunk)
+            size_out += len(data)
+            if data:
+                yield data
+        start = thread_time()
+        data = compressor.finish()
+        cpu_time += thread_time() - start
+        size_out += len(data)
+        yield data
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+        _record(encoding, cpu_time, size_in, size_out)
+
+
+def init_compression(app):
+    """ Compress the responses for the clients accepting it (Accept-Encoding) """
+    encodings = ["br", "gzip"] if brotli else ["gzip"]
+
+    @app.after_request
+    def compress_response(response):
+        if (
+            not app.config["COMPRESS_MIN_SIZE"]
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or response.direct_passthrough  # files (photos) are sent as they are
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        ):
+            return response
+
+        # the body depends on the Accept-Encoding of the request
+        response.vary.add("Accept-Encoding")
+
+        encoding = request.accept_encodings.best_match(encodings)
+        if not encoding:
+            return response
+
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, _compressor(encoding, app.config), encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < app.config["COMPRESS_MIN_SIZE"]:
+                return response
+            compressor = _compressor(encoding, app.config)
+            start = thread_time()
+            compressed = compressor.compress(data) + compressor.finish()
+            _record(encoding, thread_time() - start, len(data), len(compressed))
+            response.set_data(compressed)
+
+        response.headers["Content-Encoding"] = encoding
+        # the representation changed, its ETag is only weakly equivalent (If-None-Match still matches)
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,35 @@
+#!/usr/bin/python3
+from flask import request, jsonify, make_response
+from hashlib import sha1
+
+
+def make_etag(*parts):
+    """ Build a strong ETag value from the given parts (id, updated_at, ...) """
+    raw = ":".join(str(part) for part in parts)
+    return sha1(raw.encode("utf-8")).hexdigest()
+
+
+def model_etag(representation, row_id, updated_at, fields=None):
+    """
+    ETag of a model representation, derived from its id and updated_at.
+    `representation` and `fields` keep the tags of different payloads of the same row apart.
+    """
+    selected = ",".join(sorted(fields)) if fields is not None else "*"
+    return make_etag(representation, selected, row_id, updated_at.isoformat() if updated_at else "")
+
+
+def conditional_response(etag, build_payload, status=200):
+    """
+    Answer `If-None-Match` with 304 before the payload is built.
+    `build_payload` is only called (and relationships only loaded) on a miss.
+    """
+    # If-None-Match uses the weak comparison (RFC 9110), this also handles "*"
+    if request.if_none_match.contains_weak(etag):
+        response = make_response("", 304)
+    else:
+        response = make_response(jsonify(build_payload()), status)
+
+    response.set_etag(etag)
+    # let the clients cache the payload but always revalidate it
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
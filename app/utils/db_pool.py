@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+from os import register_at_fork
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from time import perf_counter
+from app.utils.metrics import registry, Histogram, Gauge
+
+
+checkout_wait = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool (including opening a new one)",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+))
+
+# engines reported by the pool gauges, by bind key (those of the last app created)
+_engines = {}
+
+
+def _dispose_in_child():
+    # connections opened before the fork (app preloaded by the server) belong
+    # to the parent, the child starts with empty pools and leaves them alone
+    for engine in _engines.values():
+        engine.dispose(close=False)
+
+
+register_at_fork(after_in_child=_dispose_in_child)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """ QueuePool recording how long every checkout waited for a connection """
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            checkout_wait.observe(perf_counter() - start)
+
+
+def engine_options(config):
+    """ SQLALCHEMY_ENGINE_OPTIONS built from the DB_* settings of the app config """
+    if config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+        # SQLite keeps its own pools (a single connection for in memory databases)
+        return {}
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": config["DB_POOL_SIZE"],
+        "max_overflow": config["DB_MAX_OVERFLOW"],
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        "pool_recycle": config["DB_POOL_RECYCLE"],
+        "pool_pre_ping": config["DB_POOL_PRE_PING"],
+    }
+
+    # PgBouncer in transaction pooling mode drops the startup parameters and
+    # hands every transaction a different server connection, so the timeout
+    # is set per transaction (see init_pool) instead of per connection.
+    # psycopg2 never uses server-side prepared statements.
+    if config["DB_STATEMENT_TIMEOUT"] and not config["DB_PGBOUNCER"]:
+        options["connect_args"] = {"options": f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT']}"}
+
+    return options
+
+
+def init_pool(app, db):
+    """ Register the pool gauges, and the per transaction timeout in PgBouncer mode """
+    with app.app_context():
+        engines = dict(db.engines)
+    _engines.clear()
+    _engines.update(engines)
+
+    timeout = app.config["DB_STATEMENT_TIMEOUT"]
+    if app.config["DB_PGBOUNCER"] and timeout:
+        for engine in engines.values():
+            if engine.dialect.name == "postgresql":
+                @event.listens_for(engine, "begin")
+                def set_statement_timeout(connection):
+                    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout)}")
+
+    def pool_stats(stat):
+        def collect():
+            return [({"engine": key or "default"}, getattr(engine.pool, stat)())
+                    for key, engine in _engines.items() if isinstance(engine.pool, QueuePool)]
+        return collect
+
+    registry.register(Gauge("db_pool_size", "Configured size of the connection pool",
+                            labels=("engine",), callback=pool_stats("size")))
+    registry.register(Gauge("db_pool_checked_out", "Connections currently in use",
+                            labels=("engine",), callback=pool_stats("checkedout")))
+    registry.register(Gauge("db_pool_checked_in", "Idle connections kept in the pool",
+                            labels=("engine",), callback=pool_stats("checkedin")))
+    registry.register(Gauge("db_pool_overflow", "Connections opened beyond the pool size (negative while below it)",
+                            labels=("engine",), callback=pool_stats("overflow")))
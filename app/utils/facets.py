@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+from app.app import db
+from app.models.day import Day
+from app.models.group import Group
+from app.models.group_day import GroupDay
+from app.utils import async_db
+from sqlalchemy import select, func, case, literal, null, tuple_, union_all
+
+
+# Facets of the group browser: how many of the groups matching the filters
+# have each status, size bucket and day of the week, and their total, in one
+# aggregate query over the groups joined to their days (counting distinct
+# groups): GROUPING SETS on Postgres, a UNION ALL of the groupings elsewhere.
+
+# upper bounds of the size buckets, the last bucket is open
+SIZE_BUCKETS = (20, 30, 40, 50)
+
+
+def _size_labels():
+    labels, low = [], 1
+    for high in SIZE_BUCKETS:
+        labels.append(f"{low}-{high}")
+        low = high + 1
+    return labels + [f"{low}+"]
+
+
+SIZE_LABELS = _size_labels()
+
+# GROUPING(status, size, day) of each grouping set, a bit is set for the columns left out
+FACETS = {0b011: "status", 0b101: "size", 0b110: "day"}
+TOTAL = 0b111
+
+
+def size_bucket(column):
+    """ SQL expression of the size bucket label of a group size """
+    return case(*((column <= high, label) for high, label in zip(SIZE_BUCKETS, SIZE_LABELS)),
+                else_=SIZE_LABELS[-1])
+
+
+def facet_statement(where, dialect_name):
+    """ The aggregate select of the facets of the groups matching `where`, rows (grouping, status, size, day, count) """
+    matching = (
+        select(Group.id.label("id"), Group.status.label("status"), size_bucket(Group.size).label("size"),
+               Day.day.label("day"))
+        .outerjoin(GroupDay, GroupDay.group_id == Group.id)
+        .outerjoin(Day, Day.id == GroupDay.day_id)
+    )
+    if where is not None:
+        matching = matching.where(where)
+
+    if dialect_name == "postgresql":
+        rows = matching.subquery()
+        columns = (rows.c.status, rows.c.size, rows.c.day)
+        return select(func.grouping(*columns), *columns, func.count(rows.c.id.distinct())).group_by(
+            func.grouping_sets(*(tuple_(column) for column in columns), tuple_())
+        )
+
+    rows = matching.cte("matching_groups")
+    columns = (rows.c.status, rows.c.size, rows.c.day)
+    selects = []
+    for mask in (*FACETS, TOTAL):
+        grouped = [not mask & (0b100 >> index) for index in range(len(columns))]
+        selects.append(
+            select(literal(mask), *(column if keep else null() for column, keep in zip(columns, grouped)),
+                   func.count(rows.c.id.distinct()))
+            .group_by(*(column for column, keep in zip(columns, grouped) if keep))
+        )
+    return union_all(*selects)
+
+
+def parse_facets(rows):
+    """ (total, facets) of the rows of facet_statement, every status, bucket and day listed (0 when none) """
+    facets = {
+        "status": dict.fromkeys(Group.status.type.enums, 0),
+        "size": dict.fromkeys(SIZE_LABELS, 0),
+        "day": dict.fromkeys(Day.day.type.enums, 0),
+    }
+    total = 0
+    for mask, status, size, day, count in rows:
+        if mask == TOTAL:
+            total = count
+            continue
+        name = FACETS[mask]
+        value = {"status": status, "size": size, "day": day}[name]
+        # groups without days are only counted in the total, status and size
+        if value is not None:
+            facets[name][value] = count
+    return total, facets
+
+
+def page_with_facets(query, page, per_page, config, facets=None):
+    """
+    Page `page` of the ORM query and the (total, facets) of all its rows. The facets
+    are queried with the items (concurrently on the async read path) unless given,
+    the total of the page comes from them instead of a COUNT
+    """
+    # the dialect from the bind, no connection is checked out before the async queries
+    statement = facet_statement(query.whereclause, db.session.get_bind().dialect.name) if facets is None else None
+    if config["ASYNC_READS"]:
+        items, rows = async_db.page_items(config, query.statement, page, per_page, statement)
+    else:
+        items = query.limit(per_page).offset((page - 1) * per_page).all()
+        rows = db.session.execute(statement).all() if statement is not None else None
+    if rows is not None:
+        facets = parse_facets(rows)
+    return async_db.Page(items, facets[0], page, per_page), facets
+
+
+def facet_counts(query):
+    """ (total, facets) of the rows of the ORM query """
+    statement = facet_statement(query.whereclause, db.session.connection().dialect.name)
+    return parse_facets(db.session.execute(statement).all())
@@ -0,0 +1,218 @@
+#!/usr/bin/python3
+from flask import current_app, request, abort, make_response
+from flask_login import current_user
+from werkzeug.exceptions import HTTPException, Conflict
+from datetime import datetime, timedelta
+from functools import wraps
+from hashlib import sha256
+from threading import Thread, Event
+from time import monotonic, sleep
+from uuid import uuid4
+from sqlalchemy import select, delete, update, event
+from sqlalchemy.orm import Session
+import zlib
+from app.app import db, local_timezone
+from app.models.idempotency_key import IdempotencyKey
+from app.utils.metrics import registry, Counter
+from app.utils.sql import upsert
+
+
+# Idempotency-Key support of the mutating endpoints: the first request with a
+# key inserts a lock row, runs the view and stores its response, the retries
+# with the same key get the stored response without running the view. A retry
+# arriving while the first request runs waits IDEMPOTENCY_WAIT seconds for its
+# response, then gets a 409. Failures (exceptions, 5xx) release the key so the
+# client can retry them, unless the view committed its writes already.
+#
+# The lock and the stored response are written on their own connection, they
+# are committed whatever the view does with db.session. The lock is a lease of
+# IDEMPOTENCY_LOCK_TIMEOUT seconds renewed while the view runs, so only the
+# lock of a request that died is taken over by a retry. The view's commits mark
+# the key executed in their own transaction (before_commit below): a key whose
+# view committed is never run again, even when its response could not be
+# stored, the retries get a 409 until it expires (IDEMPOTENCY_TTL). A replayed
+# response does not log the client in again (the registrations), only the
+# first one sets the session cookie.
+
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.1
+
+outcomes = registry.register(Counter(
+    "http_idempotent_requests_total", "Requests carrying an Idempotency-Key, by outcome",
+    labels=("endpoint", "outcome")
+))
+
+
+def _request_hash():
+    digest = sha256(f"{request.method} {request.full_path}\n".encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _acquire(scope, key, request_hash, holder):
+    """ Insert the lock row of the key, False when another request holds it or already stored a response """
+    table = IdempotencyKey.__table__
+    now = datetime.now(local_timezone)
+    with db.engine.begin() as connection:
+        # an expired key (or the lock of a request that died, its lease not renewed) is free again
+        connection.execute(delete(table).where(
+            table.c.scope == scope, table.c.key == key, table.c.expires_at <= now
+        ))
+        inserted = connection.execute(
+            upsert(connection, table).values(
+                scope=scope, key=key, request_hash=request_hash, holder=holder, created_at=now,
+                expires_at=now + timedelta(seconds=current_app.config["IDEMPOTENCY_LOCK_TIMEOUT"])
+            ).on_conflict_do_nothing()
+        ).rowcount
+    return inserted == 1
+
+
+class _Lease:
+    """ Renews the lock of a running view every third of IDEMPOTENCY_LOCK_TIMEOUT, in a thread """
+
+    def __init__(self, scope, key, holder):
+        self.engine = db.engine
+        self.logger = current_app.logger
+        self.timeout = current_app.config["IDEMPOTENCY_LOCK_TIMEOUT"]
+        self.where = _held(scope, key, holder)
+        self.stopped = Event()
+        self.thread = Thread(target=self._renew, name="idempotency-lease", daemon=True)
+
+    def _renew(self):
+        table = IdempotencyKey.__table__
+        while not self.stopped.wait(self.timeout / 3):
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(update(table).where(*self.where, table.c.executed_at.is_(None)).values(
+                        expires_at=datetime.now(local_timezone) + timedelta(seconds=self.timeout)))
+            except Exception:
+                # the next renewal may succeed, before the lease runs out
+                self.logger.exception("Could not renew an Idempotency-Key lock")
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+
+def _held(scope, key, holder):
+    table = IdempotencyKey.__table__
+    return table.c.scope == scope, table.c.key == key, table.c.holder == holder
+
+
+@event.listens_for(Session, "before_commit")
+def _mark_executed(session):
+    """ Mark the key of the running view executed, in the transaction of its writes """
+    held = session.info.get("idempotency_key")
+    if held is None:
+        return
+    table = IdempotencyKey.__table__
+    now = datetime.now(local_timezone)
+    marked = session.execute(update(table).where(*_held(*held)).values(
+        executed_at=now, expires_at=now + timedelta(seconds=current_app.config["IDEMPOTENCY_TTL"])
+    )).rowcount
+    if not marked:
+        # the lease ran out and a retry took the key over, it runs the view instead
+        raise Conflict("A retry with this Idempotency-Key took over the request")
+
+
+def _find(scope, key):
+    table = IdempotencyKey.__table__
+    with db.engine.connect() as connection:
+        return connection.execute(select(table).where(table.c.scope == scope, table.c.key == key)).first()
+
+
+def _release(scope, key, holder):
+    """ Free the key for a retry, unless the view committed its writes """
+    table = IdempotencyKey.__table__
+    with db.engine.begin() as connection:
+        connection.execute(delete(table).where(*_held(scope, key, holder), table.c.executed_at.is_(None)))
+
+
+def _store(scope, key, holder, response):
+    table = IdempotencyKey.__table__
+    now = datetime.now(local_timezone)
+    with db.engine.begin() as connection:
+        connection.execute(update(table).where(*_held(scope, key, holder)).values(
+            status_code=response.status_code,
+            body=zlib.compress(response.get_data()),
+            content_type=response.content_type,
+            expires_at=now + timedelta(seconds=current_app.config["IDEMPOTENCY_TTL"]),
+        ))
+
+
+def _replay(row):
+    response = current_app.response_class(zlib.decompress(row.body), status=row.status_code,
+                                          content_type=row.content_type)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _run(view, args, kwargs):
+    """ The response of the view, the client errors it aborts with included """
+    try:
+        return make_response(view(*args, **kwargs))
+    except HTTPException as error:
+        if error.code is None or error.code >= 500:
+            raise
+        # nothing the view did before aborting is kept
+        db.session.rollback()
+        return make_response(current_app.handle_user_exception(error))
+
+
+def idempotent(view):
+    """ Run the view once per Idempotency-Key (of the user and endpoint), replay its response to the retries """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            abort(400, description=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters long")
+
+        endpoint = request.endpoint
+        scope = f"{endpoint}:{current_user.get_id() if current_user.is_authenticated else ''}"
+        request_hash = _request_hash()
+        holder = uuid4().hex
+
+        deadline = monotonic() + current_app.config["IDEMPOTENCY_WAIT"]
+        while not _acquire(scope, key, request_hash, holder):
+            # None: released (the first request failed) or expired meanwhile, try again
+            row = _find(scope, key)
+            if row is not None and row.request_hash != request_hash:
+                outcomes.inc(endpoint=endpoint, outcome="mismatch")
+                abort(422, description="This Idempotency-Key was already used for another request")
+            if row is not None and row.status_code is not None:
+                outcomes.inc(endpoint=endpoint, outcome="replayed")
+                return _replay(row)
+            if monotonic() >= deadline:
+                outcomes.inc(endpoint=endpoint, outcome="in_progress")
+                abort(409, description="A request with this Idempotency-Key is still in progress")
+            sleep(POLL_INTERVAL)
+
+        db.session.info["idempotency_key"] = (scope, key, holder)
+        try:
+            with _Lease(scope, key, holder):
+                response = _run(view, args, kwargs)
+        except BaseException:
+            _release(scope, key, holder)
+            raise
+        finally:
+            db.session.info.pop("idempotency_key", None)
+
+        if response.is_streamed:
+            _release(scope, key, holder)
+        elif response.status_code >= 500:
+            # stored when the view committed before failing, it is not run again
+            _release(scope, key, holder)
+            _store(scope, key, holder, response)
+        else:
+            _store(scope, key, holder, response)
+        outcomes.inc(endpoint=endpoint, outcome="executed")
+        return response
+
+    return wrapper
@@ -0,0 +1,40 @@
+#!/usr/bin/python3
+from threading import Lock
+from time import monotonic
+
+
+MAX_CACHED_LISTINGS = 1000  # entries kept in memory before the cache is reset
+
+
+class ListingCache:
+    """
+    In-memory cache of listing payloads (pages, facet counts). An entry is
+    used while the data it was built from is unchanged, the same `version`
+    (e.g. the change feed cursor of the tables read), and for `ttl` seconds at most.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        # key -> (stored_at, version, payload)
+        self._entries = {}
+
+    def get(self, key, version, ttl):
+        """ The payload stored under `key` for `version`, None when missing or stale """
+        with self.lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[1] != version or monotonic() - entry[0] > ttl:
+            return None
+        return entry[2]
+
+    def set(self, key, version, payload):
+        with self.lock:
+            if len(self._entries) >= MAX_CACHED_LISTINGS:
+                self._entries.clear()
+            self._entries[key] = (monotonic(), version, payload)
+
+    def clear(self):
+        with self.lock:
+            self._entries.clear()
+
+
+listing_cache = ListingCache()
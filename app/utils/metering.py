@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+from app.app import db, local_timezone
+from app.models.package import Package
+from app.models.user_package import UserPackage
+from app.models.session import Session
+from app.models.user_session import UserSession
+from datetime import datetime
+from sqlalchemy import select, update, func, case
+
+
+# attempts when the package picked was used up by a concurrent booking
+MAX_ATTEMPTS = 3
+
+
+def consume_session(user_id, session_type):
+    """
+    Take one session from an active, unexpired package of the user for
+    `session_type`, the one expiring first. The decrement is a single
+    conditional UPDATE in the caller's transaction: the row lock and the
+    `remaining_sessions > 0` check make concurrent bookings unable to
+    double-spend. Return (package_id, remaining_sessions), or None when
+    no package has sessions left.
+    """
+    user_packages = UserPackage.__table__
+
+    for _ in range(MAX_ATTEMPTS):
+        now = datetime.now(local_timezone)
+        available = (
+            (user_packages.c.user_id == user_id)
+            & user_packages.c.is_active
+            & (user_packages.c.remaining_sessions > 0)
+            & (user_packages.c.expiry_date > now)
+        )
+        package_id = db.session.execute(
+            select(user_packages.c.package_id)
+            .join(Package.__table__, Package.id == user_packages.c.package_id)
+            .where(available, Package.session_type == session_type)
+            .order_by(user_packages.c.expiry_date)
+            .limit(1)
+        ).scalar()
+        if package_id is None:
+            return None
+
+        consumed = db.session.execute(
+            update(user_packages)
+            .where(available, user_packages.c.package_id == package_id)
+            .values(remaining_sessions=user_packages.c.remaining_sessions - 1)
+            .returning(user_packages.c.package_id, user_packages.c.remaining_sessions)
+        ).first()
+        if consumed:
+            return tuple(consumed)
+
+    return None
+
+
+def backfill_remaining_sessions():
+    """
+    Fill the counter of the packages from before it (NULL, never set): the sessions
+    of the package less those of its type attended since it started with a package
+    session (the metered attendance, not the free bulk one), 0 at least.
+    The filled rows are never touched again, running it twice changes nothing.
+    Return the number of packages updated
+    """
+    user_packages = UserPackage.__table__
+    packages = Package.__table__
+    attended = (
+        select(func.count())
+        .select_from(UserSession.__table__)
+        .join(Session.__table__, Session.id == UserSession.session_id)
+        .join(packages, packages.c.id == user_packages.c.package_id)
+        .where(UserSession.user_id == user_packages.c.user_id,
+               UserSession.metered,
+               Session.type == packages.c.session_type,
+               UserSession.timestamp >= user_packages.c.timestamp)
+        .correlate(user_packages)
+        .scalar_subquery()
+    )
+    max_sessions = select(packages.c.max_sessions).where(packages.c.id == user_packages.c.package_id).scalar_subquery()
+    remaining = max_sessions - attended
+    updated = db.session.execute(
+        update(user_packages)
+        .where(user_packages.c.remaining_sessions.is_(None))
+        .values(remaining_sessions=case((remaining > 0, remaining), else_=0))
+    ).rowcount
+    db.session.commit()
+    return updated
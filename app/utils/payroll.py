@@ -0,0 +1,142 @@
+#!/usr/bin/python3
+from app.app import db
+from app.models.session import Session
+from app.models.user import User
+from app.models.teacher_minutes import TeacherDailyMinutes, TeacherMonthlyMinutes
+from app.utils.sql import upsert, supports_upsert, month_start
+from sqlalchemy import event, select, delete, insert, update, func
+from sqlalchemy.orm import attributes
+
+
+# (rollup table, name of its period column, function giving the period of a date)
+ROLLUPS = (
+    (TeacherDailyMinutes.__table__, "day", lambda day: day),
+    (TeacherMonthlyMinutes.__table__, "month", lambda day: day.replace(day=1)),
+)
+
+
+def add_minutes(connection, user_id, day, minutes, sessions):
+    """ Add (or remove, when negative) minutes and sessions to the rollups of a teacher-day """
+    for table, period, period_of in ROLLUPS:
+        key = {"user_id": user_id, period: period_of(day)}
+        if not supports_upsert(connection):
+            # other databases: update the row, insert it when missing
+            updated = connection.execute(
+                update(table).where(*(table.c[name] == value for name, value in key.items()))
+                .values(minutes=table.c.minutes + minutes, sessions=table.c.sessions + sessions)
+            ).rowcount
+            if not updated:
+                connection.execute(insert(table).values(minutes=minutes, sessions=sessions, **key))
+            continue
+
+        statement = upsert(connection, table).values(
+            user_id=user_id, minutes=minutes, sessions=sessions, **{period: period_of(day)})
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c[period]],
+            set_={
+                "minutes": table.c.minutes + statement.excluded.minutes,
+                "sessions": table.c.sessions + statement.excluded.sessions,
+            },
+        )
+        connection.execute(statement)
+
+
+# Keep the rollups up to date in the same flush (and transaction) as the session rows
+
+@event.listens_for(Session, "after_insert")
+def _session_inserted(mapper, connection, target):
+    add_minutes(connection, target.user_id, target.date, target.length, 1)
+
+
+@event.listens_for(Session, "after_delete")
+def _session_deleted(mapper, connection, target):
+    add_minutes(connection, target.user_id, target.date, -target.length, -1)
+
+
+@event.listens_for(Session, "after_update")
+def _session_updated(mapper, connection, target):
+    old = {}
+    for name in ("user_id", "date", "length"):
+        history = attributes.get_history(target, name)
+        old[name] = history.deleted[0] if history.deleted else getattr(target, name)
+    if old == {"user_id": target.user_id, "date": target.date, "length": target.length}:
+        return
+    add_minutes(connection, old["user_id"], old["date"], -old["length"], -1)
+    add_minutes(connection, target.user_id, target.date, target.length, 1)
+
+
+def rebuild_rollups(since=None):
+    """
+    Recompute the rollups from the sessions table, from the month of `since`
+    (a date) or entirely. Used for backfill, return the teacher-days rebuilt.
+    """
+    daily = TeacherDailyMinutes.__table__
+    monthly = TeacherMonthlyMinutes.__table__
+    dialect_name = db.session.connection().dialect.name
+    since = since.replace(day=1) if since else None
+
+    delete_daily, delete_monthly = delete(daily), delete(monthly)
+    sessions = select(
+        Session.user_id, Session.date, func.sum(Session.length), func.count(Session.id)
+    ).group_by(Session.user_id, Session.date)
+    # the rollups of deleted teachers are history (their sessions are gone), they are kept
+    existing_users = select(User.id)
+    delete_daily = delete_daily.where(daily.c.user_id.in_(existing_users))
+    delete_monthly = delete_monthly.where(monthly.c.user_id.in_(existing_users))
+    if since:
+        delete_daily = delete_daily.where(daily.c.day >= since)
+        delete_monthly = delete_monthly.where(monthly.c.month >= since)
+        sessions = sessions.where(Session.date >= since)
+
+    db.session.execute(delete_daily)
+    db.session.execute(delete_monthly)
+    rebuilt = db.session.execute(
+        insert(daily).from_select(["user_id", "day", "minutes", "sessions"], sessions)
+    ).rowcount
+
+    # months from the days just rebuilt
+    month = month_start(daily.c.day, dialect_name)
+    days = select(daily.c.user_id, month, func.sum(daily.c.minutes), func.sum(daily.c.sessions)).where(
+        daily.c.user_id.in_(existing_users)).group_by(daily.c.user_id, month)
+    if since:
+        days = days.where(daily.c.day >= since)
+    db.session.execute(insert(monthly).from_select(["user_id", "month", "minutes", "sessions"], days))
+
+    db.session.commit()
+    return rebuilt
+
+
+def payroll(month):
+    """
+    Payroll of a month (the first day of it) from the monthly rollups:
+    one row per teacher, paid User.salary per hour taught (the salary is an
+    hourly rate). The arithmetic is done by the database over the rollup rows.
+    The teachers deleted since are listed with their minutes, without a name or rate.
+    """
+    monthly = TeacherMonthlyMinutes.__table__
+    hours = monthly.c.minutes / 60.0
+    rows = db.session.execute(
+        select(
+            monthly.c.user_id, User.username, User.first_name, User.last_name, User.salary,
+            monthly.c.sessions, monthly.c.minutes,
+            hours.label("hours"),
+            (hours * func.coalesce(User.salary, 0)).label("amount"),
+        )
+        .outerjoin(User, User.id == monthly.c.user_id)
+        .where(monthly.c.month == month)
+        .order_by(User.username, monthly.c.user_id)
+    ).all()
+
+    return [
+        {
+            "teacher_id": row.user_id,
+            "username": row.username,
+            "name": f"{row.first_name} {row.last_name}" if row.username else None,
+            "hourly_rate": row.salary,
+            "sessions": row.sessions,
+            "minutes": row.minutes,
+            "hours": round(row.hours, 2),
+            "amount": round(row.amount, 2),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,123 @@
+#!/usr/bin/python3
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from tempfile import NamedTemporaryFile
+from threading import Lock
+import logging
+import os
+
+
+CHUNK_SIZE = 64 * 1024  # bytes read from the request at a time
+
+# accepted content types, with their extension and file signature (the bytes expected at each offset)
+PHOTO_TYPES = {
+    "image/jpeg": ("jpg", ((0, b"\xff\xd8\xff"),)),
+    "image/png": ("png", ((0, b"\x89PNG\r\n\x1a\n"),)),
+    # RIFF, the file size, then WEBP
+    "image/webp": ("webp", ((0, b"RIFF"), (8, b"WEBP"))),
+}
+# bytes read before the signature is checked
+SIGNATURE_SIZE = max(offset + len(magic) for _, signature in PHOTO_TYPES.values() for offset, magic in signature)
+
+logger = logging.getLogger(__name__)
+
+# thumbnails are generated off the request thread
+_thumbnail_workers = None
+_thumbnail_workers_lock = Lock()
+
+
+class PhotoTooLarge(ValueError):
+    pass
+
+
+def _matches(header, signature):
+    return all(header[offset:offset + len(magic)] == magic for offset, magic in signature)
+
+
+def store_photo(stream, content_type, folder, max_size):
+    """
+    Stream an uploaded photo to disk in chunks, hashing it on the way.
+    Photos are stored under their SHA-256 (content-addressed), so uploading
+    the same file twice keeps a single copy. Return the stored relative path.
+    """
+    extension, signature = PHOTO_TYPES[content_type]
+    invalid = f"The uploaded file is not a valid {content_type} image"
+    os.makedirs(folder, exist_ok=True)
+
+    digest = sha256()
+    size = 0
+    header = b""
+    # same folder as the final file, so the rename below is atomic
+    with NamedTemporaryFile(dir=folder, prefix=".upload-", delete=False) as temporary:
+        try:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                # the first chunks can be shorter than the signature, it is checked once all its bytes are read
+                if len(header) < SIGNATURE_SIZE:
+                    header += chunk[:SIGNATURE_SIZE - len(header)]
+                    if len(header) == SIGNATURE_SIZE and not _matches(header, signature):
+                        raise ValueError(invalid)
+                size += len(chunk)
+                if size > max_size:
+                    raise PhotoTooLarge(f"Photo must be at most {max_size} bytes")
+                digest.update(chunk)
+                temporary.write(chunk)
+            if size == 0:
+                raise ValueError("The uploaded photo is empty")
+            if len(header) < SIGNATURE_SIZE and not _matches(header, signature):
+                raise ValueError(invalid)
+        except BaseException:
+            temporary.close()
+            os.remove(temporary.name)
+            raise
+
+    hexdigest = digest.hexdigest()
+    relative_path = f"{hexdigest[:2]}/{hexdigest}.{extension}"
+    path = os.path.join(folder, relative_path)
+    if os.path.exists(path):
+        # duplicate upload, keep the stored copy
+        os.remove(temporary.name)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temporary.name, path)
+
+    return relative_path
+
+
+def thumbnail_path(relative_path):
+    """ Relative path of the thumbnail of a stored photo """
+    name, extension = os.path.splitext(relative_path)
+    return f"{name}.thumb{extension}"
+
+
+def _make_thumbnail(source, destination, size):
+    from PIL import Image
+
+    if os.path.exists(destination):
+        return
+    with Image.open(source) as image:
+        image.thumbnail((size, size))
+        temporary = f"{destination}.tmp"
+        image.save(temporary, format=image.format)
+    os.replace(temporary, destination)
+
+
+def _log_failure(future):
+    if future.exception():
+        logger.error(f"Thumbnail generation failed: {future.exception()}")
+
+
+def schedule_thumbnail(folder, relative_path, size, workers):
+    """ Generate the thumbnail of a stored photo in the worker pool """
+    global _thumbnail_workers
+    if _thumbnail_workers is None:
+        with _thumbnail_workers_lock:
+            if _thumbnail_workers is None:
+                _thumbnail_workers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnail")
+
+    future = _thumbnail_workers.submit(_make_thumbnail, os.path.join(folder, relative_path),
+                                       os.path.join(folder, thumbnail_path(relative_path)), size)
+    future.add_done_callback(_log_failure)
+    return future
@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from collections import Counter
+from contextvars import ContextVar
+from time import perf_counter
+from app.utils.metrics import registry, Histogram
+
+
+request_queries = registry.register(Histogram(
+    "http_request_db_queries", "SQL statements executed by a request",
+    labels=("endpoint",), buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500)
+))
+request_db_time = registry.register(Histogram(
+    "http_request_db_seconds", "Time a request spent executing SQL statements",
+    labels=("endpoint",)
+))
+
+# stats of the request whose queries run on the async engine's event loop (app/utils/async_db.py)
+async_stats = ContextVar("async_stats", default=None)
+
+
+def current_stats():
+    """ The stats of the current request, None outside of a request """
+    if not has_request_context():
+        return None
+    return g.get("query_stats")
+
+
+# the start time lives on the execution context, so a failed statement leaves nothing behind on the connection
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.query_start = perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "query_start", None)
+    elapsed = perf_counter() - start if start is not None else 0.0
+
+    # only the statements of a request are counted (not those of the background tasks)
+    stats = current_stats() or async_stats.get()
+    if stats is None:
+        return
+
+    stats["count"] += 1
+    stats["time"] += elapsed
+    if stats["statements"] is not None:
+        # the parameters are bound separately, so an N+1 repeats the same statement text
+        stats["statements"][statement] += 1
+
+
+def init_query_stats(app):
+    """
+    Count the statements and the DB time of every request, reported in a
+    Server-Timing header and in the /metrics histograms.
+    In debug mode, statements repeated QUERY_REPEAT_THRESHOLD times or more
+    by one request are logged (the N+1 signature)
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = {
+            "count": 0,
+            "time": 0.0,
+            "statements": Counter() if app.debug else None
+        }
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.pop("query_stats", None)
+        if stats is None:
+            return response
+
+        endpoint = request.endpoint or "unmatched"
+        request_queries.observe(stats["count"], endpoint=endpoint)
+        request_db_time.observe(stats["time"], endpoint=endpoint)
+
+        response.headers.add(
+            "Server-Timing", f'db;dur={stats["time"] * 1000:.2f};desc="{stats["count"]} queries"'
+        )
+
+        if stats["statements"]:
+            threshold = app.config["QUERY_REPEAT_THRESHOLD"]
+            for statement, count in stats["statements"].most_common():
+                if count < threshold:
+                    break
+                app.logger.warning(
+                    f"Possible N+1 in {endpoint}: statement executed {count} times: {' '.join(statement.split())}"
+                )
+
+        return response
@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+from app.app import db, local_timezone
+from app.models.package import Package
+from app.models.user import User
+from app.models.user_package import UserPackage
+from app.models.package_revenue import PackageRevenue, ReportWatermark
+from app.utils.sql import upsert, month_start
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+
+
+REPORT = "package_revenue"
+# rows newer than this are left for the next refresh, their transactions may still be running
+SETTLE_DELAY = timedelta(minutes=1)
+
+# dimensions the revenue can be grouped by
+DIMENSIONS = {
+    "month": PackageRevenue.month,
+    "package": PackageRevenue.package_id,
+    "country": PackageRevenue.country,
+}
+
+
+def refresh_revenue():
+    """
+    Add the user_packages rows written since the last refresh to the
+    package_revenue aggregates, with one INSERT ... SELECT ... ON CONFLICT.
+    Return the number of aggregate rows touched.
+    """
+    connection = db.session.connection()
+    user_packages = UserPackage.__table__
+    revenue = PackageRevenue.__table__
+
+    # the row lock serializes concurrent refreshes (one per worker), so no rows are counted twice
+    watermark = db.session.get(ReportWatermark, REPORT, with_for_update=True)
+    until = datetime.now(local_timezone) - SETTLE_DELAY
+
+    month = month_start(user_packages.c.timestamp, connection.dialect.name)
+    new_rows = (
+        select(month, user_packages.c.package_id, User.country,
+               func.count(), func.sum(Package.price))
+        .join(Package, Package.id == user_packages.c.package_id)
+        .join(User, User.id == user_packages.c.user_id)
+        .where(user_packages.c.timestamp <= until)
+        .group_by(month, user_packages.c.package_id, User.country)
+    )
+    if watermark:
+        new_rows = new_rows.where(user_packages.c.timestamp > watermark.refreshed_until)
+
+    statement = upsert(connection, revenue).from_select(
+        ["month", "package_id", "country", "subscriptions", "revenue"], new_rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[revenue.c.month, revenue.c.package_id, revenue.c.country],
+        set_={
+            "subscriptions": revenue.c.subscriptions + statement.excluded.subscriptions,
+            "revenue": revenue.c.revenue + statement.excluded.revenue,
+        },
+    )
+    touched = db.session.execute(statement).rowcount
+
+    if watermark:
+        watermark.refreshed_until = until
+    else:
+        db.session.add(ReportWatermark(report=REPORT, refreshed_until=until))
+    db.session.commit()
+    return touched
+
+
+def revenue_query(start_month=None, end_month=None, group_by=("month", "package", "country")):
+    """ Revenue from the aggregates, between two months (included), grouped by the given dimensions """
+    columns = [DIMENSIONS[dimension].label(dimension) for dimension in group_by]
+    query = select(
+        *columns,
+        func.sum(PackageRevenue.subscriptions).label("subscriptions"),
+        func.sum(PackageRevenue.revenue).label("revenue"),
+    )
+    if start_month:
+        query = query.where(PackageRevenue.month >= start_month)
+    if end_month:
+        query = query.where(PackageRevenue.month <= end_month)
+    if columns:
+        query = query.group_by(*columns).order_by(*columns)
+    return query
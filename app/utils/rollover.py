@@ -0,0 +1,169 @@
+#!/usr/bin/python3
+from app.app import db, local_timezone
+from app.models.group import Group
+from app.models.group_day import GroupDay
+from app.utils.changes import record_changes_from
+from app.utils.sql import add_days
+from datetime import datetime
+from sqlalchemy import select, insert, func, case, cast, literal, null
+from sqlalchemy.orm import aliased
+
+
+# Term rollover: the groups of a term (start date in a window, optionally
+# filtered) are cloned into the next one with two INSERT ... SELECT, the
+# groups then their days, in one transaction. The dates are shifted by the
+# distance between the two terms, the names remapped by a rule, the teachers
+# copied on request. The clones are matched to their source by their new
+# (unique) name, so no id goes through Python whatever the number of groups.
+
+PREVIEW_SIZE = 100
+NAME_LENGTH = Group.__table__.c.group.type.length
+
+
+class RolloverConflict(ValueError):
+    """ Some new names are taken, duplicated or too long, nothing was cloned """
+
+    def __init__(self, conflicts):
+        super().__init__(f"{len(conflicts)} group(s) cannot be rolled over")
+        self.conflicts = conflicts
+
+
+def name_rule(pattern=None, replace=None):
+    """
+    Function building the SQL expression of a new name from the old one:
+    `pattern` with "{name}" standing for the old name (e.g. "{name} - Spring"),
+    or `replace` a (old, new) substring replacement (e.g. ("Fall", "Spring"))
+    """
+    if replace:
+        old, new = replace
+        if not old:
+            raise ValueError("The replaced part of the name cannot be empty")
+        return lambda name: func.replace(name, old, new)
+    if not pattern or pattern.count("{name}") != 1:
+        raise ValueError("The name pattern must contain {name} once")
+    prefix, suffix = pattern.split("{name}")
+    return lambda name: literal(prefix) + name + literal(suffix)
+
+
+class Rollover:
+    """ Rollover of the groups starting in [source_start, source_end] to a term starting at target_start """
+
+    def __init__(self, source_start, source_end, target_start, rename, statuses=None, search=None,
+                 copy_teachers=False):
+        if source_end < source_start:
+            raise ValueError("The end of the source term must be after its start")
+        self.source_start = source_start
+        self.source_end = source_end
+        self.shift = (target_start - source_start).days
+        if self.shift == 0:
+            raise ValueError("The target term starts on the same day as the source term")
+        self.rename = rename
+        self.statuses = statuses
+        self.search = search
+        self.copy_teachers = copy_teachers
+        self.dialect_name = db.session.connection().dialect.name
+
+    def _source(self, group=Group):
+        """ Condition selecting the source groups """
+        conditions = [group.start_date >= self.source_start, group.start_date <= self.source_end]
+        if self.statuses:
+            conditions.append(group.status.in_(self.statuses))
+        if self.search:
+            # % and _ in the search are matched literally
+            conditions.append(group.group.icontains(self.search, autoescape=True))
+        return conditions
+
+    def _clone_columns(self):
+        """ SQL expressions of the columns of the clone of a source group """
+        today = datetime.now(local_timezone).date()
+        start_date = add_days(Group.start_date, self.shift, self.dialect_name)
+        end_date = add_days(Group.end_date, self.shift, self.dialect_name)
+        return {
+            "group": self.rename(Group.group),
+            "size": Group.size,
+            # same rule as create_group, from the new dates
+            "status": cast(case((start_date > today, "coming"), (end_date >= today, "running"), else_="finished"),
+                           Group.status.type),
+            "start_date": start_date,
+            "end_date": end_date,
+            "teacher_id": Group.teacher_id if self.copy_teachers else null(),
+        }
+
+    def _clones(self):
+        """ Select of the source groups with the columns of their clone """
+        return select(
+            Group.id.label("source_id"), Group.group.label("source_group"),
+            *(expression.label(name) for name, expression in self._clone_columns().items())
+        ).where(*self._source())
+
+    def preview(self):
+        """ The source groups, their clones and the conflicts on the new names (nothing is written) """
+        clones = db.session.execute(self._clones().order_by(Group.start_date, Group.id)).mappings().all()
+        new_names = [clone["group"] for clone in clones]
+        taken = set()
+        for start in range(0, len(new_names), 1000):
+            taken.update(db.session.scalars(select(Group.group).where(Group.group.in_(new_names[start:start + 1000]))))
+
+        seen, conflicts = set(), []
+        for clone in clones:
+            name = clone["group"]
+            reason = ("name_taken" if name in taken else "duplicate_name" if name in seen
+                      else "name_too_long" if len(name) > NAME_LENGTH else None)
+            seen.add(name)
+            if reason:
+                conflicts.append({"source_id": clone["source_id"], "source_group": clone["source_group"],
+                                  "group": name, "reason": reason})
+
+        days = db.session.scalar(
+            select(func.count()).select_from(GroupDay).join(Group, Group.id == GroupDay.group_id).where(*self._source())
+        )
+        return {
+            "shift_days": self.shift,
+            "groups": len(clones),
+            "group_days": days,
+            "conflicts": conflicts,
+            "preview": [dict(clone) for clone in clones[:PREVIEW_SIZE]],
+        }
+
+    def run(self):
+        """
+        Clone the groups and their days, in the current transaction (the caller
+        commits). Raise RolloverConflict, before writing anything, when a new
+        name cannot be used. Return the preview with the counts cloned.
+        """
+        summary = self.preview()
+        if summary["conflicts"]:
+            raise RolloverConflict(summary["conflicts"])
+
+        connection = db.session.connection()
+        groups = Group.__table__
+        now = datetime.now(local_timezone)
+        last_id = db.session.scalar(select(func.coalesce(func.max(Group.id), 0)))
+
+        columns = self._clone_columns()
+        columns["created_at"] = columns["updated_at"] = literal(now, groups.c.created_at.type)
+        groups_cloned = connection.execute(insert(groups).from_select(
+            list(columns), select(*columns.values()).where(*self._source())
+        )).rowcount
+
+        # source -> clone, through the new name (the clones are the only groups above last_id with it)
+        source, clone = aliased(Group), aliased(Group)
+        pairs = (
+            select(source.id.label("source_id"), clone.id.label("clone_id"))
+            .join(clone, clone.group == self.rename(source.group))
+            .where(*self._source(source), source.id <= last_id, clone.id > last_id)
+        ).subquery()
+        days_cloned = connection.execute(insert(GroupDay.__table__).from_select(
+            ["group_id", "day_id", "time"],
+            select(pairs.c.clone_id, GroupDay.day_id, GroupDay.time).join(pairs, pairs.c.source_id == GroupDay.group_id)
+        )).rowcount
+
+        # the change feed, set-based as well
+        record_changes_from(connection, "groups", "insert", select(pairs.c.clone_id.label("group_id")))
+        record_changes_from(connection, "group_days", "insert", select(
+            GroupDay.group_id.label("group_id"), GroupDay.day_id.label("item_id")
+        ).where(GroupDay.group_id.in_(select(pairs.c.clone_id))))
+
+        summary["groups"] = groups_cloned
+        summary["group_days"] = days_cloned
+        return summary
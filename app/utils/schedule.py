@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+from bisect import bisect_left, insort
+from threading import RLock
+from time import monotonic
+
+
+MAX_CACHED_DAYS = 10000  # teacher-days kept in memory before the index is reset
+
+
+class TeacherSchedule:
+    """
+    In-memory interval index of the sessions of each teacher per day, a fast
+    pre-check rejecting most double bookings before the database check.
+    A teacher-day is loaded from the database on first use and reloaded
+    once it is older than `ttl` seconds, so it can miss the sessions created
+    by other processes meanwhile (the database check catches those).
+    """
+
+    def __init__(self):
+        self.lock = RLock()
+        # (teacher_id, date) -> (loaded_at, [(start_time, end_time, session_id), ...] sorted)
+        self._days = {}
+
+    def _intervals(self, teacher_id, day, ttl):
+        key = (teacher_id, day)
+        entry = self._days.get(key)
+        if entry is None or monotonic() - entry[0] > ttl:
+            from app.models.session import Session
+
+            if len(self._days) >= MAX_CACHED_DAYS:
+                self._days.clear()
+
+            rows = Session.query.with_entities(Session.start_time, Session.end_time, Session.id).filter(
+                Session.user_id == teacher_id, Session.date == day
+            ).order_by(Session.start_time).all()
+            entry = (monotonic(), [tuple(row) for row in rows])
+            self._days[key] = entry
+        return entry[1]
+
+    def find_overlap(self, teacher_id, day, start_time, end_time, ttl):
+        """ Return the id of a session overlapping [start_time, end_time), or None """
+        with self.lock:
+            intervals = self._intervals(teacher_id, day, ttl)
+            # the intervals do not overlap, so only the last one starting
+            # before end_time can reach past start_time
+            index = bisect_left(intervals, (end_time,))
+            if index and intervals[index - 1][1] > start_time:
+                return intervals[index - 1][2]
+            return None
+
+    def add(self, teacher_id, day, start_time, end_time, session_id):
+        with self.lock:
+            key = (teacher_id, day)
+            if key in self._days:
+                insort(self._days[key][1], (start_time, end_time, session_id))
+
+    def invalidate(self, teacher_id, day):
+        with self.lock:
+            self._days.pop((teacher_id, day), None)
+
+
+teacher_schedule = TeacherSchedule()
@@ -0,0 +1,265 @@
+#!/usr/bin/python3
+from flask import current_app
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timedelta
+from random import Random
+from sqlalchemy import insert, select, func, text
+from app.app import db, bcrypt, local_timezone
+from app.utils.ids import uuid7_from
+
+
+# Synthetic, production-shaped data. Everything is derived from the seed and
+# the row index (one random generator per block of BLOCK rows, chunks are
+# made of whole blocks), so the same seed always generates the same dataset,
+# whatever the chunk size, and the chunks can be loaded in any order, by any process.
+
+BLOCK = 100
+
+ROLES = ("admin", "teacher", "student")
+LANGUAGES = ("ar", "en", "fr")
+DAYS = ("Saturday", "Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+COUNTRIES = ("Egypt", "Saudi Arabia", "Jordan", "Morocco", "Kuwait", "Qatar", "Oman", "Tunisia")
+NATIONALITIES = ("Egyptian", "Saudi", "Jordanian", "Moroccan", "Kuwaiti", "Qatari", "Omani", "Tunisian")
+TIME_ZONES = ("Africa/Cairo", "Asia/Riyadh", "Asia/Amman", "Africa/Casablanca", "Asia/Kuwait", "Asia/Qatar")
+GROUP_STATUSES = ("coming", "running", "finished")
+MIN_GROUP_SIZE, MAX_GROUP_SIZE = 20, 60
+SEED_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z, registration time of the first user
+
+
+class Plan:
+    """ Sizes of the dataset, and the index ranges of each role (admins, then teachers, then students) """
+
+    def __init__(self, seed, users, groups, requests, prefix):
+        self.seed = seed
+        self.users = users
+        self.groups = groups
+        self.requests = requests
+        self.prefix = prefix
+        self.admins = max(1, users // 1000)
+        self.teachers = max(1, users // 20)
+        self.first_student = self.admins + self.teachers
+        if self.first_student >= users:
+            raise ValueError("Not enough users for the admins, teachers and students")
+
+    def role(self, index):
+        if index < self.admins:
+            return "admin"
+        if index < self.first_student:
+            return "teacher"
+        return "student"
+
+    def user_id(self, index):
+        """
+        Deterministic UUID7 of the user at `index`, as if the users registered
+        one per millisecond from SEED_EPOCH_MS: the seed and the index in the random bits
+        """
+        return str(uuid7_from(SEED_EPOCH_MS + index, 0, (self.seed & 0x3FFFFFFF) << 32 | index))
+
+    def rng(self, kind, index):
+        """ Random generator of the block of `kind` rows starting at `index` """
+        return Random(f"{self.seed}:{kind}:{index // BLOCK}")
+
+
+def _user_rows(plan, start, stop, password, role_ids, language_ids, now):
+    rows = []
+    for index in range(start, stop):
+        if index % BLOCK == 0:
+            rng = plan.rng("users", index)
+        role = plan.role(index)
+        country = rng.randrange(len(COUNTRIES))
+        rows.append({
+            "id": plan.user_id(index),
+            "username": f"{plan.prefix}u{index}",
+            "email": f"{plan.prefix}u{index}@example.com",
+            "password": password,
+            "phone_number": f"+9{plan.seed % 1000:03d}{index:09d}",
+            "first_name": f"First{index % 9973}",
+            "last_name": f"Last{index % 7919}",
+            "photo": None,
+            "birth_date": date(1960, 1, 1) + timedelta(days=rng.randrange(45 * 365)),
+            "gender": rng.choice(("MALE", "FEMALE")),
+            "nationality": NATIONALITIES[country],
+            "country": COUNTRIES[country],
+            "time_zone": TIME_ZONES[country % len(TIME_ZONES)],
+            "parent_phone_number": f"+8{plan.seed % 1000:03d}{index:09d}" if role == "student" else None,
+            "level": rng.randint(1, 10) if role == "student" else None,
+            "national_id": f"{plan.prefix}N{index}" if role == "teacher" else None,
+            "salary": None,
+            "privileges": None,
+            "position": None,
+            "is_active": True,
+            "last_login": now - timedelta(minutes=rng.randrange(60 * 24 * 90)),
+            "role_id": role_ids[role],
+            "language_id": rng.choice(language_ids),
+            "created_at": now,
+            "updated_at": now,
+        })
+    return rows
+
+
+def _group_rows(plan, start, stop, first_group_id, day_ids, now):
+    """ Rows of the groups [start, stop), with their days, members and requests """
+    groups, group_days, members, requests = [], [], [], []
+    students = plan.users - plan.first_student
+    requests_per_group, extra_requests = divmod(plan.requests, plan.groups)
+
+    for index in range(start, stop):
+        if index % BLOCK == 0:
+            rng = plan.rng("groups", index)
+        group_id = first_group_id + index
+        size = rng.randint(MIN_GROUP_SIZE, MAX_GROUP_SIZE)
+        start_date = date(2024, 1, 6) + timedelta(weeks=rng.randrange(150))
+        groups.append({
+            "id": group_id,
+            "group": f"{plan.prefix} group {index}",
+            "size": size,
+            "status": rng.choice(GROUP_STATUSES),
+            "start_date": start_date,
+            "end_date": start_date + timedelta(weeks=rng.choice((8, 12, 16))),
+            # one group in ten has no teacher yet
+            "teacher_id": plan.user_id(plan.admins + rng.randrange(plan.teachers)) if rng.random() >= 0.1 else None,
+            "created_at": now,
+            "updated_at": now,
+        })
+
+        for day_id in rng.sample(day_ids, rng.randint(1, 3)):
+            group_days.append({"group_id": group_id, "day_id": day_id, "time": time(rng.randint(8, 21))})
+
+        for student in rng.sample(range(students), min(students, rng.randint(0, size))):
+            members.append({"user_id": plan.user_id(plan.first_student + student), "group_id": group_id,
+                            "timestamp": now})
+
+        for _ in range(requests_per_group + (index < extra_requests)):
+            requests.append({
+                "user_id": plan.user_id(plan.first_student + rng.randrange(students)),
+                "group_id": group_id,
+                "action": "join" if rng.random() < 0.8 else "leave",
+                "role": "student",
+                "status": rng.choice(("pending", "approved", "rejected")),
+                "note": None,
+                "created_at": now,
+                "updated_at": now,
+            })
+
+    return groups, group_days, members, requests
+
+
+def _load_users(plan, start, stop, password, role_ids, language_ids, now):
+    from app.models.user import User
+
+    rows = _user_rows(plan, start, stop, password, role_ids, language_ids, now)
+    db.session.execute(insert(User), rows)
+    db.session.commit()
+    return len(rows)
+
+
+def _load_groups(plan, start, stop, first_group_id, day_ids, now):
+    from app.models.group import Group
+    from app.models.group_day import GroupDay
+    from app.models.user_group import UserGroup
+    from app.models.group_request import GroupRequest
+
+    loaded = 0
+    for model, rows in zip((Group, GroupDay, UserGroup, GroupRequest),
+                           _group_rows(plan, start, stop, first_group_id, day_ids, now)):
+        if rows:
+            db.session.execute(insert(model), rows)
+            loaded += len(rows)
+    db.session.commit()
+    return loaded
+
+
+# Worker processes: one app (and connection pool) per process
+
+_worker_app = None
+
+
+def _init_worker(database_uri):
+    global _worker_app
+    from app.app import create_app
+
+    _worker_app = create_app({"SQLALCHEMY_DATABASE_URI": database_uri,
+                              "PACKAGE_EXPIRY_INTERVAL": 0, "REVENUE_REFRESH_INTERVAL": 0})
+
+
+def _run_in_worker(func, *args):
+    with _worker_app.app_context():
+        return func(*args)
+
+
+def _reference_ids(model, column, values, extra=None):
+    """ Ids of the reference rows (roles, languages, days), created when missing """
+    existing = dict(db.session.execute(select(column, model.id).where(column.in_(values))).all())
+    for value in values:
+        if value not in existing:
+            row = model(**{column.key: value}, **(extra(value) if extra else {}))
+            db.session.add(row)
+            db.session.flush()
+            existing[value] = row.id
+    return existing
+
+
+def generate(seed, users, groups, requests, prefix="seed", chunk_size=10000, workers=1, progress=None):
+    """
+    Insert `users` users, `groups` groups (with their days and members) and
+    `requests` group requests, by chunks of `chunk_size` rows loaded by
+    `workers` processes. Returns the number of rows inserted by phase
+    ("users", then "groups" with their days, members and requests)
+    """
+    from app.models.role import Role
+    from app.models.language import Language
+    from app.models.day import Day
+    from app.models.group import Group
+
+    plan = Plan(seed, users, groups, requests, prefix)
+    now = datetime.now(local_timezone).replace(microsecond=0)
+
+    role_ids = _reference_ids(Role, Role.role, ROLES, lambda role: {"description": role})
+    language_ids = list(_reference_ids(Language, Language.language, LANGUAGES).values())
+    day_ids = list(_reference_ids(Day, Day.day, DAYS).values())
+    first_group_id = (db.session.scalar(select(func.max(Group.id))) or 0) + 1
+    db.session.commit()
+
+    # everybody shares the password "password", hashed once
+    password = bcrypt.generate_password_hash("password").decode()
+
+    # chunks of whole blocks, the groups come with their members and requests (smaller chunks)
+    group_chunk = max(BLOCK, chunk_size // (MAX_GROUP_SIZE + requests // max(groups, 1)) // BLOCK * BLOCK)
+    chunk_size = max(BLOCK, chunk_size // BLOCK * BLOCK)
+    phases = [
+        ("users", _load_users, [(plan, start, min(start + chunk_size, users), password, role_ids, language_ids, now)
+                                for start in range(0, users, chunk_size)]),
+        ("groups", _load_groups, [(plan, start, min(start + group_chunk, groups), first_group_id, day_ids, now)
+                                  for start in range(0, groups, group_chunk)]),
+    ]
+
+    loaded = {}
+    if workers > 1:
+        database_uri = current_app.config["SQLALCHEMY_DATABASE_URI"]
+        # the parent's connections must not be shared with the workers
+        db.engine.dispose()
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(database_uri,)) as executor:
+            for name, load, chunks in phases:
+                # users first, the groups reference them
+                loaded[name] = 0
+                futures = [executor.submit(_run_in_worker, load, *chunk) for chunk in chunks]
+                for future in futures:
+                    rows = future.result()
+                    loaded[name] += rows
+                    if progress:
+                        progress(name, rows)
+    else:
+        for name, load, chunks in phases:
+            loaded[name] = 0
+            for chunk in chunks:
+                rows = load(*chunk)
+                loaded[name] += rows
+                if progress:
+                    progress(name, rows)
+
+    # the group ids were given explicitly, move the sequence past them
+    if db.engine.dialect.name == "postgresql":
+        db.session.execute(text("SELECT setval(pg_get_serial_sequence('groups', 'id'), (SELECT max(id) FROM groups))"))
+        db.session.commit()
+
+    return loaded
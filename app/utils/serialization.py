@@ -0,0 +1,146 @@
+#!/usr/bin/python3
+from flask.json.provider import DefaultJSONProvider
+from functools import lru_cache
+import re
+
+
+# Same output as strftime("%a, %d %b %Y %I:%M:%S %p") and strftime("%I:%M:%S %p")
+# in the C locale, without going through the libc formatter for every field
+_WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MONTHS = ("", "Jan", "Feb", "Mar", "Apr", "May", "Jun",
+           "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def format_time(value):
+    """ Format a time (or datetime) as "%I:%M:%S %p" """
+    hour = value.hour
+    return f"{hour % 12 or 12:02d}:{value.minute:02d}:{value.second:02d} {'PM' if hour >= 12 else 'AM'}"
+
+
+def format_datetime(value):
+    """ Format a datetime (or date, at midnight) as "%a, %d %b %Y %I:%M:%S %p" """
+    hour = getattr(value, "hour", 0)
+    return (f"{_WEEKDAYS[value.weekday()]}, {value.day:02d} {_MONTHS[value.month]} {value.year} "
+            f"{hour % 12 or 12:02d}:{getattr(value, 'minute', 0):02d}:{getattr(value, 'second', 0):02d} "
+            f"{'PM' if hour >= 12 else 'AM'}")
+
+
+def _read(path):
+    """
+    Expression reading an attribute path of `row`: loaded attributes are taken
+    straight from the instance dict, skipping the ORM descriptor, the others
+    (expired, deferred or not loaded relationships) go through it as usual
+    """
+    name, _, rest = path.partition(".")
+    expression = f"(state[{name!r}] if {name!r} in state else row.{name})"
+    return f"{expression}.{rest}" if rest else expression
+
+
+def compile_encoder(api_fields, fields=None):
+    """
+    Generate the function building the response dictionary of a row, reading
+    only the requested fields. A field is described by either:
+      - "attribute.path": read as is
+      - ("attribute.path", formatter): read and passed to the formatter
+      - a callable: called with the row
+    """
+    namespace = {}
+    items = []
+    for index, (name, spec) in enumerate(api_fields.items()):
+        if fields is not None and name not in fields:
+            continue
+
+        if callable(spec):
+            namespace[f"_field_{index}"] = spec
+            expression = f"_field_{index}(row)"
+        elif isinstance(spec, tuple):
+            path, formatter = spec
+            namespace[f"_field_{index}"] = formatter
+            expression = f"_field_{index}({_read(path)})"
+        else:
+            expression = _read(spec)
+
+        items.append(f"{name!r}: {expression}")
+
+    source = ("def encode(row):\n"
+              "    state = row.__dict__\n"
+              "    return {" + ", ".join(items) + "}\n")
+    exec(source, namespace)
+    return namespace["encode"]
+
+
+@lru_cache(maxsize=256)
+def model_encoder(model, fields=None):
+    """ Compiled encoder of a model for a fieldset (a frozenset, or None for all the fields) """
+    return compile_encoder(model.api_fields, fields)
+
+
+_NON_ASCII = re.compile(r"[^\x00-\x7f]")
+
+
+def _escape_non_ascii(match):
+    # \uXXXX escapes like json.dumps(ensure_ascii=True), astral characters as a surrogate pair
+    code = ord(match.group())
+    if code > 0xFFFF:
+        code -= 0x10000
+        return f"\\u{0xD800 | code >> 10:04x}\\u{0xDC00 | code & 0x3FF:04x}"
+    return f"\\u{code:04x}"
+
+
+def escape_non_ascii(text):
+    """ JSON text with its non-ASCII characters escaped (they only appear in strings) """
+    return text if text.isascii() else _NON_ASCII.sub(_escape_non_ascii, text)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson, select it with JSON_BACKEND=orjson.
+    Same output as the Flask provider (its sort_keys and ensure_ascii settings
+    and date format) except for floats: orjson writes the exponent without a
+    sign (1e16, not 1e+16) and NaN and Infinity as null, not as the invalid
+    NaN and Infinity of the stdlib. The options orjson has no equivalent for
+    go to the stdlib encoder.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        import orjson
+        self._orjson = orjson
+
+    def _options(self, indent=False, sort_keys=True):
+        orjson = self._orjson
+        # dates go through the Flask default (HTTP date) like the default provider
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault("default", self.default)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        indent = kwargs.get("indent")
+        separators = kwargs.get("separators")
+        # the layouts orjson writes: compact, or indented by 2 with the json.dumps default separators
+        orjson_layout = (indent is None and separators == (",", ":")) or (indent == 2 and separators is None)
+        if set(kwargs) - {"default", "ensure_ascii", "sort_keys", "indent", "separators"} or not orjson_layout:
+            # e.g. the default ", " separators or cls
+            return super().dumps(obj, **kwargs)
+        text = self._orjson.dumps(obj, default=kwargs["default"],
+                                  option=self._options(indent == 2, kwargs["sort_keys"])).decode("utf-8")
+        return escape_non_ascii(text) if kwargs["ensure_ascii"] else text
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return self._orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is None and self._app.debug or self.compact is False
+        body = self._orjson.dumps(obj, default=self.default, option=self._options(indent, self.sort_keys))
+        if self.ensure_ascii and not body.isascii():
+            body = escape_non_ascii(body.decode("utf-8")).encode("ascii")
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+from zlib import crc32
+from sqlalchemy import func, select, Date
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+# dialects with INSERT ... ON CONFLICT, the others need a fallback (see supports_upsert)
+UPSERT_DIALECTS = ("postgresql", "sqlite")
+
+
+def supports_upsert(connection):
+    return connection.dialect.name in UPSERT_DIALECTS
+
+
+def upsert(connection, table):
+    """ INSERT ... ON CONFLICT of the connection's dialect (check supports_upsert first) """
+    if connection.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    if connection.dialect.name == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"INSERT ... ON CONFLICT is not supported on {connection.dialect.name}")
+
+
+def month_start(column, dialect_name):
+    """ SQL expression of the first day of the month of a date/datetime column """
+    if dialect_name == "postgresql":
+        return func.date_trunc("month", column).cast(Date)
+    return func.date(column, "start of month")
+
+
+def add_days(column, days, dialect_name):
+    """ SQL expression of a date column shifted by `days` days """
+    if dialect_name == "postgresql":
+        return column + days
+    return func.date(column, f"{days:+d} days", type_=Date)
+
+
+def try_advisory_lock(session, name):
+    """
+    Take the transaction-level advisory lock `name` (Postgres), False when another
+    transaction holds it. Always True elsewhere (SQLite has a single writer)
+    """
+    if session.connection().dialect.name != "postgresql":
+        return True
+    return session.scalar(select(func.pg_try_advisory_xact_lock(crc32(name.encode()))))
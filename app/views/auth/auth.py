@@ -4,7 +4,9 @@ from flask_login import login_user, logout_user, login_required, current_user
 from datetime import datetime
 import re
 from app.app import db, limiter
+from app.utils.idempotency import idempotent
 from app.models.user import User
+from app.models.account_deletion import AccountDeletion
 from app.models.role import Role
 from app.models.language import Language
 
@@ -13,6 +15,7 @@ auth = Blueprint("auth", __name__)
 # Teacher Registration route
 @auth.route("/register_teacher", methods=["POST"])
 @limiter.limit("5/minute")
+@idempotent  # Retries with the same Idempotency-Key get the first response
 def register_teacher():
     # Retrieve data from the request body as JSON
     user_data = request.get_json()
@@ -138,6 +141,7 @@ def register_teacher():
 # Student Registration route
 @auth.route("/register_student", methods=["POST"])
 @limiter.limit("5/minute")
+@idempotent  # Retries with the same Idempotency-Key get the first response
 def register_student():
     # Retrieve data from the request body as JSON
     user_data = request.get_json()
@@ -286,6 +290,11 @@ def login():
         abort(401, description="Invalid email")
     if not user.check_password(user_data["password"]):
         abort(401, description="Invalid password")
+    if not user.is_active:
+        # only the accounts queued for deletion are deleted, the others are deactivated
+        if AccountDeletion.query.filter_by(user_id=user.id).first():
+            abort(401, description="This account has been deleted")
+        abort(401, description="This account has been deactivated")
 
     remember_me = False 
     if "remember_me" in user_data:
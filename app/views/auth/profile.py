@@ -1,10 +1,15 @@
 #!/usr/bin/python3
-from flask import Blueprint, request, jsonify, abort
+from flask import Blueprint, request, jsonify, abort, current_app, url_for, send_from_directory
 from flask_login import logout_user, login_required, current_user
 import re
 from app.models.user import User
 from app.models.language import Language
+from app.models.account_deletion import AccountDeletion
+from app.tasks.account_deletion import purge_pending_accounts
+from app.tasks.background import wake_worker
+from app.utils.photos import PHOTO_TYPES, PhotoTooLarge, store_photo, schedule_thumbnail, thumbnail_path
 from app.app import db
+from app.utils.conditional import conditional_response, model_etag
 
 
 profile = Blueprint("profile", __name__)
@@ -15,7 +20,15 @@ profile = Blueprint("profile", __name__)
 @login_required
 def get_profile():
     """ get the logged in user profile """
-    return jsonify(current_user.to_dict()), 200
+    # sparse fieldset, e.g. ?fields=id,username,role
+    try:
+        fields = User.parse_fields(request.args.get("fields"))
+    except ValueError as error:
+        abort(400, description=str(error))
+
+    # answer from the ETag before serializing (and loading role and language)
+    etag = model_etag("profile", current_user.id, current_user.updated_at, fields)
+    return conditional_response(etag, lambda: current_user.to_dict(fields))
 
 
 # Protected profile update route
@@ -88,6 +101,48 @@ def update_profile():
     }), 200
 
 
+@profile.route("/photo", methods=["PATCH"])
+@login_required
+def update_photo():
+    """ Upload the logged in user photo (the raw image as the request body) """
+    if request.mimetype not in PHOTO_TYPES:
+        abort(400, description=f"Photo must be one of: {', '.join(PHOTO_TYPES)}")
+
+    max_size = current_app.config["MAX_PHOTO_SIZE"]
+    if request.content_length and request.content_length > max_size:
+        abort(413, description=f"Photo must be at most {max_size} bytes")
+
+    folder = current_app.config["PHOTO_FOLDER"]
+
+    # streamed to disk in chunks, the photo is never held in memory
+    try:
+        photo_path = store_photo(request.stream, request.mimetype, folder, max_size)
+    except PhotoTooLarge as error:
+        abort(413, description=str(error))
+    except ValueError as error:
+        abort(400, description=str(error))
+
+    schedule_thumbnail(folder, photo_path, current_app.config["THUMBNAIL_SIZE"],
+                       current_app.config["THUMBNAIL_WORKERS"])
+
+    current_user.photo = url_for("profile.get_photo", filename=photo_path)
+    db.session.commit()
+
+    return jsonify({
+        "status": "success",
+        "message": "Photo Updated Successfully",
+        "photo": current_user.photo,
+        "thumbnail": url_for("profile.get_photo", filename=thumbnail_path(photo_path))
+    }), 200
+
+
+@profile.route("/photos/<path:filename>")
+@login_required
+def get_photo(filename):
+    """ Serve a stored photo or thumbnail """
+    return send_from_directory(current_app.config["PHOTO_FOLDER"], filename, max_age=31536000)
+
+
 @profile.route("/delete_account", methods=["DELETE"])
 @login_required
 def delete_account():
@@ -109,10 +164,15 @@ def delete_account():
     if not current_user.check_password(password):
         abort(400, description="Incorrect password")
 
-    db.session.delete(current_user)
+    # deactivate the account now, its rows are removed in batches by the purger
+    # (the background worker of this process, or `flask accounts purge`)
+    current_user.is_active = False
+    db.session.add(AccountDeletion(user_id=current_user.id))
     db.session.commit()
     logout_user()
 
+    wake_worker(purge_pending_accounts)
+
     return jsonify({
         "status": "success",
         "message": "User Account Deleted Successfully"
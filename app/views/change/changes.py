@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+from flask import Blueprint, jsonify, request, abort
+from flask_login import login_required, current_user
+from sqlalchemy import select, tuple_
+from app.app import db, limiter
+from app.models.group import Group
+from app.models.group_day import GroupDay
+from app.models.group_request import GroupRequest
+from app.models.user_group import UserGroup
+from app.utils import changes as change_feed
+from app.utils.serialization import format_datetime, format_time
+
+changes = Blueprint("changes", __name__)
+
+MAX_LIMIT = 1000
+
+
+def _visible_groups(user, groups):
+    """ Ids of the `groups` the user can view (same rules as GET /groups/<id>) """
+    role = user.role.role
+    if role == "admin":
+        return {group.id for group in groups}
+    if role == "teacher":
+        return {group.id for group in groups if group.teacher_id == user.id}
+    member_of = set(db.session.scalars(select(UserGroup.group_id).where(UserGroup.user_id == user.id)))
+    return {group.id for group in groups if group.status == "coming" or group.id in member_of}
+
+
+def _current_rows(rows, user):
+    """
+    The changes of a page the user can see and the current state of their groups, days and
+    requests, one query per table. The changes of the groups (and their days) the user cannot
+    view are dropped; the delete of a group, gone with its row, is kept for every user
+    """
+    group_ids = {row.group_id for row in rows if row.table_name == "groups"}
+    day_keys = {(row.group_id, row.item_id) for row in rows if row.table_name == "group_days"}
+    request_ids = {row.item_id for row in rows if row.table_name == "group_requests"}
+
+    # the groups of the changed days too, for their visibility
+    all_group_ids = group_ids | {group_id for group_id, _ in day_keys}
+    groups = Group.query.filter(Group.id.in_(all_group_ids)).options(*Group.load_options()).all() \
+        if all_group_ids else []
+    visible = _visible_groups(user, groups)
+    existing = {group.id for group in groups}
+    rows = [row for row in rows if row.table_name not in ("groups", "group_days") or row.group_id in visible
+            or (row.group_id not in existing and row.operation == "delete")]
+    day_keys = {key for key in day_keys if key[0] in visible}
+    days = GroupDay.query.filter(tuple_(GroupDay.group_id, GroupDay.day_id).in_(day_keys)).all() if day_keys else []
+    requests = GroupRequest.query.filter(GroupRequest.id.in_(request_ids)).all() if request_ids else []
+
+    return rows, {
+        "groups": {(group.id,): group.to_dict() for group in groups if group.id in visible & group_ids},
+        "group_days": {(day.group_id, day.day_id): {"group_id": day.group_id, "day_id": day.day_id,
+                                                    "time": format_time(day.time)} for day in days},
+        "group_requests": {(group_request.id,): group_request.to_dict() for group_request in requests},
+    }
+
+
+# change_log columns identifying the current row of a change, per table
+DATA_KEYS = {
+    "groups": ("group_id",),
+    "group_days": ("group_id", "item_id"),
+    "group_requests": ("item_id",),
+}
+
+
+def _change_to_dict(row, current):
+    # the key with the column names of the changed table
+    key = {name: getattr(row, column) for column, name in change_feed.KEYS[row.table_name].items()}
+    data = None
+    if row.operation != "delete" and row.table_name in DATA_KEYS:
+        data = current[row.table_name].get(tuple(getattr(row, column) for column in DATA_KEYS[row.table_name]))
+    return {
+        "cursor": change_feed.format_cursor((row.txid, row.id)),
+        "table": row.table_name,
+        "operation": row.operation,
+        "key": key,
+        "data": data,
+        "changed_at": format_datetime(row.changed_at),
+    }
+
+
+@changes.route("", methods=["GET"])
+@login_required  # Ensure the user is logged in
+@limiter.limit("120/hour")  # Clients poll the feed
+def get_changes():
+    """
+    Changes to the groups, their days, members and requests after the `since`
+    cursor the user can see, with the current state of the changed rows
+    (`data`, null when deleted). Without `since`, only the current cursor: take
+    it, download the listing, then poll from it.
+    """
+    user = current_user
+
+    limit = request.args.get("limit", default=500, type=int)
+    if limit <= 0 or limit > MAX_LIMIT:
+        abort(400, description=f"limit must be between 1 and {MAX_LIMIT}.")
+
+    since = request.args.get("since")
+    if since is None:
+        return jsonify({"changes": [], "cursor": change_feed.format_cursor(change_feed.latest_cursor()),
+                        "has_more": False})
+
+    try:
+        since = change_feed.parse_cursor(since)
+    except ValueError:
+        abort(400, description="Invalid cursor.")
+
+    if change_feed.is_expired(since):
+        abort(410, description="The changes after this cursor were purged, download the listing again.")
+
+    # admins see every change, the others their own memberships and requests too
+    rows, has_more = change_feed.read_changes(since, limit, None if user.role.role == "admin" else user)
+    visible_rows, current = _current_rows(rows, user)
+
+    return jsonify({
+        "changes": [_change_to_dict(row, current) for row in visible_rows],
+        # past the last change read, the dropped ones included
+        "cursor": change_feed.format_cursor((rows[-1].txid, rows[-1].id)) if rows else change_feed.format_cursor(since),
+        "has_more": has_more,
+    })
@@ -1,15 +1,26 @@
 #!/usr/bin/python3
-from flask import Blueprint, jsonify, request, abort
+from flask import Blueprint, jsonify, request, abort, current_app
 from flask_login import login_required, current_user
 from datetime import datetime
 import re
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import joinedload
-from app.app import db, limiter
+from app.app import db, limiter, local_timezone
 from app.models.group import Group
 from app.models.user import User
 from app.models.day import Day
 from app.models.group_day import GroupDay
 from app.models.group_request import GroupRequest
+from app.models.user_group import UserGroup
+from app.utils import async_db
+from app.utils.changes import latest_cursor
+from app.utils.conditional import conditional_response, model_etag
+from app.utils.facets import facet_counts, page_with_facets
+from app.utils.idempotency import idempotent
+from app.utils.listing_cache import listing_cache
+from app.utils.rollover import Rollover, RolloverConflict, name_rule
+from app.utils.serialization import format_datetime
 
 groups = Blueprint("groups", __name__)
 
@@ -38,7 +49,8 @@ def get_groups():
         all_groups = query.filter_by(status="coming")
     
     if search:
-        all_groups = all_groups.filter(Group.group.ilike(f"%{search}%"))
+        # % and _ in the search are matched literally
+        all_groups = all_groups.filter(Group.group.icontains(search, autoescape=True))
 
     if status :
         valid_statuses = {"coming", "running", "finished"}
@@ -53,6 +65,14 @@ def get_groups():
         except ValueError:
             abort(400, description="Size Must be an INTEGER.")
 
+    # sparse fieldset, only the requested columns and relationships are loaded
+    try:
+        fields = Group.parse_fields(request.args.get("fields"))
+    except ValueError as error:
+        abort(400, description=str(error))
+
+    all_groups = all_groups.options(*Group.load_options(fields))
+
     # handle pagination
     page = request.args.get("page", default=1, type=int)
     per_page = request.args.get("per_page", default=10, type=int)
@@ -60,24 +80,85 @@ def get_groups():
     if page <= 0 or per_page <= 0:
         abort(400, description="Pagination parameters must be positive integers.")
 
-    paginated_groups = all_groups.paginate(page=page, per_page=per_page, error_out=False)
+    # ?facets=true adds the number of matching groups per status, size bucket and day
+    with_facets = request.args.get("facets", "false").lower() == "true"
+
+    # the pages and facets are cached per role and filters, until the groups or their days change
+    ttl = current_app.config["GROUPS_CACHE_TTL"]
+    version = latest_cursor(("groups", "group_days")) if ttl > 0 else None
+    filters = (user.role.role, search, status, size)
+    page_key = ("groups", filters, tuple(sorted(fields)) if fields else None, page, per_page)
+    facets_key = ("group_facets", filters)
+    payload = listing_cache.get(page_key, version, ttl) if ttl > 0 else None
+    facets = listing_cache.get(facets_key, version, ttl) if ttl > 0 and with_facets else None
+    cached_facets = facets
+
+    if payload is None:
+        if with_facets:
+            # the page and the facets in one aggregate query, which gives the total (no COUNT)
+            paginated_groups, facets = page_with_facets(all_groups, page, per_page, current_app.config, facets)
+        elif current_app.config["ASYNC_READS"]:
+            # the page and the total count concurrently, on the async engine
+            paginated_groups = async_db.paginate(current_app.config, all_groups.statement, page, per_page)
+        else:
+            paginated_groups = all_groups.paginate(page=page, per_page=per_page, error_out=False)
+
+        payload = {
+            "groups": [group.to_dict(fields) for group in paginated_groups.items],
+            "total_groups": paginated_groups.total,
+            "total_pages": paginated_groups.pages,
+            "current_page": paginated_groups.page,
+            "next_page": paginated_groups.next_num if paginated_groups.has_next else None,
+            "prev_page": paginated_groups.prev_num if paginated_groups.has_prev else None,
+        }
+        if ttl > 0:
+            listing_cache.set(page_key, version, payload)
 
-    all_groups = [group.to_dict() for group in paginated_groups.items]
+    if not with_facets:
+        # Return the groups with pagination metadata
+        return jsonify(payload)
 
-    # Return the groups with pagination metadata
-    return jsonify({
-        "groups": all_groups,
-        "total_groups": paginated_groups.total,
-        "total_pages": paginated_groups.pages,
-        "current_page": paginated_groups.page,
-        "next_page": paginated_groups.next_num if paginated_groups.has_next else None,
-        "prev_page": paginated_groups.prev_num if paginated_groups.has_prev else None,
-    })
+    if facets is None:
+        facets = facet_counts(all_groups)
+    if ttl > 0 and cached_facets is None:
+        listing_cache.set(facets_key, version, facets)
+
+    # Return the groups with pagination metadata and the facets
+    return jsonify({**payload, "facets": facets[1]})
+
+
+@groups.route("/<int:group_id>", methods=["GET"])
+@login_required  # Ensure the user is logged in
+def get_group(group_id):
+
+    # Get the current logged-in user
+    user = current_user
+
+    # load the group row only, the days are loaded when the payload is built
+    group_to_view = Group.query.get(group_id)
+    if not group_to_view:
+        abort(404, description=f"Group with ID: {group_id} not Found")
+
+    # Access control
+    if user.role.role == "teacher" and group_to_view.teacher_id != user.id:
+        abort(403, description="You can only view groups you teach.")
+    elif user.role.role == "student" and group_to_view.status != "coming" and user not in group_to_view.users:
+        abort(403, description="You can only view coming groups or groups you are enrolled in.")
+
+    # sparse fieldset, e.g. ?fields=id,group,status
+    try:
+        fields = Group.parse_fields(request.args.get("fields"))
+    except ValueError as error:
+        abort(400, description=str(error))
+
+    etag = model_etag("group", group_to_view.id, group_to_view.updated_at, fields)
+    return conditional_response(etag, lambda: group_to_view.to_dict(fields))
 
 
 @groups.route("/create_group", methods=["POST"])
 @login_required  # Ensure the user is logged in
 @limiter.limit("5/minute")  # Rate limit to prevent abuse
+@idempotent  # Retries with the same Idempotency-Key get the first response
 def create_group():
     # Get the current logged-in user
     user = User.query.get(current_user.id)
@@ -201,6 +282,98 @@ def create_group():
 
 
 
+@groups.route("/rollover", methods=["POST"])
+@login_required  # Ensure the user is logged in
+@limiter.limit("5/minute")  # Rate limit to prevent abuse
+@idempotent  # Retries with the same Idempotency-Key get the first response
+def rollover_groups():
+    """
+    Clone the groups of a term (and their days) into a new date range,
+    or preview it with "dry_run": true.
+    """
+    # Check if the user is an admin
+    if current_user.role.role != "admin":
+        abort(403, description="Only admins can roll groups over.")
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        abort(400, description="Invalid or missing JSON data. Ensure the request body contains valid JSON.")
+
+    required_fields = ["source_start", "source_end", "target_start"]
+
+    # Check for missing fields
+    missing_fields = [field for field in required_fields if not data.get(field)]
+    if missing_fields:
+        abort(400, description=f"Missing fields: {', '.join(missing_fields)}")
+
+    # Validate date format
+    try:
+        source_start, source_end, target_start = (
+            datetime.strptime(data[field], "%Y-%m-%d").date() for field in required_fields)
+    except (TypeError, ValueError):
+        abort(400, description="Invalid date format. Use YYYY-MM-DD")
+
+    # JSON booleans only, "false" is a string
+    invalid_flags = [flag for flag in ("copy_teachers", "dry_run")
+                     if flag in data and not isinstance(data[flag], bool)]
+    if invalid_flags:
+        abort(400, description=f"{', '.join(invalid_flags)} must be true or false.")
+
+    search = data.get("search")
+    if search is not None and not isinstance(search, str):
+        abort(400, description="search must be a string.")
+
+    statuses = data.get("statuses")
+    if statuses is not None and (not isinstance(statuses, list)
+                                 or not set(statuses) <= {"coming", "running", "finished"}):
+        abort(400, description="statuses must be a list of 'coming', 'running' or 'finished'.")
+
+    # New names: a pattern around the old name, or a replacement in it
+    rename = data.get("rename")
+    try:
+        if rename is not None:
+            if not isinstance(rename, dict) or not isinstance(rename.get("from"), str) \
+                    or not isinstance(rename.get("to"), str):
+                abort(400, description="rename must be an object with 'from' and 'to' strings.")
+            rule = name_rule(replace=(rename["from"], rename["to"]))
+        else:
+            rule = name_rule(pattern=data.get("name_pattern"))
+        rollover = Rollover(source_start, source_end, target_start, rule, statuses=statuses,
+                            search=search, copy_teachers=data.get("copy_teachers", False))
+    except ValueError as error:
+        abort(400, description=str(error))
+
+    if data.get("dry_run"):
+        summary = rollover.preview()
+        status_code = 200
+    else:
+        try:
+            summary = rollover.run()
+            db.session.commit()
+        except RolloverConflict as error:
+            db.session.rollback()
+            return jsonify({
+                "status": "error: Conflict",
+                "message": str(error),
+                "conflicts": error.conflicts,
+            }), 409
+        except IntegrityError:
+            # a group took one of the new names meanwhile
+            db.session.rollback()
+            abort(409, description="A group name was taken during the rollover, nothing was cloned. Try again.")
+        status_code = 201
+
+    for clone in summary["preview"]:
+        clone["start_date"] = format_datetime(clone["start_date"])
+        clone["end_date"] = format_datetime(clone["end_date"])
+
+    return jsonify({
+        "status": "success",
+        "dry_run": bool(data.get("dry_run")),
+        **summary,
+    }), status_code
+
+
 @groups.route("/update_group/<int:group_id>", methods=["PATCH"])
 @login_required  # Ensure the user is logged in
 def update_group(group_id):
@@ -353,6 +526,9 @@ def update_group(group_id):
                     if day_id not in current_day_ids:
                         db.session.delete(group_day)
 
+                # the groups row itself is untouched, bump updated_at to change its ETag
+                group_to_update.updated_at = datetime.now(local_timezone)
+
                 is_updated = True
 
 
@@ -403,6 +579,7 @@ def delete_group(group_id):
 @groups.route("/add_student_to_group/<int:group_id>/<student_id>", methods=["POST"])
 @login_required  # Ensure the user is logged in
 @limiter.limit("10/minute")
+@idempotent  # Retries with the same Idempotency-Key get the first response
 def add_student_to_group(group_id, student_id):
 
     # Get the current logged-in user
@@ -438,6 +615,8 @@ def add_student_to_group(group_id, student_id):
         abort(400, description="Group capacity has been reached.")
 
     group_to_join.users.append(student_to_add)
+    # membership lives in user_groups, bump updated_at to change the group ETags
+    group_to_join.updated_at = datetime.now(local_timezone)
     db.session.commit()
 
 
@@ -466,24 +645,48 @@ def get_student_list_of_group(group_id):
     if user.role.role != "admin":
         abort(403, description="Only admins can view students list of groups.")
     
-    # check if the group is exists
-    # group_to_view = Group.query.get(group_id) # inefficient way query for each uesr in the list
-    group_to_view = Group.query.options(joinedload(Group.users)).get(group_id) # query one time for the group and uesrs in the list
-    if not group_to_view:
+    # check the ETag first, only the id and updated_at columns are read for it
+    group_version = db.session.query(Group.id, Group.updated_at).filter_by(id=group_id).first()
+    if not group_version:
         abort(404, description=f"Group with ID: {group_id} not Found")
 
-    return jsonify({
-        "status": "success",
-        "message": f"Student list has been retrieved for group: ({group_to_view.group}).",
-        "group": {
-            "id": group_to_view.id,
-            "name": group_to_view.group,
-            "status": group_to_view.status,
-            "remaining_capacity": group_to_view.size - len(group_to_view.users),
-            "total_students": len(group_to_view.users),
-            "students": [{"id": user.id, "username": user.username} for user in group_to_view.users]
+    def build_student_list():
+        if current_app.config["ASYNC_READS"]:
+            # the group and its students concurrently, on the async engine
+            async def group_row(session):
+                return await session.get(Group, group_id)
+
+            async def student_rows(session):
+                result = await session.execute(
+                    select(User.id, User.username)
+                    .join(UserGroup, UserGroup.user_id == User.id)
+                    .where(UserGroup.group_id == group_id)
+                )
+                return result.all()
+
+            group_to_view, students = async_db.run(current_app.config, group_row, student_rows)
+        else:
+            # group_to_view = Group.query.get(group_id) # inefficient way query for each uesr in the list
+            group_to_view = Group.query.options(joinedload(Group.users)).get(group_id) # query one time for the group and uesrs in the list
+            students = group_to_view.users if group_to_view else []
+        if not group_to_view:
+            abort(404, description=f"Group with ID: {group_id} not Found")
+
+        return {
+            "status": "success",
+            "message": f"Student list has been retrieved for group: ({group_to_view.group}).",
+            "group": {
+                "id": group_to_view.id,
+                "name": group_to_view.group,
+                "status": group_to_view.status,
+                "remaining_capacity": group_to_view.size - len(students),
+                "total_students": len(students),
+                "students": [{"id": user.id, "username": user.username} for user in students]
+            }
         }
-    }), 200
+
+    etag = model_etag("group_students", group_version.id, group_version.updated_at)
+    return conditional_response(etag, build_student_list)
 
 
 
@@ -521,6 +724,8 @@ def remove_student_from_group(group_id, student_id):
 
     # Remove the student from the group
     group_to_edit.users.remove(student_to_remove)
+    # membership lives in user_groups, bump updated_at to change the group ETags
+    group_to_edit.updated_at = datetime.now(local_timezone)
     db.session.commit()
 
     # Return a response
@@ -675,6 +880,7 @@ def remove_teacher_from_group(group_id):
 @groups.route("/send_request/<int:group_id>", methods=["POST"])
 @login_required
 @limiter.limit("5/minute")
+@idempotent  # Retries with the same Idempotency-Key get the first response
 def send_request_to_group(group_id):
     """
     Allows a user to send a request to join a group.
@@ -763,16 +969,28 @@ def view_pending_requests():
 
     query = query.filter_by(status="pending")
 
+    # sparse fieldset, only the requested columns are selected
+    try:
+        fields = GroupRequest.parse_fields(request.args.get("fields"))
+    except ValueError as error:
+        abort(400, description=str(error))
+
+    query = query.options(*GroupRequest.load_options(fields))
+
     page = request.args.get("page", default=1, type=int)
     per_page = request.args.get("per_page", default=10, type=int)
 
     if page <= 0 or per_page <= 0:
         abort(400, description="Pagination parameters must be positive integers.")
 
-    paginated_requests = query.paginate(page=page, per_page=per_page, error_out=False)
+    if current_app.config["ASYNC_READS"]:
+        # the page and the total count concurrently, on the async engine
+        paginated_requests = async_db.paginate(current_app.config, query.statement, page, per_page)
+    else:
+        paginated_requests = query.paginate(page=page, per_page=per_page, error_out=False)
 
     # Fetch pending requests
-    pending_requests = [req.to_dict() for req in paginated_requests.items]
+    pending_requests = [req.to_dict(fields) for req in paginated_requests.items]
 
     # Return the groups with pagination metadata
     return jsonify({
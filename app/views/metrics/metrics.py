@@ -0,0 +1,19 @@
+#!/usr/bin/python3
+from flask import Blueprint, Response, request, abort, current_app
+from hmac import compare_digest
+from app.app import limiter
+from app.utils.metrics import registry
+
+metrics = Blueprint("metrics", __name__)
+
+
+@metrics.route("", methods=["GET"])
+@limiter.exempt
+def get_metrics():
+    """ Metrics of this process in the Prometheus text format """
+    # Check the scraper token, when one is configured
+    token = current_app.config["METRICS_TOKEN"]
+    if token and not compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        abort(401, description="Invalid metrics token.")
+
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+from flask import Blueprint, jsonify, request, abort, Response, stream_with_context
+from flask_login import login_required, current_user
+from datetime import datetime
+import csv
+import io
+from app.app import db
+from app.utils.payroll import payroll
+from app.utils.revenue import revenue_query, DIMENSIONS
+
+reports = Blueprint("reports", __name__)
+
+
+@reports.route("/payroll", methods=["GET"])
+@login_required  # Ensure the user is logged in
+def get_payroll():
+    """
+    Teachers payroll of a month (?month=YYYY-MM, the current month by default):
+    the hours taught times the teacher's salary, an hourly rate
+    """
+    user = current_user
+
+    # Check if the user is an admin
+    if user.role.role != "admin":
+        abort(403, description="Only admins can view the payroll.")
+
+    try:
+        month = datetime.strptime(request.args.get("month"), "%Y-%m").date() \
+            if request.args.get("month") else datetime.today().date().replace(day=1)
+    except ValueError:
+        abort(400, description="Invalid month format. Use YYYY-MM")
+
+    teachers = payroll(month)
+
+    return jsonify({
+        "status": "success",
+        "month": month.strftime("%Y-%m"),
+        "teachers": teachers,
+        "total_hours": round(sum(teacher["hours"] for teacher in teachers), 2),
+        "total_amount": round(sum(teacher["amount"] for teacher in teachers), 2)
+    }), 200
+
+
+@reports.route("/revenue", methods=["GET"])
+@login_required  # Ensure the user is logged in
+def get_revenue():
+    """
+    Revenue by month, package and country from the precomputed aggregates.
+    ?start=YYYY-MM&end=YYYY-MM filter the months, ?group_by=month,package,country
+    picks the dimensions and ?format=csv streams the rows as CSV.
+    """
+    user = current_user
+
+    # Check if the user is an admin
+    if user.role.role != "admin":
+        abort(403, description="Only admins can view the revenue.")
+
+    try:
+        start_month = datetime.strptime(request.args["start"], "%Y-%m").date() if request.args.get("start") else None
+        end_month = datetime.strptime(request.args["end"], "%Y-%m").date() if request.args.get("end") else None
+    except ValueError:
+        abort(400, description="Invalid month format. Use YYYY-MM")
+
+    group_by = [dimension.strip() for dimension in request.args.get("group_by", "month,package,country").split(",")
+                if dimension.strip()]
+    invalid_dimensions = [dimension for dimension in group_by if dimension not in DIMENSIONS]
+    if invalid_dimensions:
+        abort(400, description=f"Invalid group_by: {', '.join(invalid_dimensions)}. Use month, package or country.")
+
+    query = revenue_query(start_month, end_month, group_by)
+
+    if request.args.get("format") == "csv":
+        def generate():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow([*group_by, "subscriptions", "revenue"])
+            rows = db.session.execute(query.execution_options(yield_per=1000))
+            for row in rows:
+                writer.writerow([value.strftime("%Y-%m") if dimension == "month" else value
+                                 for dimension, value in zip(group_by, row)] + [row.subscriptions, row.revenue])
+                if buffer.tell() > 16 * 1024:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+
+        return Response(stream_with_context(generate()), mimetype="text/csv",
+                        headers={"Content-Disposition": "attachment; filename=revenue.csv"})
+
+    rows = db.session.execute(query).all()
+    return jsonify({
+        "status": "success",
+        "revenue": [
+            {
+                **{dimension: row._mapping[dimension].strftime("%Y-%m") if dimension == "month"
+                   else row._mapping[dimension] for dimension in group_by},
+                "subscriptions": row.subscriptions,
+                "revenue": row.revenue
+            }
+            for row in rows
+        ],
+        "total_subscriptions": sum(row.subscriptions for row in rows),
+        "total_revenue": sum(row.revenue for row in rows)
+    }), 200
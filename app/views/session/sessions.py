@@ -0,0 +1,269 @@
+#!/usr/bin/python3
+from flask import Blueprint, jsonify, request, abort, current_app
+from flask_login import login_required, current_user
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from app.app import db, limiter
+from app.models.session import Session
+from app.models.user import User
+from app.models.user_session import UserSession
+from app.models.user_group import UserGroup
+from app.models.group import Group
+from app.utils.schedule import teacher_schedule
+from app.utils.metering import consume_session
+from app.utils.attendance import record_attendance
+
+sessions = Blueprint("sessions", __name__)
+
+
+@sessions.route("/", methods=["GET"], strict_slashes=False)
+@login_required  # Ensure the user is logged in
+def get_sessions():
+    """
+    List the sessions of the logged in user in a date range
+    (the current week, starting Saturday, by default).
+    Teachers get the sessions they teach, students the sessions they attend.
+    """
+    user = current_user
+
+    # handle the date range
+    today = datetime.today().date()
+    week_start = today - timedelta(days=(today.weekday() - 5) % 7)  # Saturday
+    try:
+        start_date = datetime.strptime(request.args.get("start_date"), "%Y-%m-%d").date() \
+            if request.args.get("start_date") else week_start
+        end_date = datetime.strptime(request.args.get("end_date"), "%Y-%m-%d").date() \
+            if request.args.get("end_date") else start_date + timedelta(days=6)
+    except ValueError:
+        abort(400, description="Invalid date format. Use YYYY-MM-DD")
+
+    if start_date > end_date:
+        abort(400, description="End date must be after start date.")
+
+    role = user.role.role
+    if role == "student":
+        # sessions attended, through user_sessions
+        query = Session.query.join(UserSession, UserSession.session_id == Session.id).filter(
+            UserSession.user_id == user.id)
+    else:
+        # admins can view the sessions of any teacher
+        teacher_id = request.args.get("teacher_id") if role == "admin" else None
+        query = Session.query.filter(Session.user_id == (teacher_id or user.id))
+
+    # served from the (user_id, date) index
+    user_sessions = query.filter(
+        Session.date >= start_date, Session.date <= end_date
+    ).order_by(Session.date, Session.start_time).all()
+
+    return jsonify({
+        "status": "success",
+        "sessions": [session.to_dict() for session in user_sessions],
+        "total_sessions": len(user_sessions),
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat()
+    }), 200
+
+
+@sessions.route("/create_session", methods=["POST"])
+@login_required  # Ensure the user is logged in
+@limiter.limit("10/minute")  # Rate limit to prevent abuse
+def create_session():
+    user = current_user
+
+    # Check if the user is a teacher
+    if user.role.role != "teacher":
+        abort(403, description="Only teachers can create sessions.")
+
+    session_data = request.get_json()
+
+    required_fields = ["date", "start_time", "end_time", "type"]
+
+    # Check for missing fields
+    missing_fields = [field for field in required_fields if field not in session_data]
+    if missing_fields:
+        abort(400, description=f"Missing fields: {', '.join(missing_fields)}")
+
+    # Check for empty fields
+    empty_fields = [field for field in required_fields if not session_data[field]]
+    if empty_fields:
+        abort(400, description=f"Empty fields: {', '.join(empty_fields)}")
+
+    # Validate date format
+    try:
+        session_date = datetime.strptime(session_data["date"], "%Y-%m-%d").date()
+    except ValueError:
+        abort(400, description="Invalid date format. Use YYYY-MM-DD")
+
+    # Validate times
+    try:
+        start_time = datetime.strptime(session_data["start_time"], "%I:%M:%S %p").time()
+        end_time = datetime.strptime(session_data["end_time"], "%I:%M:%S %p").time()
+    except ValueError:
+        abort(400, description="Invalid time format. Use HH:MM:SS AM/PM.")
+
+    if start_time >= end_time:
+        abort(400, description="End time must be after start time.")
+
+    # Validate type
+    if session_data["type"] not in {"private", "group"}:
+        abort(400, description="Invalid type. Must be 'private' or 'group'.")
+
+    # Validate the group taught in a group session (optional)
+    group_id = session_data.get("group_id")
+    if group_id is not None:
+        if session_data["type"] != "group":
+            abort(400, description="Only group sessions can have a group.")
+        group = Group.query.get(group_id) if type(group_id) is int else None
+        if not group:
+            abort(404, description=f"Group with ID: {group_id} not Found")
+        if group.teacher_id != user.id:
+            abort(403, description="You can only create sessions for groups you teach.")
+
+    ttl = current_app.config["SESSION_INDEX_TTL"]
+
+    # fast pre-check on the in-memory index, it may miss the sessions booked by other
+    # workers since it was loaded, the database check below decides
+    overlapping_id = teacher_schedule.find_overlap(user.id, session_date, start_time, end_time, ttl)
+    if overlapping_id:
+        abort(409, description=f"This session overlaps your session with ID: {overlapping_id}.")
+
+    # lock the teacher row until the commit, the bookings of a teacher are serialized
+    # across workers and hosts (not those of other teachers), then check the overlap in SQL
+    db.session.execute(select(User.id).where(User.id == user.id).with_for_update())
+    overlapping_id = db.session.scalar(select(Session.id).where(
+        Session.user_id == user.id, Session.date == session_date,
+        Session.start_time < end_time, Session.end_time > start_time
+    ).limit(1))
+    if overlapping_id:
+        db.session.rollback()
+        # the index missed it, reload the day next time
+        teacher_schedule.invalidate(user.id, session_date)
+        abort(409, description=f"This session overlaps your session with ID: {overlapping_id}.")
+
+    new_session = Session(
+        date=session_date,
+        start_time=start_time,
+        end_time=end_time,
+        type=session_data["type"],
+        user_id=user.id,
+        group_id=group_id
+    )
+    new_session.set_length()
+
+    try:
+        db.session.add(new_session)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        teacher_schedule.invalidate(user.id, session_date)
+        raise
+
+    teacher_schedule.add(user.id, session_date, start_time, end_time, new_session.id)
+
+    return jsonify({
+        "status": "success",
+        "message": "Session Has Been Created Successfully.",
+        "session": new_session.to_dict()
+    }), 201
+
+
+@sessions.route("/attend/<int:session_id>", methods=["POST"])
+@login_required  # Ensure the user is logged in
+@limiter.limit("10/minute")
+def attend_session(session_id):
+    user = current_user
+
+    # Check if the user is a student
+    if user.role.role != "student":
+        abort(403, description="Only students can attend sessions.")
+
+    # check if the session is exists
+    session_to_attend = Session.query.get(session_id)
+    if not session_to_attend:
+        abort(404, description=f"Session with ID: {session_id} not Found")
+
+    # check if the student already attends the session
+    if UserSession.query.get((user.id, session_id)):
+        abort(409, description="You are already attending this session.")
+
+    # the attendance first: a concurrent attend of the same student waits on its
+    # primary key and fails there, before taking a session of a package
+    db.session.add(UserSession(user_id=user.id, session_id=session_id))
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        abort(409, description="You are already attending this session.")
+
+    # use one session of a package, committed together with the attendance
+    consumed = consume_session(user.id, session_to_attend.type)
+    if not consumed:
+        db.session.rollback()
+        abort(403, description=f"You have no active {session_to_attend.type} package with remaining sessions.")
+    package_id, remaining_sessions = consumed
+
+    db.session.commit()
+
+    return jsonify({
+        "status": "success",
+        "message": f"You are attending the session with ID: {session_id}.",
+        "session": session_to_attend.to_dict(),
+        "package": {
+            "id": package_id,
+            "remaining_sessions": remaining_sessions
+        }
+    }), 201
+
+
+@sessions.route("/<int:session_id>/attendance", methods=["POST"])
+@login_required  # Ensure the user is logged in
+@limiter.limit("10/minute")
+def record_session_attendance(session_id):
+    """
+    Record the attendance of the students of a group session in bulk.
+    Submitting the same attendance again only adds the missing rows.
+    Recorded by the teacher, it is free: no package session is consumed
+    (students attending with POST /sessions/attend/<id> use one).
+    """
+    user = current_user
+
+    # check if the session is exists
+    session_to_record = Session.query.get(session_id)
+    if not session_to_record:
+        abort(404, description=f"Session with ID: {session_id} not Found")
+
+    # Only the session teacher or admins can record attendance
+    if user.role.role != "admin" and session_to_record.user_id != user.id:
+        abort(403, description="Only the session teacher or admins can record attendance.")
+
+    if not session_to_record.group_id:
+        abort(400, description="Attendance can only be recorded for group sessions.")
+
+    attendance_data = request.get_json()
+    user_ids = attendance_data.get("user_ids") if isinstance(attendance_data, dict) else None
+
+    if not user_ids or not isinstance(user_ids, list) or not all(isinstance(user_id, str) for user_id in user_ids):
+        abort(400, description="user_ids must be a non empty list of user IDs.")
+
+    user_ids = list(dict.fromkeys(user_ids))  # drop duplicates, keep the order
+
+    # validate all the users against the group membership in one query
+    members = {
+        member_id for (member_id,) in db.session.query(UserGroup.user_id).filter(
+            UserGroup.group_id == session_to_record.group_id, UserGroup.user_id.in_(user_ids)
+        )
+    }
+    non_members = [user_id for user_id in user_ids if user_id not in members]
+    if non_members:
+        abort(400, description=f"Users not in the session group: {', '.join(non_members)}")
+
+    recorded = record_attendance(session_id, user_ids)
+    db.session.commit()
+
+    return jsonify({
+        "status": "success",
+        "message": f"Attendance has been recorded for session with ID: {session_id}.",
+        "recorded": recorded,
+        "already_recorded": len(user_ids) - recorded
+    }), 201
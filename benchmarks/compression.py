@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+"""
+Response compression benchmark: bytes on the wire and end-to-end latency
+of the listing and roster endpoints, without compression and with gzip
+and brotli at several levels.
+
+    DB_USER=... DB_PASSWORD=... DB_HOST=... DB_NAME=... \\
+        python benchmarks/compression.py [--requests 50] [--bandwidth-kbps 1000 --bandwidth-kbps 10000] [--rtt-ms 100]
+
+The requests go through the app in process (test client), the link is
+modelled: end-to-end latency = server time (compression included) + RTT
++ body size / bandwidth + client decompression time.
+"""
+import argparse
+import gzip
+import json
+import sys
+from os.path import abspath, dirname
+from statistics import median
+from time import perf_counter
+
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, dirname(abspath(__file__)))
+
+from loadtest import seed, PASSWORD  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# (Accept-Encoding, level setting, levels)
+ENCODINGS = [
+    ("identity", None, [None]),
+    ("gzip", "COMPRESS_LEVEL_GZIP", [1, 5, 9]),
+    ("br", "COMPRESS_LEVEL_BROTLI", [1, 4, 11]),
+]
+
+
+def decompress(encoding, data):
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "br":
+        return brotli.decompress(data)
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-uri", help="defaults to the DB_* environment variables")
+    parser.add_argument("--requests", type=int, default=50, help="requests per endpoint and encoding")
+    parser.add_argument("--students", type=int, default=300, help="students, all in the roster and with a request")
+    parser.add_argument("--groups", type=int, default=200)
+    parser.add_argument("--bandwidth-kbps", type=int, action="append", help="link bandwidth (repeatable)")
+    parser.add_argument("--rtt-ms", type=float, default=100)
+    args = parser.parse_args()
+    bandwidths = args.bandwidth_kbps or [1000, 10000]
+
+    from app.app import create_app, db
+
+    config = {"RATELIMIT_ENABLED": False, "PACKAGE_EXPIRY_INTERVAL": 0, "REVENUE_REFRESH_INTERVAL": 0}
+    if args.database_uri:
+        config["SQLALCHEMY_DATABASE_URI"] = args.database_uri
+    app = create_app(config)
+    data = seed(app, args.students, args.groups)
+
+    from app.models.user_group import UserGroup
+    from app.models.group_request import GroupRequest
+
+    # a full roster and a page of pending requests
+    roster_group = data["groups"][0]
+    with app.app_context():
+        db.session.add_all(UserGroup(user_id=user_id, group_id=roster_group) for user_id in data["student_ids"])
+        db.session.add_all(GroupRequest(user_id=user_id, group_id=data["groups"][1], role="student",
+                                        action="join", note="Please add me to this group")
+                           for user_id in data["student_ids"])
+        db.session.commit()
+
+    endpoints = {
+        "get_groups": "/groups/?per_page=100",
+        "get_student_list_of_group": f"/groups/get_student_list_of_group/{roster_group}",
+        "view_pending_requests": f"/groups/pending_requests?per_page=100&group_id={data['groups'][1]}",
+    }
+
+    client = app.test_client()
+    client.post("/auth/login", json={"email": data["admin"], "password": PASSWORD})
+
+    report = {"requests": args.requests, "rtt_ms": args.rtt_ms, "endpoints": {}}
+    for name, url in endpoints.items():
+        results = {}
+        for encoding, setting, levels in ENCODINGS:
+            if encoding == "br" and brotli is None:
+                continue
+            for level in levels:
+                if setting:
+                    app.config[setting] = level
+                server_times, decode_times = [], []
+                for _ in range(args.requests):
+                    start = perf_counter()
+                    response = client.get(url, headers={"Accept-Encoding": encoding})
+                    server_times.append(perf_counter() - start)
+                    body = response.get_data()
+                    start = perf_counter()
+                    decompress(response.headers.get("Content-Encoding"), body)
+                    decode_times.append(perf_counter() - start)
+
+                server_ms = median(server_times) * 1000
+                decode_ms = median(decode_times) * 1000
+                results[f"{encoding}-{level}" if level else encoding] = {
+                    "bytes": len(body),
+                    "server_ms": round(server_ms, 3),
+                    "decode_ms": round(decode_ms, 3),
+                    "end_to_end_ms": {
+                        f"{kbps}kbps": round(server_ms + args.rtt_ms + len(body) * 8 / kbps + decode_ms, 1)
+                        for kbps in bandwidths
+                    },
+                }
+        report["endpoints"][name] = results
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/python3
+"""
+Conditional GET benchmark: bytes sent and latency of a replayed client
+trace, the client refetching every screen (no cache) against the client
+revalidating its copies with If-None-Match (304 when unchanged).
+
+    DB_USER=... DB_PASSWORD=... DB_HOST=... DB_NAME=... \\
+        python benchmarks/conditional.py [--screens 2000] [--change-every 20] [--trace trace.jsonl]
+
+The default trace is generated: a client opening screens that each read
+its profile, one of a few groups and that group's roster, and a change to
+the profile or a group every --change-every screens. --trace replays
+recorded paths instead, one JSON object per line, {"path": "/groups/{group}",
+"index": 3} or {"change": "group", "index": 3}, {group} standing for the
+seeded group number `index`. The link is modelled the way
+benchmarks/compression.py models it: end-to-end latency = server time +
+RTT + body size / bandwidth.
+"""
+import argparse
+import json
+import re
+import sys
+from datetime import datetime
+from os.path import abspath, dirname
+from random import Random
+from statistics import median
+from time import perf_counter
+
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, dirname(abspath(__file__)))
+
+from loadtest import seed, PASSWORD  # noqa: E402
+
+SCREEN = ["/profile/", "/groups/{group}", "/groups/get_student_list_of_group/{group}"]
+
+
+def generate_trace(args, groups):
+    """ The requests and changes of `args.screens` screens """
+    rng = Random(args.seed)
+    trace = []
+    for screen in range(args.screens):
+        group = rng.choice(groups[:args.browsed_groups])
+        trace.extend({"path": path.format(group=group)} for path in SCREEN)
+        if args.change_every and screen % args.change_every == args.change_every - 1:
+            trace.append({"change": rng.choice(("profile", "group")), "group": group})
+    return trace
+
+
+def load_trace(path, groups):
+    trace = []
+    with open(path) as lines:
+        for line in lines:
+            entry = json.loads(line)
+            group = groups[entry.get("index", 0) % len(groups)]
+            if "path" in entry:
+                trace.append({"path": entry["path"].format(group=group)})
+            else:
+                trace.append({"change": entry["change"], "group": group})
+    return trace
+
+
+def replay(app, client, trace, user_email, revalidate):
+    """ Replay the trace, return per path kind the bytes, statuses and server times """
+    from app.app import db
+    from app.models.group import Group
+    from app.models.user import User
+
+    etags = {}
+    stats = {}
+    for entry in trace:
+        if "change" in entry:
+            # what the write endpoints do to the ETag: bump updated_at
+            with app.app_context():
+                row = (User.query.filter_by(email=user_email).one() if entry["change"] == "profile"
+                       else db.session.get(Group, entry["group"]))
+                row.updated_at = datetime.now()
+                db.session.commit()
+            continue
+
+        path = entry["path"]
+        headers = {"If-None-Match": etags[path]} if revalidate and path in etags else {}
+        start = perf_counter()
+        response = client.get(path, headers=headers)
+        elapsed = perf_counter() - start
+        if response.headers.get("ETag"):
+            etags[path] = response.headers["ETag"]
+
+        kind = re.sub(r"/\d+", "/<id>", path)
+        kind_stats = stats.setdefault(kind, {"requests": 0, "bytes": 0, "not_modified": 0, "times": []})
+        kind_stats["requests"] += 1
+        kind_stats["bytes"] += len(response.get_data())
+        kind_stats["not_modified"] += response.status_code == 304
+        kind_stats["times"].append(elapsed)
+    return stats
+
+
+def summary(stats, args):
+    report = {}
+    for kind, kind_stats in stats.items():
+        server_ms = median(kind_stats["times"]) * 1000
+        mean_bytes = kind_stats["bytes"] / kind_stats["requests"]
+        report[kind] = {
+            "requests": kind_stats["requests"],
+            "not_modified": kind_stats["not_modified"],
+            "bytes": kind_stats["bytes"],
+            "server_p50_ms": round(server_ms, 3),
+            "end_to_end_ms": {
+                f"{kbps}kbps": round(server_ms + args.rtt_ms + mean_bytes * 8 / kbps, 1) for kbps in args.bandwidth_kbps
+            },
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-uri", help="defaults to the DB_* environment variables")
+    parser.add_argument("--screens", type=int, default=2000)
+    parser.add_argument("--change-every", type=int, default=20, help="screens between two changes, 0 for none")
+    parser.add_argument("--browsed-groups", type=int, default=5, help="groups the client keeps opening")
+    parser.add_argument("--students", type=int, default=200, help="students, all in the browsed rosters")
+    parser.add_argument("--trace", help="JSON lines trace to replay instead of the generated one")
+    parser.add_argument("--bandwidth-kbps", type=int, action="append")
+    parser.add_argument("--rtt-ms", type=float, default=100)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    args.bandwidth_kbps = args.bandwidth_kbps or [1000, 10000]
+
+    from app.app import create_app, db
+
+    config = {"RATELIMIT_ENABLED": False, "PACKAGE_EXPIRY_INTERVAL": 0, "REVENUE_REFRESH_INTERVAL": 0}
+    if args.database_uri:
+        config["SQLALCHEMY_DATABASE_URI"] = args.database_uri
+    app = create_app(config)
+    data = seed(app, args.students, max(args.browsed_groups, 1))
+
+    from app.models.user_group import UserGroup
+
+    with app.app_context():
+        db.session.add_all(UserGroup(user_id=user_id, group_id=group_id)
+                           for group_id in data["groups"] for user_id in data["student_ids"])
+        db.session.commit()
+
+    trace = load_trace(args.trace, data["groups"]) if args.trace else generate_trace(args, data["groups"])
+
+    report = {"trace_requests": sum("path" in entry for entry in trace),
+              "changes": sum("change" in entry for entry in trace), "rtt_ms": args.rtt_ms, "clients": {}}
+    for name, revalidate in (("refetch", False), ("if_none_match", True)):
+        client = app.test_client()
+        client.post("/auth/login", json={"email": data["admin"], "password": PASSWORD})
+        report["clients"][name] = summary(replay(app, client, trace, data["admin"], revalidate), args)
+
+    before, after = report["clients"]["refetch"], report["clients"]["if_none_match"]
+    total_before = sum(kind["bytes"] for kind in before.values())
+    total_after = sum(kind["bytes"] for kind in after.values())
+    report["bytes_saved_percent"] = round(100 * (1 - total_after / total_before), 1) if total_before else 0
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+"""
+Idempotency-Key check under concurrent retries: --retries clients send the
+same request with the same key at the same moment, the view must run once
+and every client get its response (or a 409 while it still runs).
+
+    DB_USER=... DB_PASSWORD=... DB_HOST=... DB_NAME=... \\
+        python benchmarks/idempotency.py [--retries 8] [--lock-timeout 1] [--slow 3]
+
+Two views are exercised: POST /groups/send_request/<group> (a real endpoint),
+and a view mounted by this script that runs for --slow seconds, longer than
+the --lock-timeout lease, before committing its write: the lease must be
+renewed, so that no retry takes the key over and runs the view a second time.
+The exit status is 1 when a view ran more than once.
+"""
+import argparse
+import json
+import sys
+from collections import Counter
+from os.path import abspath, dirname
+from threading import Barrier, Lock, Thread
+from time import sleep
+from uuid import uuid4
+
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, dirname(abspath(__file__)))
+
+from loadtest import seed, PASSWORD  # noqa: E402
+
+
+def mount_slow_view(app, seconds, runs, runs_lock):
+    """ An idempotent view writing a group request after `seconds`, counting its runs """
+    from flask import request, jsonify
+    from flask_login import login_required, current_user
+    from app.app import db
+    from app.models.group_request import GroupRequest
+    from app.utils.idempotency import idempotent
+
+    @login_required
+    @idempotent
+    def slow_request():
+        with runs_lock:
+            runs["slow"] += 1
+        sleep(seconds)
+        group_request = GroupRequest(user_id=current_user.id, group_id=request.get_json()["group_id"],
+                                     role="student", action="join", note="idempotency benchmark")
+        db.session.add(group_request)
+        db.session.commit()
+        return jsonify({"id": group_request.id}), 201
+
+    app.add_url_rule("/benchmarks/slow_request", view_func=slow_request, methods=["POST"])
+
+
+def concurrent_retries(app, email, path, payload, retries):
+    """ The statuses and bodies of `retries` clients sending the same request and key at once """
+    key = uuid4().hex
+    clients = []
+    for _ in range(retries):
+        client = app.test_client()
+        client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        clients.append(client)
+
+    barrier = Barrier(retries)
+    responses = [None] * retries
+
+    def send(index):
+        barrier.wait()
+        response = clients[index].post(path, json=payload, headers={"Idempotency-Key": key})
+        responses[index] = (response.status_code, response.get_data(as_text=True),
+                            response.headers.get("Idempotent-Replayed") == "true")
+
+    threads = [Thread(target=send, args=(index,)) for index in range(retries)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return responses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-uri", help="defaults to the DB_* environment variables")
+    parser.add_argument("--retries", type=int, default=8, help="concurrent clients sending the same key")
+    parser.add_argument("--lock-timeout", type=int, default=1, help="IDEMPOTENCY_LOCK_TIMEOUT, seconds")
+    parser.add_argument("--slow", type=float, default=3, help="seconds the slow view runs")
+    args = parser.parse_args()
+
+    from app.app import create_app
+    from app.models.group_request import GroupRequest
+
+    config = {"RATELIMIT_ENABLED": False, "PACKAGE_EXPIRY_INTERVAL": 0, "REVENUE_REFRESH_INTERVAL": 0,
+              "IDEMPOTENCY_LOCK_TIMEOUT": args.lock_timeout, "IDEMPOTENCY_WAIT": args.slow + 2 * args.lock_timeout}
+    if args.database_uri:
+        config["SQLALCHEMY_DATABASE_URI"] = args.database_uri
+    app = create_app(config)
+    runs, runs_lock = Counter(), Lock()
+    mount_slow_view(app, args.slow, runs, runs_lock)
+    data = seed(app, 2, 2)
+
+    report = {"retries": args.retries, "lock_timeout": args.lock_timeout, "views": {}}
+    checks = (
+        ("send_request", data["students"][0], f"/groups/send_request/{data['groups'][0]}",
+         {"action": "join", "note": "idempotency benchmark"}, data["groups"][0], data["student_ids"][0]),
+        ("slow", data["students"][1], "/benchmarks/slow_request",
+         {"group_id": data["groups"][1]}, data["groups"][1], data["student_ids"][1]),
+    )
+    failed = False
+    for name, email, path, payload, group_id, user_id in checks:
+        responses = concurrent_retries(app, email, path, payload, args.retries)
+        with app.app_context():
+            written = GroupRequest.query.filter_by(group_id=group_id, user_id=user_id).count()
+        executed = [response for response in responses if response[0] < 300 and not response[2]]
+        bodies = {body for status, body, replayed in responses if status < 300}
+        report["views"][name] = {
+            "statuses": dict(Counter(status for status, _, _ in responses)),
+            "replayed": sum(replayed for _, _, replayed in responses),
+            "rows_written": written,
+            "view_runs": runs["slow"] if name == "slow" else len(executed),
+            "same_body": len(bodies) <= 1,
+        }
+        failed |= written != 1 or report["views"][name]["view_runs"] != 1 or len(bodies) != 1
+
+    print(json.dumps(report, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+#!/usr/bin/python3
+"""
+HTTP load test of the API: seeds a dataset, then drives the real endpoints
+with concurrent clients, one endpoint after the other, and prints the
+throughput and p50/p95/p99 latency of each one as JSON.
+
+    DB_USER=... DB_PASSWORD=... DB_HOST=... DB_NAME=... \\
+        python benchmarks/loadtest.py [--clients 16] [--duration 10] [--output run.json]
+
+The app is served by a threaded werkzeug server in this process, unless
+--base-url points at a running server (using the same database, with rate
+limiting disabled). Every run seeds new rows (tagged with the run), so the
+same database can be reused.
+
+To compare two commits, run the test on each of them and compare the reports,
+the exit status is 1 when an endpoint regressed by more than --threshold %:
+
+    git checkout <base> && python benchmarks/loadtest.py --output base.json
+    git checkout <head> && python benchmarks/loadtest.py --output head.json
+    python benchmarks/loadtest.py --compare base.json head.json [--threshold 10]
+"""
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+from datetime import date, time
+from http.cookiejar import CookieJar
+from itertools import count
+from os.path import abspath, dirname
+from random import Random
+from statistics import quantiles
+from threading import Thread, Lock
+from time import perf_counter
+from urllib.error import HTTPError
+from urllib.request import build_opener, HTTPCookieProcessor, Request
+from uuid import uuid4
+
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSWORD = "loadtest-password"
+
+
+def seed(app, students, groups):
+    """ Create an admin, `students` students and `groups` groups, return their ids """
+    from app.app import db, bcrypt
+    from app.models.role import Role
+    from app.models.language import Language
+    from app.models.day import Day
+    from app.models.user import User
+    from app.models.group import Group
+    from app.models.group_day import GroupDay
+
+    tag = uuid4().hex[:6]
+    with app.app_context():
+        db.create_all()
+        roles = {}
+        for name in ("admin", "teacher", "student"):
+            roles[name] = Role.query.filter_by(role=name).first() or Role(role=name, description=name)
+        language = Language.query.filter_by(language="en").first() or Language(language="en")
+        day = Day.query.filter_by(day="Saturday").first() or Day(day="Saturday")
+        db.session.add_all([*roles.values(), language, day])
+        db.session.flush()
+
+        # one hash for everybody, bcrypt would dominate the seeding otherwise
+        password = bcrypt.generate_password_hash(PASSWORD).decode()
+
+        def user(role, index):
+            return User(username=f"lt{tag}_{role[0]}{index}", email=f"lt{tag}_{role[0]}{index}@example.com",
+                        password=password, phone_number=f"+{int(tag, 16)}{role[0] == 'a':d}{index:07d}",
+                        first_name="Load", last_name="Test", birth_date=date(2000, 1, 1), gender="MALE",
+                        nationality="Egyptian", country="Egypt", time_zone="Africa/Cairo",
+                        role_id=roles[role].id, language_id=language.id)
+
+        admin = user("admin", 0)
+        student_rows = [user("student", index) for index in range(students)]
+        db.session.add(admin)
+        db.session.add_all(student_rows)
+
+        group_rows = [Group(group=f"lt{tag} group {index}", size=students + 1, status="coming",
+                            start_date=date(2030, 1, 1), end_date=date(2030, 6, 1))
+                      for index in range(groups)]
+        db.session.add_all(group_rows)
+        db.session.flush()
+        db.session.add_all(GroupDay(group_id=group.id, day_id=day.id, time=time(10 + index % 8))
+                           for index, group in enumerate(group_rows))
+        db.session.commit()
+
+        return {
+            "admin": admin.email,
+            "students": [student.email for student in student_rows],
+            "student_ids": [student.id for student in student_rows],
+            "groups": [group.id for group in group_rows],
+        }
+
+
+class Client:
+    """ A cookie-keeping HTTP client """
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = build_opener(HTTPCookieProcessor(CookieJar()))
+
+    def request(self, method, path, payload=None):
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = Request(self.base_url + path, data=data, method=method,
+                          headers={"Content-Type": "application/json"} if data else {})
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                return response.status
+        except HTTPError as error:
+            error.read()
+            return error.code
+
+    def login(self, email):
+        status = self.request("POST", "/auth/login", {"email": email, "password": PASSWORD})
+        if status != 200:
+            raise RuntimeError(f"Login of {email} failed with status {status}")
+
+
+def scenarios(data, per_page):
+    """ name -> (make_client(index) returning the client state, call(state, rng) returning the status) """
+    groups = data["groups"]
+    students = data["students"]
+    enrollments = count()
+    enroll_lock = Lock()
+
+    def student(index):
+        client = Client(data["base_url"])
+        client.login(students[index % len(students)])
+        return {"client": client, "next_group": count()}
+
+    def admin(index):
+        client = Client(data["base_url"])
+        client.login(data["admin"])
+        return {"client": client}
+
+    def login(state, rng):
+        # a new client every time, logged in clients get a 400
+        return Client(data["base_url"]).request(
+            "POST", "/auth/login", {"email": rng.choice(students), "password": PASSWORD})
+
+    def profile(state, rng):
+        return state["client"].request("GET", "/profile/")
+
+    def list_groups(state, rng):
+        pages = max(1, len(groups) // per_page)
+        return state["client"].request("GET", f"/groups/?page={rng.randint(1, pages)}&per_page={per_page}")
+
+    def student_list(state, rng):
+        return state["client"].request("GET", f"/groups/get_student_list_of_group/{rng.choice(groups)}")
+
+    def enroll(state, rng):
+        # every enrollment adds a new (group, student) pair
+        with enroll_lock:
+            index = next(enrollments)
+        group_id = groups[index % len(groups)]
+        student_id = data["student_ids"][(index // len(groups)) % len(data["student_ids"])]
+        return state["client"].request("POST", f"/groups/add_student_to_group/{group_id}/{student_id}")
+
+    def send_request(state, rng):
+        # one pending request per group and student, 409 once a student went through all the groups
+        group_id = groups[next(state["next_group"]) % len(groups)]
+        return state["client"].request("POST", f"/groups/send_request/{group_id}",
+                                       {"action": "join", "note": "load test"})
+
+    return {
+        "auth.login": (lambda index: {}, login),
+        "profile.get_profile": (student, profile),
+        "groups.get_groups": (student, list_groups),
+        "groups.get_student_list_of_group": (admin, student_list),
+        "groups.add_student_to_group": (admin, enroll),
+        "groups.send_request_to_group": (student, send_request),
+    }
+
+
+def run_scenario(make_client, call, clients, duration, seed):
+    """ Run `call` from `clients` threads for `duration` seconds """
+    states = [make_client(index) for index in range(clients)]
+    results = [[] for _ in range(clients)]
+
+    def worker(index):
+        rng = Random(seed + index)
+        deadline = perf_counter() + duration
+        while True:
+            start = perf_counter()
+            if start >= deadline:
+                break
+            status = call(states[index], rng)
+            results[index].append((perf_counter() - start, status))
+
+    threads = [Thread(target=worker, args=(index,)) for index in range(clients)]
+    start = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = perf_counter() - start
+
+    samples = [sample for client in results for sample in client]
+    latencies = sorted(latency for latency, _ in samples)
+    percentiles = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    errors = {}
+    for _, status in samples:
+        if status >= 400:
+            errors[str(status)] = errors.get(str(status), 0) + 1
+
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "requests_per_second": round(len(samples) / elapsed, 1),
+        "latency_ms": {"p50": round(percentiles[49] * 1000, 3),
+                       "p95": round(percentiles[94] * 1000, 3),
+                       "p99": round(percentiles[98] * 1000, 3)},
+    }
+
+
+def compare(base_path, head_path, threshold):
+    """ Compare two reports, return the regressions (p95 latency up or throughput down by more than threshold %) """
+    with open(base_path) as file:
+        base = json.load(file)
+    with open(head_path) as file:
+        head = json.load(file)
+
+    endpoints = {}
+    regressions = []
+    for name, before in base["endpoints"].items():
+        after = head["endpoints"].get(name)
+        if not after:
+            continue
+        p95 = (after["latency_ms"]["p95"] - before["latency_ms"]["p95"]) / before["latency_ms"]["p95"] * 100 \
+            if before["latency_ms"]["p95"] else 0
+        throughput = (after["requests_per_second"] - before["requests_per_second"]) \
+            / before["requests_per_second"] * 100 if before["requests_per_second"] else 0
+        endpoints[name] = {"p95_change_percent": round(p95, 1), "throughput_change_percent": round(throughput, 1)}
+        if p95 > threshold or throughput < -threshold:
+            regressions.append(name)
+
+    return {"base": base.get("commit"), "head": head.get("commit"), "threshold_percent": threshold,
+            "endpoints": endpoints, "regressions": regressions}
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-uri", help="defaults to the DB_* environment variables")
+    parser.add_argument("--base-url", help="load test a running server instead of serving the app here")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per endpoint")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=200)
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the clients random choices")
+    parser.add_argument("--only", action="append", help="endpoint to test (repeatable), all by default")
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="compare two reports and exit")
+    parser.add_argument("--threshold", type=float, default=10, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    if args.compare:
+        result = compare(*args.compare, args.threshold)
+        print(json.dumps(result, indent=2))
+        return 1 if result["regressions"] else 0
+
+    from app.app import create_app
+
+    config = {"RATELIMIT_ENABLED": False, "PACKAGE_EXPIRY_INTERVAL": 0, "REVENUE_REFRESH_INTERVAL": 0}
+    if args.database_uri:
+        config["SQLALCHEMY_DATABASE_URI"] = args.database_uri
+    app = create_app(config)
+
+    data = seed(app, max(args.students, args.clients), args.groups)
+
+    server = None
+    if args.base_url:
+        data["base_url"] = args.base_url.rstrip("/")
+    else:
+        from werkzeug.serving import make_server
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)  # no access log
+        server = make_server("127.0.0.1", 0, app, threaded=True)
+        Thread(target=server.serve_forever, daemon=True).start()
+        data["base_url"] = f"http://127.0.0.1:{server.server_port}"
+
+    report = {
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "clients": args.clients,
+        "duration": args.duration,
+        "students": args.students,
+        "groups": args.groups,
+        "per_page": args.per_page,
+        "seed": args.seed,
+        "endpoints": {},
+    }
+    try:
+        for name, (make_client, call) in scenarios(data, args.per_page).items():
+            if args.only and name not in args.only:
+                continue
+            report["endpoints"][name] = run_scenario(make_client, call, args.clients, args.duration, args.seed)
+    finally:
+        if server:
+            server.shutdown()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
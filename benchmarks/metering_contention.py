@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+"""
+Contention benchmark of the package metering: many parallel bookings
+against one package. Checks that exactly `--sessions` bookings succeed
+(no double-spend) and reports the booking throughput and latency.
+
+    DB_USER=... DB_PASSWORD=... DB_HOST=... DB_NAME=... \\
+        python benchmarks/metering_contention.py [--threads 32] [--bookings 2000] [--sessions 1000]
+"""
+import argparse
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from os.path import abspath, dirname
+from statistics import quantiles
+from time import perf_counter
+from uuid import uuid4
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from app.app import create_app, db, local_timezone
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-uri", help="defaults to the DB_* environment variables")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--bookings", type=int, default=2000, help="booking attempts")
+    parser.add_argument("--sessions", type=int, default=1000, help="sessions in the package")
+    args = parser.parse_args()
+
+    config = {"SQLALCHEMY_DATABASE_URI": args.database_uri} if args.database_uri else None
+    app = create_app(config)
+
+    from app.models.role import Role
+    from app.models.language import Language
+    from app.models.user import User
+    from app.models.package import Package
+    from app.models.user_package import UserPackage
+    from app.utils.metering import consume_session
+
+    tag = uuid4().hex[:8]
+    with app.app_context():
+        db.create_all()
+        role = Role.query.filter_by(role="student").first() or Role(role="student", description="student")
+        language = Language.query.filter_by(language="en").first() or Language(language="en")
+        user = User(username=f"bench_{tag}", email=f"bench_{tag}@example.com", password="-",
+                    phone_number=tag, first_name="Bench", last_name="User", birth_date=date(2000, 1, 1),
+                    gender="MALE", nationality="Egyptian", country="Egypt", time_zone="Africa/Cairo",
+                    role=role, language=language)
+        package = Package(package=f"bench_{tag}", session_type="group", price=100, duration=30,
+                          max_sessions=args.sessions)
+        db.session.add_all([user, package])
+        db.session.flush()
+        user_package = UserPackage(user_id=user.id, package_id=package.id, is_active=True,
+                                   expiry_date=datetime.now(local_timezone) + timedelta(days=30))
+        user_package.set_remaining_sessions(args.sessions)
+        db.session.add(user_package)
+        db.session.commit()
+        user_id, package_id = user.id, package.id
+
+    def book(_):
+        with app.app_context():
+            start = perf_counter()
+            consumed = consume_session(user_id, "group")
+            db.session.commit()
+            return consumed is not None, perf_counter() - start
+
+    start = perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        results = list(executor.map(book, range(args.bookings)))
+    elapsed = perf_counter() - start
+
+    with app.app_context():
+        remaining = UserPackage.query.get((user_id, package_id)).remaining_sessions
+
+    latencies = sorted(latency for _, latency in results)
+    percentiles = quantiles(latencies, n=100)
+    succeeded = sum(ok for ok, _ in results)
+    report = {
+        "threads": args.threads,
+        "bookings": args.bookings,
+        "sessions": args.sessions,
+        "succeeded": succeeded,
+        "remaining_sessions": remaining,
+        "double_spent": succeeded > args.sessions or remaining < 0,
+        "seconds": round(elapsed, 3),
+        "bookings_per_second": round(args.bookings / elapsed),
+        "latency_ms": {"p50": round(percentiles[49] * 1000, 3),
+                       "p95": round(percentiles[94] * 1000, 3),
+                       "p99": round(percentiles[98] * 1000, 3)},
+    }
+    print(json.dumps(report, indent=2))
+    return 1 if report["double_spent"] or succeeded != min(args.bookings, args.sessions) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+#!/usr/bin/python3
+"""
+Revenue report benchmark: latency of GET /reports/revenue (read from the
+package_revenue aggregates) against the same aggregate computed directly
+over user_packages, and the cost of the full and incremental refreshes,
+as user_packages grows to each of --sizes rows (10M by default).
+
+    DB_USER=... DB_PASSWORD=... DB_HOST=... DB_NAME=... \\
+        python benchmarks/revenue.py [--sizes 100000,1000000,10000000] [--users 1000000] [--packages 10]
+
+The users come from the dataset generator (app/utils/seeding.py, the same
+as `flask seed generate`), each subscribed to up to --packages packages, the
+subscriptions spread over the last --months months. Every run seeds new
+users and packages (a new --seed each run unless given), so the same
+database can be reused.
+
+At each size the aggregates are rebuilt from scratch (full refresh), then
+--batch subscriptions made after the last refresh are added (incremental
+refresh), then the report is requested --runs times and the direct
+aggregate --direct-runs times.
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta
+from os.path import abspath, dirname
+from random import Random, SystemRandom
+from statistics import median, quantiles
+from time import perf_counter
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+
+def latency(times):
+    p95 = quantiles(times, n=20)[-1] if len(times) > 1 else times[0]
+    return {"p50_ms": round(median(times) * 1000, 3), "p95_ms": round(p95 * 1000, 3)}
+
+
+def subscription_rows(plan, packages, start, stop, since, until, seed):
+    """ The user_packages rows [start, stop): subscription `index` is user index // packages to package index % packages """
+    rng = Random(f"{seed}:user_packages:{start}")
+    span = (until - since).total_seconds()
+    rows = []
+    for index in range(start, stop):
+        package_id, max_sessions = packages[index % len(packages)]
+        timestamp = since + timedelta(seconds=rng.random() * span)
+        rows.append({
+            "user_id": plan.user_id(index // len(packages)),
+            "package_id": package_id,
+            "timestamp": timestamp,
+            "expiry_date": timestamp + timedelta(days=30),
+            "is_active": rng.random() < 0.3,
+            "remaining_sessions": max_sessions,
+        })
+    return rows
+
+
+def load(db, rows_iter):
+    from sqlalchemy import insert
+    from app.models.user_package import UserPackage
+
+    loaded = 0
+    for rows in rows_iter:
+        db.session.execute(insert(UserPackage.__table__), rows)
+        db.session.commit()
+        loaded += len(rows)
+    return loaded
+
+
+def direct_statement(dialect_name):
+    """ The revenue by month, package and country straight from user_packages (the report without aggregates) """
+    from sqlalchemy import select, func
+    from app.models.package import Package
+    from app.models.user import User
+    from app.models.user_package import UserPackage
+    from app.utils.sql import month_start
+
+    user_packages = UserPackage.__table__
+    month = month_start(user_packages.c.timestamp, dialect_name)
+    return (
+        select(month, user_packages.c.package_id, User.country, func.count(), func.sum(Package.price))
+        .join(Package, Package.id == user_packages.c.package_id)
+        .join(User, User.id == user_packages.c.user_id)
+        .group_by(month, user_packages.c.package_id, User.country)
+        .order_by(month, user_packages.c.package_id, User.country)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-uri", help="defaults to the DB_* environment variables")
+    parser.add_argument("--sizes", default="100000,1000000,10000000", help="user_packages rows to measure at")
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--packages", type=int, default=10)
+    parser.add_argument("--months", type=int, default=24, help="months the subscriptions are spread over")
+    parser.add_argument("--batch", type=int, default=10000, help="new subscriptions of the incremental refresh")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="rows per transaction")
+    parser.add_argument("--workers", type=int, default=1, help="processes seeding the users")
+    parser.add_argument("--runs", type=int, default=50, help="report requests per size")
+    parser.add_argument("--direct-runs", type=int, default=3, help="direct aggregates per size")
+    parser.add_argument("--seed", type=int, help="random by default, the same seed cannot be loaded twice")
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    seed = args.seed if args.seed is not None else SystemRandom().getrandbits(30)
+    if sizes[-1] > args.users * args.packages or sizes[0] <= args.batch:
+        print("Every size needs more rows than --batch, and the users and packages enough subscriptions.",
+              file=sys.stderr)
+        return 1
+
+    from app.app import create_app, db, local_timezone
+    from app.models.package import Package
+    from app.models.package_revenue import PackageRevenue, ReportWatermark
+    from app.utils import revenue
+    from app.utils.seeding import Plan, generate
+    from sqlalchemy import delete, text
+
+    config = {"RATELIMIT_ENABLED": False, "PACKAGE_EXPIRY_INTERVAL": 0, "REVENUE_REFRESH_INTERVAL": 0}
+    if args.database_uri:
+        config["SQLALCHEMY_DATABASE_URI"] = args.database_uri
+    app = create_app(config)
+    prefix = f"rev{seed}-"
+    start = perf_counter()
+
+    with app.app_context():
+        db.create_all()
+        dialect_name = db.engine.dialect.name
+        generate(seed, args.users, 0, 0, prefix, args.chunk_size, args.workers,
+                 lambda phase, rows: print(f"{phase}: +{rows} rows ({perf_counter() - start:.0f}s)", file=sys.stderr))
+        plan = Plan(seed, args.users, 0, 0, prefix)
+
+        rng = Random(seed)
+        packages = [Package(package=f"{prefix}package {index}", session_type=rng.choice(("private", "group")),
+                            price=rng.choice((200, 350, 500, 800)), duration=30, max_sessions=rng.choice((4, 8, 12)))
+                    for index in range(args.packages)]
+        db.session.add_all(packages)
+        db.session.commit()
+        packages = [(package.id, package.max_sessions) for package in packages]
+
+    client = app.test_client()
+    client.post("/auth/login", json={"email": f"{prefix}u0@example.com", "password": "password"})
+
+    def analyze():
+        if dialect_name == "postgresql":
+            with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                connection.execute(text("VACUUM ANALYZE user_packages"))
+                connection.execute(text("VACUUM ANALYZE package_revenue"))
+
+    # historical subscriptions end a day ago, the incremental batches are made after the refresh
+    now = datetime.now(local_timezone)
+    history_until = now - timedelta(days=1)
+    history_since = history_until - timedelta(days=30 * args.months)
+    report = {"seed": seed, "users": args.users, "packages": args.packages, "dialect": dialect_name, "sizes": {}}
+    loaded = 0
+    for size in sizes:
+        with app.app_context():
+            end = size - args.batch
+            loaded += load(db, (subscription_rows(plan, packages, chunk, min(chunk + args.chunk_size, end),
+                                                  history_since, history_until, seed)
+                                for chunk in range(loaded, end, args.chunk_size)))
+            print(f"user_packages: {loaded} rows ({perf_counter() - start:.0f}s)", file=sys.stderr)
+            analyze()
+
+            # full refresh: the aggregates rebuilt from every row
+            db.session.execute(delete(PackageRevenue))
+            db.session.execute(delete(ReportWatermark).where(ReportWatermark.report == revenue.REPORT))
+            db.session.commit()
+            started = perf_counter()
+            revenue.refresh_revenue()
+            full_refresh = perf_counter() - started
+
+            # incremental refresh: as if the last refresh ran before the batch was subscribed
+            db.session.get(ReportWatermark, revenue.REPORT).refreshed_until = history_until
+            db.session.commit()
+            loaded += load(db, [subscription_rows(plan, packages, loaded, loaded + args.batch, history_until,
+                                                  now - 2 * revenue.SETTLE_DELAY, seed)])
+            started = perf_counter()
+            revenue.refresh_revenue()
+            incremental_refresh = perf_counter() - started
+            analyze()
+
+            aggregate_rows = db.session.query(PackageRevenue).count()
+            direct = []
+            for _ in range(args.direct_runs):
+                started = perf_counter()
+                db.session.execute(direct_statement(dialect_name)).all()
+                direct.append(perf_counter() - started)
+            db.session.rollback()
+
+        endpoints = {}
+        for name, path in (("by_month_package_country", "/reports/revenue"),
+                           ("by_month", "/reports/revenue?group_by=month")):
+            times = []
+            for _ in range(args.runs):
+                started = perf_counter()
+                response = client.get(path)
+                times.append(perf_counter() - started)
+                assert response.status_code == 200, response.get_data(as_text=True)
+            endpoints[name] = latency(times)
+
+        report["sizes"][loaded] = {
+            "aggregate_rows": aggregate_rows,
+            "full_refresh_s": round(full_refresh, 2),
+            "incremental_refresh_ms": round(incremental_refresh * 1000, 1),
+            "incremental_rows": args.batch,
+            "report": endpoints,
+            "direct_aggregate": latency(direct),
+        }
+        print(json.dumps(report["sizes"][loaded]), file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
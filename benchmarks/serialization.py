@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+"""
+Serialization benchmark: to_dict + JSON response of User, Group and
+GroupRequest rows, at 1, 100 and 10k rows, for each JSON backend.
+The "strftime" encoder is the per-field strftime serialization the
+compiled encoders replaced, kept here as the baseline.
+
+    python benchmarks/serialization.py [--repeat 5] [--output results.json]
+"""
+import argparse
+import json
+import sys
+from datetime import date, datetime, time, timedelta
+from os.path import abspath, dirname
+from time import perf_counter
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from app.app import create_app
+from app.utils.serialization import OrjsonProvider
+from flask.json.provider import DefaultJSONProvider
+
+app = create_app()
+
+from app.models.user import User
+from app.models.role import Role
+from app.models.language import Language
+from app.models.group import Group
+from app.models.day import Day
+from app.models.group_day import GroupDay
+from app.models.group_request import GroupRequest
+
+TIME = "%a, %d %b %Y %I:%M:%S %p"
+ROW_COUNTS = (1, 100, 10000)
+
+
+def make_users(count):
+    role = Role(id=3, role="student", description="student")
+    language = Language(id=1, language="en")
+    now = datetime(2024, 5, 1, 14, 30, 15)
+    return [
+        User(id=f"user-{index}", username=f"user_{index}", email=f"user_{index}@example.com",
+             first_name="First", last_name="Last", phone_number=f"0100{index:07d}",
+             birth_date=date(2000, 1, 1), gender="MALE", nationality="Egyptian",
+             country="Egypt", time_zone="Africa/Cairo", level=3, is_active=True, photo=None,
+             parent_phone_number="01000000000", national_id=None, salary=None,
+             privileges=None, position=None,
+             last_login=now, created_at=now - timedelta(days=index % 365),
+             updated_at=now, role=role, language=language)
+        for index in range(count)
+    ]
+
+
+def make_groups(count):
+    days = [Day(id=index + 1, day=day) for index, day in enumerate(("Saturday", "Monday", "Wednesday"))]
+    now = datetime(2024, 5, 1, 9, 0, 0)
+    groups = []
+    for index in range(count):
+        group = Group(id=index, group=f"group {index}", size=20, status="coming",
+                      start_date=date(2024, 6, 1), end_date=date(2024, 9, 1),
+                      created_at=now, updated_at=now)
+        group.days = days
+        group.group_days = [GroupDay(day_id=day.id, time=time(17, 30)) for day in days]
+        groups.append(group)
+    return groups
+
+
+def make_requests(count):
+    now = datetime(2024, 5, 1, 9, 0, 0)
+    return [
+        GroupRequest(id=index, user_id=f"user-{index}", group_id=index % 50, role="student",
+                     status="pending", action="join", note=None, created_at=now, updated_at=now)
+        for index in range(count)
+    ]
+
+
+def strftime_user(user):
+    data = {name: getattr(user, name) for name in User.api_fields
+            if name not in ("last_login", "created_at", "updated_at", "role", "language")}
+    data.update(last_login=user.last_login.strftime(TIME), created_at=user.created_at.strftime(TIME),
+                updated_at=user.updated_at.strftime(TIME), role=user.role.role,
+                language=user.language.language)
+    return data
+
+
+def strftime_group(group):
+    days_with_time = [{"id": day.id, "day": day.day, "time": group_day.time.strftime("%I:%M:%S %p")}
+                      for day, group_day in zip(group.days, group.group_days)]
+    return {"id": group.id, "group": group.group, "size": group.size, "days": days_with_time,
+            "days_per_week": len(days_with_time), "status": group.status,
+            "start_date": group.start_date.strftime(TIME), "end_date": group.end_date.strftime(TIME),
+            "created_at": group.created_at.strftime(TIME), "updated_at": group.updated_at.strftime(TIME)}
+
+
+def strftime_request(req):
+    return {"id": req.id, "user_id": req.user_id, "group_id": req.group_id, "role": req.role,
+            "status": req.status, "action": req.action, "note": req.note,
+            "created_at": req.created_at.strftime(TIME), "updated_at": req.updated_at.strftime(TIME)}
+
+
+MODELS = {
+    "User": (make_users, strftime_user),
+    "Group": (make_groups, strftime_group),
+    "GroupRequest": (make_requests, strftime_request),
+}
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    backends = {"default": DefaultJSONProvider(app), "orjson": OrjsonProvider(app)}
+    results = []
+
+    with app.test_request_context():
+        for model, (make_rows, strftime_encoder) in MODELS.items():
+            for row_count in ROW_COUNTS:
+                rows = make_rows(row_count)
+                encoders = {"strftime": strftime_encoder, "compiled": lambda row: row.to_dict()}
+
+                # both encoders must produce the same payload
+                expected = backends["default"].response([strftime_encoder(row) for row in rows]).get_data()
+                assert backends["default"].response([row.to_dict() for row in rows]).get_data() == expected
+
+                for encoder_name, encoder in encoders.items():
+                    for backend_name, backend in backends.items():
+                        seconds = best_of(args.repeat, lambda: backend.response([encoder(row) for row in rows]))
+                        results.append({
+                            "model": model,
+                            "rows": row_count,
+                            "encoder": encoder_name,
+                            "backend": backend_name,
+                            "seconds": round(seconds, 6),
+                            "rows_per_second": round(row_count / seconds),
+                        })
+                        print(f"{model:<12} {row_count:>6} rows  {encoder_name:<8} {backend_name:<7} "
+                              f"{seconds * 1000:9.3f} ms")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+"""
+Compares the worker modes of the production server: starts gunicorn
+(gunicorn.conf.py) in each mode and runs the HTTP load test against it,
+then prints the load test reports side by side, with the memory of the
+workers, as JSON.
+
+    DB_USER=... DB_PASSWORD=... DB_HOST=... DB_NAME=... \\
+        python benchmarks/serving.py [--modes sync,gthread,gevent] [--clients 32] [--duration 10]
+
+The gevent mode is skipped when gevent is not installed. Extra settings of
+the server (WEB_WORKERS, WEB_THREADS, ...) are read from the environment.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+from importlib.util import find_spec
+from os.path import abspath, dirname, join
+from time import sleep
+from urllib.request import urlopen
+
+ROOT = dirname(dirname(abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url, server, timeout=60):
+    for _ in range(timeout * 10):
+        if server.poll() is not None:
+            raise RuntimeError(f"The server exited with status {server.returncode}")
+        try:
+            urlopen(url, timeout=1).read()
+            return
+        except OSError:
+            sleep(0.1)
+    raise RuntimeError("The server did not start")
+
+
+def workers_rss(master_pid):
+    """ Resident memory of the workers in MiB (Linux only, None elsewhere) """
+    try:
+        children = open(f"/proc/{master_pid}/task/{master_pid}/children").read().split()
+        total = 0
+        for pid in children:
+            for line in open(f"/proc/{pid}/status"):
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1])
+        return round(total / 1024, 1)
+    except OSError:
+        return None
+
+
+def run_mode(mode, args, workdir):
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ, WORKER_MODE=mode, BIND=f"127.0.0.1:{port}", PIDFILE=join(workdir, f"{mode}.pid"),
+               ACCESS_LOG=os.devnull, RATELIMIT_ENABLED="false", PACKAGE_EXPIRY_INTERVAL="0",
+               REVENUE_REFRESH_INTERVAL="0")
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_up(f"{base_url}/metrics", server)
+        output = join(workdir, f"{mode}.json")
+        loadtest = [sys.executable, join(ROOT, "benchmarks", "loadtest.py"), "--base-url", base_url,
+                    "--clients", str(args.clients), "--duration", str(args.duration),
+                    "--students", str(args.students), "--groups", str(args.groups), "--output", output]
+        for endpoint in args.only or ():
+            loadtest += ["--only", endpoint]
+        subprocess.run(loadtest, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, check=True)
+        with open(output) as file:
+            report = json.load(file)
+        report["workers_rss_mib"] = workers_rss(server.pid)
+        return report
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="sync,gthread,gevent")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per endpoint")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--groups", type=int, default=200)
+    parser.add_argument("--only", action="append", help="endpoint to test (repeatable), all by default")
+    parser.add_argument("--output", help="also write the report to this file")
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    report = {"clients": args.clients, "duration": args.duration, "modes": {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        for mode in modes:
+            if mode == "gevent" and not (find_spec("gevent") and find_spec("psycogreen")):
+                report["modes"][mode] = {"skipped": "gevent and psycogreen are not installed"}
+                continue
+            print(f"Benchmarking {mode}...", file=sys.stderr)
+            report["modes"][mode] = run_mode(mode, args, workdir)
+
+    # throughput of each mode per endpoint, for a quick look
+    report["requests_per_second"] = {
+        endpoint: {mode: result["endpoints"][endpoint]["requests_per_second"]
+                   for mode, result in report["modes"].items() if endpoint in result.get("endpoints", {})}
+        for result in report["modes"].values() for endpoint in result.get("endpoints", {})
+    }
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
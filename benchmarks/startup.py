@@ -0,0 +1,87 @@
+#!/usr/bin/python3
+"""
+Worker cold-start benchmark: time to import the app (create_app included)
+in a fresh interpreter, in the default and serve modes, and the slowest
+packages to import in serve mode, from `python -X importtime`.
+
+    SECRET_KEY=... python benchmarks/startup.py [--runs 10] [--history benchmarks/startup.jsonl]
+
+With --history the report is appended as one JSON line (with the commit and
+the date), to track the startup time over time.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime, timezone
+from os.path import abspath, dirname
+from statistics import median
+
+ROOT = dirname(dirname(abspath(__file__)))
+
+TIMED_IMPORT = "import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+
+
+def run_python(args, mode):
+    env = dict(os.environ, APP_MODE=mode, PYTHONDONTWRITEBYTECODE="1")
+    env.setdefault("SECRET_KEY", "startup-benchmark")
+    return subprocess.run([sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+
+
+def startup_times(module, mode, runs):
+    times = [float(run_python(["-c", TIMED_IMPORT.format(module=module)], mode).stdout.split()[-1])
+             for _ in range(runs)]
+    return {"median_ms": round(median(times) * 1000, 1), "min_ms": round(min(times) * 1000, 1)}
+
+
+def slowest_imports(module, mode, top):
+    """ Import time (own time of the modules, summed) per top level package """
+    stderr = run_python(["-X", "importtime", "-c", f"import {module}"], mode).stderr
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        if own.strip().isdigit():
+            package = name.strip().split(".")[0]
+            packages[package] = packages.get(package, 0) + int(own) / 1000
+    return [{"package": name, "ms": round(ms, 1)}
+            for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:top]]
+
+
+def current_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="interpreters started per mode")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports listed")
+    parser.add_argument("--history", help="append the report to this JSON lines file")
+    args = parser.parse_args()
+
+    report = {
+        "commit": current_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        # run.py is what `python run.py` / `flask` load, wsgi.py what the server workers load
+        "default": startup_times("run", "default", args.runs),
+        "serve": startup_times("wsgi", "serve", args.runs),
+        "serve_import_time_by_package": slowest_imports("wsgi", "serve", args.top),
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.history:
+        with open(args.history, "a") as file:
+            file.write(json.dumps(report) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
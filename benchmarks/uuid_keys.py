@@ -0,0 +1,166 @@
+#!/usr/bin/python3
+"""
+User id benchmark, VARCHAR(50) random UUID4 strings (before) against native
+time-ordered UUID7 (after): size of the primary key and membership indexes,
+insert throughput of the users and their memberships, and latency of the
+membership joins, on scratch copies of users/user_groups (Postgres).
+
+    DB_USER=... DB_PASSWORD=... DB_HOST=... DB_NAME=... \\
+        python benchmarks/uuid_keys.py [--users 1000000] [--memberships 10000000] [--groups 50000]
+
+The tables are created in the "bench_uuid_keys" schema, dropped at the end
+(unless --keep). The rows are inserted in registration order, a user and
+their memberships at a time, the way the application writes them.
+"""
+import argparse
+import json
+import sys
+from os.path import abspath, dirname
+from random import Random
+from statistics import median, quantiles
+from time import perf_counter
+from uuid import uuid4
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+
+SCHEMA = "bench_uuid_keys"
+
+# variant: (id column type, id generator)
+VARIANTS = {
+    "varchar_uuid4": ("VARCHAR(50)", lambda: str(uuid4())),
+    "uuid_uuid7": ("uuid", None),  # app.utils.ids.new_id, imported in main
+}
+
+
+def create_tables(connection, variant, id_type):
+    connection.execute(text(f"CREATE TABLE {SCHEMA}.users_{variant} (id {id_type} PRIMARY KEY, username VARCHAR(50) NOT NULL)"))
+    # same shape as user_groups: the primary key leads with the user id
+    connection.execute(text(
+        f"CREATE TABLE {SCHEMA}.user_groups_{variant} ("
+        f"user_id {id_type} NOT NULL REFERENCES {SCHEMA}.users_{variant} (id), "
+        f"group_id INTEGER NOT NULL, timestamp TIMESTAMP NOT NULL DEFAULT now(), "
+        f"PRIMARY KEY (user_id, group_id))"
+    ))
+    connection.execute(text(f"CREATE INDEX ON {SCHEMA}.user_groups_{variant} (group_id)"))
+
+
+def load(engine, variant, new_id, args):
+    """ Insert the users and their memberships in chunks, return (user ids, users, memberships, seconds) """
+    rng = Random(args.seed)
+    per_user = args.memberships // args.users
+    extra = args.memberships - per_user * args.users
+    ids = []
+    users_inserted = memberships_inserted = 0
+    start = perf_counter()
+    for chunk_start in range(0, args.users, args.chunk_size):
+        users, memberships = [], []
+        for index in range(chunk_start, min(chunk_start + args.chunk_size, args.users)):
+            user_id = new_id()
+            users.append({"id": user_id, "username": f"u{index}"})
+            count = per_user + (1 if index < extra else 0)
+            for group_id in rng.sample(range(1, args.groups + 1), count):
+                memberships.append({"user_id": user_id, "group_id": group_id})
+            ids.append(user_id)
+        with engine.begin() as connection:
+            connection.execute(text(f"INSERT INTO {SCHEMA}.users_{variant} (id, username) VALUES (:id, :username)"), users)
+            connection.execute(text(
+                f"INSERT INTO {SCHEMA}.user_groups_{variant} (user_id, group_id) VALUES (:user_id, :group_id)"
+            ), memberships)
+        users_inserted += len(users)
+        memberships_inserted += len(memberships)
+        print(f"{variant}: {users_inserted} users, {memberships_inserted} memberships "
+              f"({perf_counter() - start:.0f}s)", file=sys.stderr)
+    return ids, users_inserted, memberships_inserted, perf_counter() - start
+
+
+def sizes(connection, variant):
+    """ Size in MiB of the tables and of each of their indexes """
+    rows = connection.execute(text(
+        "SELECT c.relname, pg_relation_size(c.oid) FROM pg_class c "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace WHERE n.nspname = :schema AND c.relname LIKE :pattern"
+    ), {"schema": SCHEMA, "pattern": f"%{variant}%"}).all()
+    return {name: round(size / 1024 / 1024, 1) for name, size in sorted(rows)}
+
+
+def timed(connection, statement, parameters, runs):
+    times = []
+    for params in parameters[:runs]:
+        start = perf_counter()
+        connection.execute(statement, params).all()
+        times.append(perf_counter() - start)
+    p95 = quantiles(times, n=20)[-1] if len(times) > 1 else times[0]
+    return {"p50_ms": round(median(times) * 1000, 3), "p95_ms": round(p95 * 1000, 3)}
+
+
+def join_latency(connection, variant, id_type, ids, args):
+    rng = Random(args.seed + 1)
+    groups = [{"group_id": rng.randint(1, args.groups)} for _ in range(args.runs)]
+    users = [{"ids": rng.sample(ids, 100)} for _ in range(args.runs)]
+    return {
+        # the roster of a group: memberships by group, then the users by primary key
+        "group_roster": timed(connection, text(
+            f"SELECT u.id, u.username FROM {SCHEMA}.user_groups_{variant} m "
+            f"JOIN {SCHEMA}.users_{variant} u ON u.id = m.user_id WHERE m.group_id = :group_id"
+        ), groups, args.runs),
+        # the groups of 100 users: the membership primary key, by user id
+        "groups_of_users": timed(connection, text(
+            f"SELECT u.id, m.group_id FROM {SCHEMA}.users_{variant} u "
+            f"JOIN {SCHEMA}.user_groups_{variant} m ON m.user_id = u.id WHERE u.id = ANY(CAST(:ids AS {id_type.split('(')[0]}[]))"
+        ), users, args.runs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-uri", help="defaults to the DB_* environment variables")
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--memberships", type=int, default=10000000)
+    parser.add_argument("--groups", type=int, default=50000)
+    parser.add_argument("--chunk-size", type=int, default=5000, help="users per transaction")
+    parser.add_argument("--runs", type=int, default=200, help="queries per join")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch tables")
+    args = parser.parse_args()
+
+    from app.app import create_app
+    from app.utils.ids import new_id
+
+    config = {"SQLALCHEMY_DATABASE_URI": args.database_uri} if args.database_uri else None
+    uri = create_app(config).config["SQLALCHEMY_DATABASE_URI"]
+    engine = create_engine(uri)
+    if engine.dialect.name != "postgresql":
+        print("This benchmark needs Postgres (native uuid type, pg_relation_size).", file=sys.stderr)
+        return 1
+
+    report = {"users": args.users, "memberships": args.memberships, "groups": args.groups, "variants": {}}
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        connection.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    try:
+        for variant, (id_type, generator) in VARIANTS.items():
+            with engine.begin() as connection:
+                create_tables(connection, variant, id_type)
+            ids, users, memberships, seconds = load(engine, variant, generator or new_id, args)
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                connection.execute(text(f"VACUUM ANALYZE {SCHEMA}.users_{variant}"))
+                connection.execute(text(f"VACUUM ANALYZE {SCHEMA}.user_groups_{variant}"))
+            with engine.connect() as connection:
+                report["variants"][variant] = {
+                    "insert_rows_per_second": round((users + memberships) / seconds),
+                    "insert_seconds": round(seconds, 1),
+                    "size_mib": sizes(connection, variant),
+                    "join_latency": join_latency(connection, variant, id_type, ids, args),
+                }
+    finally:
+        if not args.keep:
+            with engine.begin() as connection:
+                connection.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+"""
+Gunicorn settings of the production server (see serve.sh), from the environment:
+
+    WORKER_MODE       sync, gthread (default) or gevent (I/O-bound endpoints, needs gevent and
+                      psycogreen: pip install -r requirements-gevent.txt)
+    WEB_WORKERS       worker processes, sized from the CPUs and the database connections by default
+    WEB_THREADS       threads per gthread worker, the DB pool size + overflow by default
+    WORKER_CONNECTIONS  concurrent requests per gevent worker (100)
+    DB_MAX_CONNECTIONS  connections the database accepts from this server (100), shared by
+                      the sync pools and, with ASYNC_READS, the async pools of the workers
+    MAX_REQUESTS      requests before a worker is replaced, bounds the memory growth (1000, 0 disables it)
+    BIND, TIMEOUT, GRACEFUL_TIMEOUT, PIDFILE
+"""
+import multiprocessing
+from importlib.util import find_spec
+from os import getenv
+
+worker_mode = getenv("WORKER_MODE", "gthread")
+if worker_mode not in ("sync", "gthread", "gevent"):
+    raise ValueError(f"Invalid WORKER_MODE: {worker_mode}, use sync, gthread or gevent")
+if worker_mode == "gevent":
+    # checked in the master, without importing them before the workers patch the standard library
+    missing = [name for name in ("gevent", "psycogreen") if find_spec(name) is None]
+    if missing:
+        raise ImportError(f"WORKER_MODE=gevent needs {' and '.join(missing)}, "
+                          f"install them with: pip install -r requirements-gevent.txt")
+
+cpus = multiprocessing.cpu_count()
+
+# Every worker can hold up to pool size + overflow connections (see create_app),
+# plus those of the async engine when the listings run on it
+sync_connections = int(getenv("DB_POOL_SIZE", 5)) + int(getenv("DB_MAX_OVERFLOW", 10))
+connections_per_worker = sync_connections
+if getenv("ASYNC_READS", "false").lower() == "true":
+    connections_per_worker += int(getenv("DB_ASYNC_POOL_SIZE", 4)) + int(getenv("DB_ASYNC_MAX_OVERFLOW", 0))
+max_workers = max(1, int(getenv("DB_MAX_CONNECTIONS", 100)) // connections_per_worker)
+
+if worker_mode == "sync":
+    # one request at a time per worker, CPU and I/O wait overlap between processes
+    default_workers = 2 * cpus + 1
+else:
+    # concurrency comes from the threads (or greenlets) of each worker
+    default_workers = cpus + 1
+
+workers = int(getenv("WEB_WORKERS", min(default_workers, max_workers)))
+worker_class = worker_mode
+
+if worker_mode == "gthread":
+    # more threads than connections would only queue on the pool
+    threads = int(getenv("WEB_THREADS", sync_connections))
+elif worker_mode == "gevent":
+    # requests waiting for a connection queue on the pool (DB_POOL_TIMEOUT)
+    worker_connections = int(getenv("WORKER_CONNECTIONS", 100))
+
+bind = getenv("BIND", "0.0.0.0:8000")
+timeout = int(getenv("TIMEOUT", 30))
+graceful_timeout = int(getenv("GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+pidfile = getenv("PIDFILE", "/tmp/mn_noor.pid")
+
+# Recycle the workers, with jitter so they do not all restart at once
+max_requests = int(getenv("MAX_REQUESTS", 1000))
+max_requests_jitter = max_requests // 10
+
+# Import the app once in the master, the workers fork from it (fast startup, shared memory).
+# Not with gevent: the app must be imported after the workers patched the standard library.
+preload_app = worker_mode != "gevent"
+
+accesslog = getenv("ACCESS_LOG", "-")
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    # the engines of a preloaded app are reset by the fork hook of app.utils.db_pool
+    if worker_mode == "gevent":
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+    server.log.info(f"Worker {worker.pid} started ({worker_mode})")
+
+
+def when_ready(server):
+    server.log.info(f"Serving with {workers} {worker_mode} worker(s), "
+                    f"{connections_per_worker} DB connection(s) max per worker")
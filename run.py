@@ -39,6 +39,27 @@ def conflict_error(error):
         "message": str(error.description)
         }), 409
 
+@app.errorhandler(410)
+def gone_error(error):
+    return jsonify({
+        "status": "error: Gone",
+        "message": str(error.description)
+        }), 410
+
+@app.errorhandler(413)
+def payload_too_large_error(error):
+    return jsonify({
+        "status": "error: Payload Too Large",
+        "message": str(error.description)
+        }), 413
+
+@app.errorhandler(422)
+def unprocessable_entity_error(error):
+    return jsonify({
+        "status": "error: Unprocessable Entity",
+        "message": str(error.description)
+        }), 422
+
 @app.errorhandler(429)
 def ratelimit_error(error):
     return {
@@ -0,0 +1,41 @@
+#!/bin/bash
+# Production server: ./serve.sh [start|reload|stop], settings in gunicorn.conf.py
+#
+# reload replaces the workers without dropping requests: a new master is
+# started with the new code on the same socket (USR2, it writes $PIDFILE.2),
+# the old one stops once the new one is up, finishing its in-flight
+# requests (TERM), and the new master takes over $PIDFILE.
+
+cd "$(dirname "$0")"
+PIDFILE="${PIDFILE:-/tmp/mn_noor.pid}"
+export PIDFILE
+
+case "${1:-start}" in
+    start)
+        exec gunicorn -c gunicorn.conf.py wsgi:app
+        ;;
+    reload)
+        old_pid=$(cat "$PIDFILE") || exit 1
+        kill -USR2 "$old_pid"
+        for _ in $(seq 60); do
+            sleep 1
+            new_pid=$(cat "$PIDFILE.2" 2>/dev/null)
+            if [ -n "$new_pid" ]; then
+                # give the new workers time to boot before the old ones stop
+                sleep "${RELOAD_WARMUP:-5}"
+                kill -TERM "$old_pid"
+                echo "Reloaded: $old_pid -> $new_pid"
+                exit 0
+            fi
+        done
+        echo "The new master did not start, $old_pid keeps serving" >&2
+        exit 1
+        ;;
+    stop)
+        kill -TERM "$(cat "$PIDFILE")"
+        ;;
+    *)
+        echo "Usage: $0 [start|reload|stop]" >&2
+        exit 2
+        ;;
+esac
@@ -0,0 +1,145 @@
+#!/usr/bin/python3
+from datetime import date, time
+from itertools import count
+import pytest
+from app.app import create_app, db
+from app.utils.listing_cache import listing_cache
+
+
+PASSWORD = "password123"
+DAYS = ("Saturday", "Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday")
+
+
+@pytest.fixture
+def app_config():
+    """ Settings of the app fixture, overridden by the tests needing others """
+    return {}
+
+
+@pytest.fixture
+def app(tmp_path, app_config):
+    """ The app on a throwaway SQLite database, with the roles, a language and the days """
+    app = create_app({
+        "TESTING": True,
+        "SECRET_KEY": "test",
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}",
+        "RATELIMIT_ENABLED": False,
+        "BCRYPT_LOG_ROUNDS": 4,
+        "PHOTO_FOLDER": str(tmp_path / "photos"),
+        # no periodic task started by the requests
+        "PACKAGE_EXPIRY_INTERVAL": 0,
+        "REVENUE_REFRESH_INTERVAL": 0,
+        "IDEMPOTENCY_PURGE_INTERVAL": 0,
+        "CHANGE_LOG_PURGE_INTERVAL": 0,
+        **app_config,
+    })
+
+    from app.models.role import Role
+    from app.models.language import Language
+    from app.models.day import Day
+
+    with app.app_context():
+        # the primary only: the replica binds of earlier test apps stay in the metadata of db
+        db.create_all(bind_key=None)
+        db.session.add_all(Role(role=role, description=role) for role in ("admin", "teacher", "student"))
+        db.session.add(Language(language="en"))
+        db.session.add_all(Day(day=day) for day in DAYS)
+        db.session.commit()
+    yield app
+    # the cached listings are shared by the apps, the versions of two test databases can be equal
+    listing_cache.clear()
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """ Create a user of a role, return its id """
+    from app.models.user import User
+    from app.models.role import Role
+    from app.models.language import Language
+
+    numbers = count(1)
+
+    def make_user(role="student", **fields):
+        number = next(numbers)
+        with app.app_context():
+            user = User(**{
+                "username": f"{role}{number}", "email": f"{role}{number}@example.com", "password": "",
+                "phone_number": f"+2010{number:08d}", "first_name": "Test", "last_name": "User",
+                "birth_date": date(2000, 1, 1), "gender": "MALE", "nationality": "Egyptian", "country": "Egypt",
+                "time_zone": "Africa/Cairo", "role_id": Role.query.filter_by(role=role).one().id,
+                "language_id": Language.query.first().id, **fields,
+            })
+            user.set_password(PASSWORD)
+            db.session.add(user)
+            db.session.commit()
+            return str(user.id)
+
+    return make_user
+
+
+@pytest.fixture
+def login(app):
+    """ A new test client logged in as the user with this id """
+    from app.models.user import User
+
+    def login(user_id):
+        with app.app_context():
+            email = db.session.get(User, user_id).email
+        client = app.test_client()
+        response = client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return client
+
+    return login
+
+
+@pytest.fixture
+def make_group(app):
+    """ Create a group (on Saturday and Monday by default), return its id """
+    from app.models.group import Group
+    from app.models.group_day import GroupDay
+    from app.models.day import Day
+
+    numbers = count(1)
+
+    def make_group(days=("Saturday", "Monday"), **fields):
+        fields = {"group": f"Group {next(numbers)}", "size": 30, "status": "coming",
+                  "start_date": date(2030, 1, 5), "end_date": date(2030, 3, 30), **fields}
+        with app.app_context():
+            group = Group(**fields)
+            db.session.add(group)
+            db.session.flush()
+            for day in days:
+                db.session.add(GroupDay(group_id=group.id, day_id=Day.query.filter_by(day=day).one().id,
+                                        time=time(10)))
+            db.session.commit()
+            return group.id
+
+    return make_group
+
+
+@pytest.fixture
+def make_package(app):
+    """ Create a package (private, 4 sessions by default), return its id """
+    from app.models.package import Package
+
+    numbers = count(1)
+
+    def make_package(**fields):
+        fields = {"package": f"Package {next(numbers)}", "session_type": "private", "price": 100,
+                  "duration": 30, "max_sessions": 4, **fields}
+        with app.app_context():
+            package = Package(**fields)
+            db.session.add(package)
+            db.session.commit()
+            return package.id
+
+    return make_package
@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+from threading import Event, enumerate as threads
+from app.app import db
+
+
+def test_deleting_an_account_queues_it_for_the_purger(app, make_user, login, monkeypatch):
+    from app.models.user import User
+    from app.models.account_deletion import AccountDeletion
+    from app.tasks.account_deletion import purge_pending_accounts
+    import app.views.auth.profile as profile
+
+    woken = []
+    monkeypatch.setattr(profile, "wake_worker", woken.append)
+    user_id = make_user()
+    client = login(user_id)
+
+    assert client.delete("/profile/delete_account", json={"password": "wrong"}).status_code == 400
+    assert client.delete("/profile/delete_account", json={"password": "password123"}).status_code == 200
+    assert woken == [purge_pending_accounts]
+    with app.app_context():
+        assert db.session.get(User, user_id).is_active is False
+        assert AccountDeletion.query.one().status == "pending"
+
+        assert purge_pending_accounts(batch_size=1) == 1
+        assert db.session.get(User, user_id) is None
+        assert AccountDeletion.query.one().status == "done"
+        # nothing left to claim
+        assert purge_pending_accounts() == 0
+
+
+def test_a_deletion_is_claimed_once(app, make_user):
+    from app.models.account_deletion import AccountDeletion
+    from app.tasks.account_deletion import claim_next_deletion
+
+    user_id = make_user()
+    with app.app_context():
+        db.session.add(AccountDeletion(user_id=user_id))
+        db.session.commit()
+        claim = claim_next_deletion()
+        assert claim[1] == user_id
+        assert claim_next_deletion() is None
+
+
+def test_wakes_run_in_one_worker_and_coalesce(app):
+    from app.tasks.background import wake_worker
+
+    running, release, done = Event(), Event(), Event()
+    runs = []
+
+    def coalesced_task():
+        runs.append(1)
+        running.set()
+        release.wait(5)
+        if len(runs) == 2:
+            done.set()
+
+    with app.app_context():
+        wake_worker(coalesced_task)
+        assert running.wait(5)
+        # woken three times while it runs: one more run
+        for _ in range(3):
+            wake_worker(coalesced_task)
+        release.set()
+        assert done.wait(5)
+
+    assert len(runs) == 2
+    assert sum(thread.name == "coalesced_task" for thread in threads()) == 1
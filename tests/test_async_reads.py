@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+import pytest
+from app.app import db
+from app.utils.async_db import async_uri
+
+
+def queries(response):
+    return int(response.headers["Server-Timing"].split('desc="')[1].split()[0])
+
+
+def payload(response):
+    """ The JSON of a listing, the students of a group in id order (neither path orders them) """
+    body = response.get_json()
+    if "group" in body:
+        body["group"]["students"].sort(key=lambda student: student["id"])
+    return body
+
+
+@pytest.fixture
+def listings(app, make_user, make_group):
+    """ 12 groups, the first with 3 students, and 3 pending requests; the paths of the listings """
+    from app.models.group_request import GroupRequest
+    from app.models.user_group import UserGroup
+
+    app.config["GROUPS_CACHE_TTL"] = 0
+    group_ids = [make_group(size=20 + index) for index in range(12)]
+    student_ids = [make_user() for _ in range(3)]
+    with app.app_context():
+        db.session.add_all(UserGroup(user_id=student_id, group_id=group_ids[0]) for student_id in student_ids)
+        db.session.add_all(GroupRequest(user_id=student_id, group_id=group_ids[1], role="student", action="join",
+                                        note="please") for student_id in student_ids)
+        db.session.commit()
+    return ["/groups/?page=1&per_page=5", "/groups/?page=3&per_page=5", "/groups/?fields=id,days&per_page=20",
+            f"/groups/get_student_list_of_group/{group_ids[0]}", "/groups/pending_requests?per_page=2",
+            f"/groups/pending_requests?group_id={group_ids[1]}&page=2&per_page=2"]
+
+
+def test_async_listings_match_the_sync_ones(app, make_user, login, listings):
+    client = login(make_user("admin"))
+    sync_responses = [client.get(path) for path in listings]
+    sync = [payload(response) for response in sync_responses]
+
+    app.config["ASYNC_READS"] = True
+    responses = [client.get(path) for path in listings]
+    assert [payload(response) for response in responses] == sync
+    # the group and its students in two concurrent queries instead of one joined, both counted
+    assert queries(responses[3]) == queries(sync_responses[3]) + 1
+
+
+def test_async_uri():
+    assert async_uri({"SQLALCHEMY_DATABASE_URI": "postgresql+psycopg2://user:secret@db/noor"}) == \
+        "postgresql+asyncpg://user:secret@db/noor"
+    assert async_uri({"SQLALCHEMY_DATABASE_URI": "sqlite:///noor.db"}) == "sqlite+aiosqlite:///noor.db"
+    assert async_uri({"ASYNC_DATABASE_URI": "postgresql+asyncpg://other/noor"}) == "postgresql+asyncpg://other/noor"
@@ -0,0 +1,70 @@
+#!/usr/bin/python3
+from datetime import date, time
+import pytest
+from app.app import db
+
+
+@pytest.fixture
+def group_session(app, make_user, make_group):
+    """ A group session of a teacher, the group has 3 students """
+    from app.models.group import Group
+    from app.models.session import Session
+    from app.models.user_group import UserGroup
+
+    teacher_id = make_user("teacher")
+    student_ids = [make_user() for _ in range(3)]
+    group_id = make_group()
+    with app.app_context():
+        db.session.get(Group, group_id).teacher_id = teacher_id
+        db.session.add_all(UserGroup(user_id=student_id, group_id=group_id) for student_id in student_ids)
+        session = Session(date=date(2030, 1, 5), start_time=time(10), end_time=time(11), length=60,
+                          type="group", user_id=teacher_id, group_id=group_id)
+        db.session.add(session)
+        db.session.commit()
+        return {"teacher": teacher_id, "students": student_ids, "session": session.id}
+
+
+def test_bulk_attendance(app, login, make_user, group_session):
+    from app.models.user_session import UserSession
+
+    teacher = login(group_session["teacher"])
+    path = f"/sessions/{group_session['session']}/attendance"
+    first, second, third = group_session["students"]
+
+    response = teacher.post(path, json={"user_ids": [first, second, first]})
+    assert response.status_code == 201
+    assert (response.get_json()["recorded"], response.get_json()["already_recorded"]) == (2, 0)
+
+    # submitting it again only adds the missing rows
+    response = teacher.post(path, json={"user_ids": [first, second, third]})
+    assert (response.get_json()["recorded"], response.get_json()["already_recorded"]) == (1, 2)
+
+    with app.app_context():
+        rows = UserSession.query.filter_by(session_id=group_session["session"]).all()
+        assert {row.user_id for row in rows} == {first, second, third}
+        # free, no package session is used
+        assert not any(row.metered for row in rows)
+
+
+def test_bulk_attendance_checks(app, login, make_user, group_session):
+    path = f"/sessions/{group_session['session']}/attendance"
+    assert login(make_user("teacher")).post(path, json={"user_ids": group_session["students"]}).status_code == 403
+
+    teacher = login(group_session["teacher"])
+    assert teacher.post(path, json={"user_ids": []}).status_code == 400
+    assert teacher.post(path, json={"user_ids": [1]}).status_code == 400
+    outsider = make_user()
+    response = teacher.post(path, json={"user_ids": [group_session["students"][0], outsider]})
+    assert response.status_code == 400
+    assert outsider in response.get_data(as_text=True)
+    assert teacher.post("/sessions/999/attendance", json={"user_ids": [outsider]}).status_code == 404
+
+
+def test_the_fallback_without_upsert(app, group_session, monkeypatch):
+    from app.utils import attendance
+
+    monkeypatch.setattr(attendance, "supports_upsert", lambda connection: False)
+    with app.app_context():
+        assert attendance.record_attendance(group_session["session"], group_session["students"][:2]) == 2
+        assert attendance.record_attendance(group_session["session"], group_session["students"]) == 1
+        db.session.commit()
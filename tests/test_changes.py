@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app.app import db
+
+
+def changes(client, since, **params):
+    response = client.get("/changes", query_string={"since": since, **params})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def group_ids(page):
+    """ Ids of the groups of the changes (a group key is its id) """
+    return {change["key"].get("group_id", change["key"].get("id")) for change in page["changes"]}
+
+
+def test_the_current_cursor(app, make_user, login, make_group):
+    client = login(make_user())
+    assert client.get("/changes").get_json()["cursor"] == "0.0"
+    make_group()
+    cursor = client.get("/changes").get_json()["cursor"]
+    assert changes(client, cursor) == {"changes": [], "cursor": cursor, "has_more": False}
+
+
+def test_changes_carry_the_current_rows(app, make_user, login, make_group):
+    client = login(make_user("admin"))
+    group_id = make_group(days=("Sunday",))
+    page = changes(client, "0.0")
+    assert [(change["table"], change["operation"]) for change in page["changes"]] == \
+        [("groups", "insert"), ("group_days", "insert")]
+    assert page["changes"][0]["data"]["id"] == group_id
+    assert page["changes"][1]["key"] == {"group_id": group_id, "day_id": page["changes"][1]["data"]["day_id"]}
+
+    with app.app_context():
+        from app.models.group import Group
+        db.session.delete(db.session.get(Group, group_id))
+        db.session.commit()
+    deleted = changes(client, page["cursor"])["changes"]
+    assert [(change["table"], change["operation"], change["data"]) for change in deleted] == \
+        [("groups", "delete", None)]
+
+
+def test_changes_of_groups_the_user_cannot_view_are_dropped(app, make_user, login, make_group):
+    student_id = make_user()
+    client = login(student_id)
+    hidden = make_group(status="running")
+    coming = make_group()
+
+    # a running group is visible to its members only
+    page = changes(client, "0.0")
+    assert group_ids(page) == {coming}
+    assert len(page["changes"]) == 3
+
+    # the cursor still moves past the dropped changes, a page can be empty
+    first = changes(client, "0.0", limit=3)
+    assert first["changes"] == [] and first["has_more"] is True
+    second = changes(client, first["cursor"], limit=3)
+    assert len(second["changes"]) == 3 and second["has_more"] is False
+    assert second["cursor"] == page["cursor"]
+
+    # members see it
+    with app.app_context():
+        from app.models.user_group import UserGroup
+        db.session.add(UserGroup(user_id=student_id, group_id=hidden))
+        db.session.commit()
+    assert group_ids(changes(client, "0.0")) == {coming, hidden}
+
+
+def test_cursors(app, make_user, login, make_group):
+    from app.models.change_log import ChangeLog
+    from app.tasks.change_log import purge_change_log
+
+    client = login(make_user())
+    assert client.get("/changes", query_string={"since": "nope"}).status_code == 400
+    assert client.get("/changes", query_string={"since": "0.0", "limit": 0}).status_code == 400
+
+    make_group()
+    cursor = changes(client, "0.0", limit=1)["cursor"]
+    make_group()
+    with app.app_context():
+        db.session.execute(update(ChangeLog).values(changed_at=datetime.now() - timedelta(days=30)))
+        db.session.commit()
+        assert purge_change_log(7) == 5
+
+    # the changes after the cursor are gone
+    assert client.get("/changes", query_string={"since": cursor}).status_code == 410
+    latest = client.get("/changes").get_json()["cursor"]
+    assert changes(client, latest)["changes"] == []
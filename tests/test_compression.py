@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+import gzip
+import pytest
+from flask import Response, jsonify
+
+
+@pytest.fixture
+def routes(app):
+    """ A large JSON listing, a small one and a streamed CSV """
+    rows = [{"id": number, "group": f"Group {number}", "status": "coming"} for number in range(200)]
+
+    app.add_url_rule("/test/large", "large", lambda: jsonify(rows))
+    app.add_url_rule("/test/small", "small", lambda: jsonify(rows[:1]))
+    app.add_url_rule("/test/stream", "stream", lambda: Response(
+        (f"{row['id']},{row['group']}\n" for row in rows), mimetype="text/csv"))
+    return app.test_client()
+
+
+def test_the_best_accepted_encoding_is_used(routes):
+    brotli = pytest.importorskip("brotli")
+    plain = routes.get("/test/large")
+    assert "Content-Encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["Vary"]
+
+    response = routes.get("/test/large", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.data) == plain.data
+    assert len(response.data) < len(plain.data) // 4
+
+    response = routes.get("/test/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data) == plain.data
+
+
+def test_small_responses_are_sent_as_they_are(routes):
+    response = routes.get("/test/small", headers={"Accept-Encoding": "gzip, br"})
+    assert "Content-Encoding" not in response.headers
+    assert response.get_json() == [{"id": 0, "group": "Group 0", "status": "coming"}]
+
+
+def test_streamed_responses_are_compressed(routes):
+    plain = routes.get("/test/stream").data
+    response = routes.get("/test/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert gzip.decompress(response.data) == plain
+
+
+@pytest.mark.parametrize("app_config", [{"COMPRESS_MIN_SIZE": 0}])
+def test_compression_can_be_disabled(routes):
+    response = routes.get("/test/large", headers={"Accept-Encoding": "gzip, br"})
+    assert "Content-Encoding" not in response.headers
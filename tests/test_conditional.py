@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+
+
+def revalidate(client, path, etag):
+    return client.get(path, headers={"If-None-Match": f'"{etag}"'})
+
+
+def test_profile_etag(app, make_user, login):
+    client = login(make_user())
+    response = client.get("/profile/")
+    etag = response.headers["ETag"].strip('"')
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    not_modified = revalidate(client, "/profile/", etag)
+    assert not_modified.status_code == 304
+    assert not_modified.get_data() == b""
+    assert not_modified.headers["ETag"] == response.headers["ETag"]
+    assert client.get("/profile/", headers={"If-None-Match": "*"}).status_code == 304
+
+    assert client.patch("/profile/update_profile", json={"first_name": "Changed"}).status_code == 200
+    changed = revalidate(client, "/profile/", etag)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != response.headers["ETag"]
+
+
+def test_group_etags(app, make_user, login, make_group):
+    admin = login(make_user("admin"))
+    student_id = make_user()
+    group_id = make_group()
+
+    group = admin.get(f"/groups/{group_id}")
+    assert revalidate(admin, f"/groups/{group_id}", group.headers["ETag"].strip('"')).status_code == 304
+    students_path = f"/groups/get_student_list_of_group/{group_id}"
+    students = admin.get(students_path)
+    assert students.get_json()["group"]["total_students"] == 0
+    # the two representations of the group have their own tags
+    assert students.headers["ETag"] != group.headers["ETag"]
+
+    # a new member changes both
+    assert admin.post(f"/groups/add_student_to_group/{group_id}/{student_id}").status_code == 200
+    students_after = revalidate(admin, students_path, students.headers["ETag"].strip('"'))
+    assert students_after.status_code == 200
+    assert students_after.get_json()["group"]["total_students"] == 1
+    assert revalidate(admin, f"/groups/{group_id}", group.headers["ETag"].strip('"')).status_code == 200
+
+    # access is checked before the ETag
+    running = make_group(status="running")
+    student = login(make_user())
+    assert student.get(f"/groups/{running}", headers={"If-None-Match": "*"}).status_code == 403
+    assert admin.get("/groups/999").status_code == 404
@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+import re
+import pytest
+
+
+def queries(response):
+    return int(re.search(r'desc="(\d+) queries"', response.headers["Server-Timing"]).group(1))
+
+
+@pytest.fixture
+def browser(app, make_user, login, make_group):
+    make_group(size=15, days=("Saturday",))
+    make_group(size=25, days=("Saturday", "Monday"))
+    make_group(size=60, status="running", days=())
+    make_group(group="Other", size=35, status="finished", days=("Monday",))
+    return login(make_user("admin"))
+
+
+def test_facets_count_the_matching_groups(browser):
+    body = browser.get("/groups/", query_string={"facets": "true", "per_page": 2}).get_json()
+    assert body["total_groups"] == 4 and body["total_pages"] == 2 and len(body["groups"]) == 2
+    facets = body["facets"]
+    assert facets["status"] == {"coming": 2, "running": 1, "finished": 1}
+    assert facets["size"] == {"1-20": 1, "21-30": 1, "31-40": 1, "41-50": 0, "51+": 1}
+    # a group without days is in no day facet
+    assert facets["day"]["Saturday"] == 2 and facets["day"]["Monday"] == 2 and facets["day"]["Friday"] == 0
+
+    # the facets share the filters of the listing
+    body = browser.get("/groups/", query_string={"facets": "true", "search": "group"}).get_json()
+    assert body["total_groups"] == 3
+    assert body["facets"]["status"] == {"coming": 2, "running": 1, "finished": 0}
+    assert "facets" not in browser.get("/groups/").get_json()
+
+
+@pytest.mark.parametrize("app_config", [{"GROUPS_CACHE_TTL": 0}])
+def test_the_query_count_does_not_depend_on_the_groups(browser, make_group):
+    params = {"facets": "true", "per_page": 100}
+    before = queries(browser.get("/groups/", query_string=params))
+    for _ in range(5):
+        make_group()
+    assert queries(browser.get("/groups/", query_string=params)) == before
+
+
+def test_the_facets_are_cached_with_the_page(browser, make_group):
+    params = {"facets": "true"}
+    first = browser.get("/groups/", query_string=params)
+    cached = browser.get("/groups/", query_string=params)
+    assert cached.get_json() == first.get_json()
+    assert queries(cached) < queries(first)
+
+    # a new group is a new version of the listing
+    make_group(size=45)
+    assert browser.get("/groups/", query_string=params).get_json()["facets"]["size"]["41-50"] == 1
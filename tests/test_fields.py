@@ -0,0 +1,30 @@
+#!/usr/bin/python3
+
+
+def test_profile_fields(app, make_user, login):
+    client = login(make_user())
+    full = client.get("/profile/").get_json()
+    sparse = client.get("/profile/?fields=id, username")
+    assert sparse.get_json() == {"id": full["id"], "username": full["username"]}
+    # another representation, another tag
+    assert sparse.headers["ETag"] != client.get("/profile/").headers["ETag"]
+
+    unknown = client.get("/profile/?fields=id,password")
+    assert unknown.status_code == 400
+    assert "password" in unknown.get_data(as_text=True)
+
+
+def test_group_fields(app, make_user, login, make_group):
+    client = login(make_user("admin"))
+    group_id = make_group(days=("Sunday", "Tuesday"))
+
+    full = client.get(f"/groups/{group_id}").get_json()
+    assert client.get(f"/groups/{group_id}?fields=id,days_per_week").get_json() == \
+        {"id": group_id, "days_per_week": 2}
+    assert client.get(f"/groups/{group_id}?fields=days").get_json() == {"days": full["days"]}
+
+    listing = client.get("/groups/?fields=id,group").get_json()
+    assert listing["groups"] == [{"id": group_id, "group": full["group"]}]
+    assert client.get("/groups/").get_json()["groups"] == [full]
+    assert client.get("/groups/?fields=nope").status_code == 400
+    assert client.get("/groups/pending_requests?fields=nope").status_code == 400
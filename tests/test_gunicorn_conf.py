@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+from os.path import abspath, dirname, join
+from runpy import run_path
+import pytest
+
+CONF = join(dirname(dirname(abspath(__file__))), "gunicorn.conf.py")
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    """ The settings of gunicorn.conf.py with these environment variables """
+    for name in ("WORKER_MODE", "WEB_WORKERS", "WEB_THREADS", "DB_POOL_SIZE", "DB_MAX_OVERFLOW",
+                 "DB_MAX_CONNECTIONS", "ASYNC_READS", "MAX_REQUESTS"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setattr("multiprocessing.cpu_count", lambda: 8)
+
+    def settings(**environment):
+        for name, value in environment.items():
+            monkeypatch.setenv(name, str(value))
+        return run_path(CONF)
+
+    return settings
+
+
+def test_threads_match_the_pool(settings):
+    conf = settings()
+    assert (conf["worker_class"], conf["workers"], conf["threads"]) == ("gthread", 6, 15)
+    assert conf["preload_app"] is True
+    assert (conf["max_requests"], conf["max_requests_jitter"]) == (1000, 100)
+
+
+def test_workers_fit_the_database_connections(settings):
+    assert settings(WORKER_MODE="sync")["workers"] == 6
+    assert settings(WORKER_MODE="sync", DB_MAX_CONNECTIONS=1000)["workers"] == 17
+    # the async pools count too
+    assert settings(DB_MAX_CONNECTIONS=40, ASYNC_READS="true")["workers"] == 2
+    assert settings(WEB_WORKERS=3)["workers"] == 3
+
+
+def test_invalid_modes(settings):
+    with pytest.raises(ValueError):
+        settings(WORKER_MODE="eventlet")
+
+
+def test_gevent_needs_its_packages(settings, monkeypatch):
+    monkeypatch.setattr("importlib.util.find_spec", lambda name: None)
+    with pytest.raises(ImportError, match="requirements-gevent.txt"):
+        settings(WORKER_MODE="gevent")
+
+
+def test_gevent_workers_import_the_app_themselves(settings, monkeypatch):
+    monkeypatch.setattr("importlib.util.find_spec", lambda name: object())
+    conf = settings(WORKER_MODE="gevent")
+    assert (conf["workers"], conf["worker_connections"], conf["preload_app"]) == (6, 100, False)
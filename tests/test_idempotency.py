@@ -0,0 +1,78 @@
+#!/usr/bin/python3
+from datetime import datetime, timedelta
+from threading import Event, Thread
+import pytest
+from flask import jsonify
+from sqlalchemy import update
+from app.app import db
+
+
+def test_a_retry_is_answered_from_the_stored_response(app, make_user, login, make_group):
+    from app.models.group_request import GroupRequest
+
+    client = login(make_user())
+    url = f"/groups/send_request/{make_group()}"
+    headers = {"Idempotency-Key": "join-1"}
+
+    first = client.post(url, json={"action": "join"}, headers=headers)
+    assert first.status_code == 201, first.get_data(as_text=True)
+    retry = client.post(url, json={"action": "join"}, headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.get_json() == first.get_json()
+    with app.app_context():
+        assert GroupRequest.query.count() == 1
+
+    # the key belongs to the first payload
+    assert client.post(url, json={"action": "leave"}, headers=headers).status_code == 422
+    # without a key the view runs again
+    assert client.post(url, json={"action": "join"}).status_code == 409
+    assert client.post(url, json={"action": "join"}, headers={"Idempotency-Key": ""}).status_code == 400
+
+
+@pytest.mark.parametrize("app_config", [{"IDEMPOTENCY_WAIT": 0.2}])
+def test_concurrent_retries_run_the_view_once(app):
+    from app.utils.idempotency import idempotent
+
+    started, release = Event(), Event()
+    runs = []
+
+    @idempotent
+    def slow():
+        runs.append(1)
+        started.set()
+        release.wait(5)
+        return jsonify(run=len(runs)), 201
+
+    app.add_url_rule("/test/slow", "slow", slow, methods=["POST"])
+    headers = {"Idempotency-Key": "slow-1"}
+    responses = []
+    first = Thread(target=lambda: responses.append(app.test_client().post("/test/slow", headers=headers)))
+    first.start()
+    assert started.wait(5)
+
+    # still running: the retry waits IDEMPOTENCY_WAIT for the response, then gives up
+    assert app.test_client().post("/test/slow", headers=headers).status_code == 409
+    release.set()
+    first.join(5)
+
+    retry = app.test_client().post("/test/slow", headers=headers)
+    assert (retry.status_code, retry.get_json()) == (201, {"run": 1})
+    assert responses[0].get_json() == {"run": 1}
+    assert len(runs) == 1
+
+
+def test_expired_keys_are_purged(app, make_user, login, make_group):
+    from app.models.idempotency_key import IdempotencyKey
+    from app.tasks.idempotency import purge_idempotency_keys
+
+    client = login(make_user())
+    response = client.post(f"/groups/send_request/{make_group()}", json={"action": "join"},
+                           headers={"Idempotency-Key": "join-1"})
+    assert response.status_code == 201
+    with app.app_context():
+        assert purge_idempotency_keys() == 0
+        db.session.execute(update(IdempotencyKey).values(expires_at=datetime.now() - timedelta(seconds=1)))
+        db.session.commit()
+        assert purge_idempotency_keys(batch_size=1) == 1
+        assert IdempotencyKey.query.count() == 0
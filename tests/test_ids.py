@@ -0,0 +1,36 @@
+#!/usr/bin/python3
+from time import time_ns
+from uuid import UUID
+from app.app import db
+from app.utils.ids import uuid7, uuid7_from, new_id
+
+
+def test_uuid7_is_time_ordered():
+    before = time_ns() // 1_000_000
+    ids = [uuid7() for _ in range(5000)]
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    assert all(id.version == 7 and id.variant == "specified in RFC 4122" for id in ids)
+    # the 48 first bits are the time in milliseconds
+    assert before <= ids[0].int >> 80 <= time_ns() // 1_000_000 + 1
+
+    assert uuid7_from(1, 2, 3) < uuid7_from(1, 3, 0) < uuid7_from(2, 0, 0)
+    assert UUID(new_id()).version == 7
+
+
+def test_ids_keep_their_string_form(app, make_user):
+    from app.models.user import User
+
+    user_id = make_user()
+    assert UUID(user_id).version == 7
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        assert user.id == user_id and isinstance(user.id, str)
+        # a malformed id matches no row
+        assert db.session.get(User, "not-an-id") is None
+        assert User.query.filter_by(id="not-an-id").first() is None
+
+
+def test_the_migration_needs_postgres(app):
+    result = app.test_cli_runner().invoke(args=["ids", "migrate-to-uuid", "--dry-run"])
+    assert result.exit_code == 1
+    assert "Only Postgres" in result.output
@@ -0,0 +1,49 @@
+#!/usr/bin/python3
+import json
+import subprocess
+import sys
+from os.path import abspath, dirname, join
+
+ROOT = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, join(ROOT, "benchmarks"))
+
+from loadtest import compare, run_scenario  # noqa: E402
+
+
+def report(tmp_path, name, endpoints):
+    path = tmp_path / f"{name}.json"
+    path.write_text(json.dumps({"commit": name, "endpoints": {
+        endpoint: {"requests_per_second": throughput, "latency_ms": {"p50": p95 / 2, "p95": p95, "p99": p95 * 2}}
+        for endpoint, (throughput, p95) in endpoints.items()
+    }}))
+    return path
+
+
+def test_compare_flags_the_regressions(tmp_path):
+    base = report(tmp_path, "base", {"profile": (100, 10), "groups": (100, 10), "login": (50, 20), "gone": (1, 1)})
+    head = report(tmp_path, "head", {"profile": (95, 10.5), "groups": (100, 12), "login": (40, 20)})
+    result = compare(base, head, 10)
+    assert result["regressions"] == ["groups", "login"]
+    assert result["endpoints"]["profile"] == {"p95_change_percent": 5.0, "throughput_change_percent": -5.0}
+    assert (result["base"], result["head"]) == ("base", "head")
+    assert compare(base, head, 25)["regressions"] == []
+
+
+def test_run_scenario_reports_the_errors_and_percentiles():
+    statuses = iter([200, 404] * 1000)
+    result = run_scenario(lambda index: {}, lambda state, rng: next(statuses), 1, 0.05, 0)
+    assert result["requests"] > 1
+    assert result["errors"] == {"404": result["requests"] // 2}
+    assert result["latency_ms"]["p50"] <= result["latency_ms"]["p95"] <= result["latency_ms"]["p99"]
+
+
+def test_load_test_run(tmp_path):
+    output = tmp_path / "run.json"
+    subprocess.run([sys.executable, "benchmarks/loadtest.py", "--database-uri", f"sqlite:///{tmp_path / 'load.db'}",
+                    "--duration", "0.2", "--clients", "2", "--students", "4", "--groups", "2",
+                    "--only", "profile.get_profile", "--output", str(output)],
+                   cwd=ROOT, check=True, capture_output=True)
+    run = json.loads(output.read_text())
+    assert list(run["endpoints"]) == ["profile.get_profile"]
+    assert run["endpoints"]["profile.get_profile"]["requests"] > 0
+    assert run["endpoints"]["profile.get_profile"]["errors"] == {}
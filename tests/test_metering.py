@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+from datetime import date, time, datetime, timedelta
+from sqlalchemy import update
+import pytest
+from app.app import db, local_timezone
+
+
+@pytest.fixture
+def booking(app, make_user):
+    """ A student with a private package of 2 sessions, and 3 private sessions of a teacher """
+    from app.models.package import Package
+    from app.models.session import Session
+    from app.models.user_package import UserPackage
+
+    teacher_id, student_id = make_user("teacher"), make_user("student")
+    with app.app_context():
+        package = Package(package="Private 2", session_type="private", price=100, duration=30, max_sessions=2)
+        db.session.add(package)
+        db.session.flush()
+        user_package = UserPackage(user_id=student_id, package_id=package.id, is_active=True)
+        user_package.set_expiry_date(30)
+        db.session.add(user_package)
+        sessions = [Session(date=date(2030, 1, day), start_time=time(10), end_time=time(11), length=60,
+                            type="private", user_id=teacher_id) for day in (5, 6, 7)]
+        db.session.add_all(sessions)
+        db.session.commit()
+        return {"student": student_id, "package": package.id, "sessions": [session.id for session in sessions]}
+
+
+def remaining(app, booking):
+    from app.models.user_package import UserPackage
+
+    with app.app_context():
+        return db.session.get(UserPackage, (booking["student"], booking["package"])).remaining_sessions
+
+
+def test_attending_consumes_a_session(app, login, booking):
+    client = login(booking["student"])
+    first, second, third = booking["sessions"]
+
+    response = client.post(f"/sessions/attend/{first}")
+    assert response.status_code == 201
+    assert response.get_json()["package"] == {"id": booking["package"], "remaining_sessions": 1}
+
+    # attending again is refused and costs nothing
+    assert client.post(f"/sessions/attend/{first}").status_code == 409
+    assert remaining(app, booking) == 1
+
+    assert client.post(f"/sessions/attend/{second}").status_code == 201
+    assert client.post(f"/sessions/attend/{third}").status_code == 403
+    assert remaining(app, booking) == 0
+
+
+def test_a_new_package_is_filled(app, booking):
+    assert remaining(app, booking) == 2
+
+
+def test_backfill_counts_the_metered_attendance_only(app, booking):
+    from app.models.user_package import UserPackage
+    from app.models.user_session import UserSession
+    from app.utils.metering import backfill_remaining_sessions
+
+    first, second, _ = booking["sessions"]
+    with app.app_context():
+        # a row from before the counter, one session attended with it and one recorded in bulk (free)
+        db.session.execute(update(UserPackage).values(
+            remaining_sessions=None, timestamp=datetime.now(local_timezone) - timedelta(days=1)))
+        db.session.add(UserSession(user_id=booking["student"], session_id=first))
+        db.session.add(UserSession(user_id=booking["student"], session_id=second, metered=False))
+        db.session.commit()
+
+        assert backfill_remaining_sessions() == 1
+    assert remaining(app, booking) == 1
+
+    # an exhausted package is not refilled by a second run
+    with app.app_context():
+        db.session.execute(update(UserPackage).values(remaining_sessions=0))
+        db.session.commit()
+        assert backfill_remaining_sessions() == 0
+    assert remaining(app, booking) == 0
@@ -0,0 +1,40 @@
+#!/usr/bin/python3
+from datetime import datetime, timedelta
+from app.app import db, local_timezone
+
+
+def test_expired_packages_are_deactivated_in_batches(app, make_user, make_package):
+    from app.models.user_package import UserPackage
+    from app.tasks.package_expiry import expire_packages
+
+    package_id = make_package()
+    now = datetime.now(local_timezone)
+    # 5 expired, 2 running and 1 already inactive
+    expiry_dates = [now - timedelta(days=days) for days in range(1, 6)] + [now + timedelta(days=1)] * 2
+    user_ids = [make_user() for _ in range(len(expiry_dates) + 1)]
+    with app.app_context():
+        for user_id, expiry_date in zip(user_ids, expiry_dates):
+            db.session.add(UserPackage(user_id=user_id, package_id=package_id, is_active=True,
+                                       expiry_date=expiry_date))
+        db.session.add(UserPackage(user_id=user_ids[-1], package_id=package_id, is_active=False,
+                                   expiry_date=now - timedelta(days=1)))
+        db.session.commit()
+
+        assert expire_packages(batch_size=2) == 5
+        active = {package.user_id for package in UserPackage.query.filter_by(is_active=True)}
+        assert active == set(user_ids[5:7])
+        assert expire_packages() == 0
+
+
+def test_expire_command(app, make_user, make_package):
+    from app.models.user_package import UserPackage
+
+    package_id = make_package()
+    with app.app_context():
+        db.session.add(UserPackage(user_id=make_user(), package_id=package_id, is_active=True,
+                                   expiry_date=datetime.now(local_timezone) - timedelta(hours=1)))
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["packages", "expire", "--batch-size", "10"])
+    assert result.exit_code == 0
+    assert result.output == "1 package(s) expired.\n"
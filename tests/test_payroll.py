@@ -0,0 +1,96 @@
+#!/usr/bin/python3
+from datetime import date, time
+import pytest
+from sqlalchemy import delete, select
+from app.app import db
+
+
+@pytest.fixture
+def teaching(app, make_user):
+    """ Two teachers (100 and 50 an hour) and their sessions of January and February 2030 """
+    from app.models.session import Session
+
+    teachers = [make_user("teacher", salary=100), make_user("teacher", salary=50)]
+    with app.app_context():
+        sessions = [
+            Session(date=date(2030, 1, 5), start_time=time(10), end_time=time(11), user_id=teachers[0]),
+            Session(date=date(2030, 1, 20), start_time=time(10), end_time=time(11, 30), user_id=teachers[0]),
+            Session(date=date(2030, 2, 1), start_time=time(10), end_time=time(10, 30), user_id=teachers[0]),
+            Session(date=date(2030, 1, 5), start_time=time(10), end_time=time(11), user_id=teachers[1]),
+        ]
+        for session in sessions:
+            session.type = "private"
+            session.set_length()
+        db.session.add_all(sessions)
+        db.session.commit()
+        return {"teachers": teachers, "sessions": [session.id for session in sessions]}
+
+
+def rollups(model):
+    """ The rows of a rollup with sessions (the maintained rollups keep the emptied rows at 0) """
+    return sorted(tuple(row) for row in db.session.execute(
+        select(model.user_id, *(column for column in model.__table__.c if column.name in ("day", "month")),
+               model.minutes, model.sessions).where(model.sessions != 0)))
+
+
+def test_payroll_of_a_month(app, make_user, login, teaching):
+    client = login(make_user("admin"))
+    first, second = teaching["teachers"]
+
+    january = client.get("/reports/payroll?month=2030-01").get_json()
+    by_teacher = {teacher["teacher_id"]: teacher for teacher in january["teachers"]}
+    assert (by_teacher[first]["sessions"], by_teacher[first]["hours"], by_teacher[first]["amount"]) == (2, 2.5, 250)
+    assert (by_teacher[second]["sessions"], by_teacher[second]["hours"], by_teacher[second]["amount"]) == (1, 1, 50)
+    assert (january["total_hours"], january["total_amount"]) == (3.5, 300)
+    assert client.get("/reports/payroll?month=2030-02").get_json()["total_amount"] == 50
+
+    assert client.get("/reports/payroll?month=January").status_code == 400
+    assert login(first).get("/reports/payroll").status_code == 403
+
+
+def test_the_rollups_follow_the_sessions(app, teaching):
+    from app.models.session import Session
+    from app.models.teacher_minutes import TeacherDailyMinutes, TeacherMonthlyMinutes
+    from app.utils.payroll import rebuild_rollups, payroll
+
+    with app.app_context():
+        moved = db.session.get(Session, teaching["sessions"][1])
+        moved.date = date(2030, 2, 2)
+        db.session.delete(db.session.get(Session, teaching["sessions"][0]))
+        db.session.commit()
+        assert [teacher["minutes"] for teacher in payroll(date(2030, 2, 1))] == [120]
+
+        maintained = rollups(TeacherDailyMinutes), rollups(TeacherMonthlyMinutes)
+        assert rebuild_rollups() == 3
+        assert (rollups(TeacherDailyMinutes), rollups(TeacherMonthlyMinutes)) == maintained
+
+
+def test_deleted_teachers_stay_in_the_payroll(app, teaching):
+    from app.models.session import Session
+    from app.models.user import User
+    from app.utils.payroll import rebuild_rollups, payroll
+
+    first = teaching["teachers"][0]
+    with app.app_context():
+        # as the account purger does, with bulk statements
+        db.session.execute(delete(Session.__table__).where(Session.user_id == first))
+        db.session.execute(delete(User.__table__).where(User.id == first))
+        db.session.commit()
+        rebuild_rollups()
+
+        deleted = [teacher for teacher in payroll(date(2030, 1, 1)) if teacher["teacher_id"] == first]
+        assert deleted == [{"teacher_id": first, "username": None, "name": None, "hourly_rate": None,
+                            "sessions": 2, "minutes": 150, "hours": 2.5, "amount": 0}]
+
+
+def test_the_fallback_without_upsert(app, make_user, monkeypatch):
+    from app.models.teacher_minutes import TeacherMonthlyMinutes
+    from app.utils import payroll
+
+    monkeypatch.setattr(payroll, "supports_upsert", lambda connection: False)
+    teacher_id = make_user("teacher")
+    with app.app_context():
+        for day in (date(2030, 1, 5), date(2030, 1, 6)):
+            payroll.add_minutes(db.session.connection(), teacher_id, day, 45, 1)
+        db.session.commit()
+        assert rollups(TeacherMonthlyMinutes) == [(teacher_id, date(2030, 1, 1), 90.0, 2)]
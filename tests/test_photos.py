@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+from io import BytesIO
+import os
+import pytest
+from PIL import Image
+from app.utils.photos import PhotoTooLarge, store_photo, schedule_thumbnail, thumbnail_path
+
+
+class Trickle(BytesIO):
+    """ A request stream returning a few bytes per read """
+
+    def read(self, size=-1):
+        return super().read(min(size, 3))
+
+
+def image(format, size=(64, 48)):
+    buffer = BytesIO()
+    Image.new("RGB", size, "red").save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def test_the_signature_is_checked_across_short_reads(tmp_path):
+    png = image("PNG")
+    path = store_photo(Trickle(png), "image/png", tmp_path, 1 << 20)
+    assert (tmp_path / path).read_bytes() == png
+    # content-addressed, the same photo is stored once
+    assert store_photo(BytesIO(png), "image/png", tmp_path, 1 << 20) == path
+
+    with pytest.raises(ValueError):
+        store_photo(Trickle(b"\x89PNG\r\n\x1a" + b"x" * 100), "image/png", tmp_path, 1 << 20)
+    assert not [name for name in os.listdir(tmp_path) if name.startswith(".upload-")]
+
+
+def test_webp_needs_the_webp_form_type(tmp_path):
+    assert store_photo(Trickle(image("WEBP")), "image/webp", tmp_path, 1 << 20).endswith(".webp")
+    wave = b"RIFF\x24\x00\x00\x00WAVEfmt " + b"\x00" * 32
+    with pytest.raises(ValueError, match="not a valid image/webp"):
+        store_photo(Trickle(wave), "image/webp", tmp_path, 1 << 20)
+    # shorter than the signature
+    with pytest.raises(ValueError, match="not a valid image/webp"):
+        store_photo(BytesIO(b"RIFF\x00\x00"), "image/webp", tmp_path, 1 << 20)
+
+
+def test_empty_and_large_photos_are_refused(tmp_path):
+    with pytest.raises(ValueError, match="empty"):
+        store_photo(BytesIO(), "image/jpeg", tmp_path, 1 << 20)
+    jpeg = image("JPEG", (512, 512))
+    with pytest.raises(PhotoTooLarge):
+        store_photo(BytesIO(jpeg), "image/jpeg", tmp_path, len(jpeg) - 1)
+    assert os.listdir(tmp_path) == []
+
+
+def test_uploading_a_photo(app, make_user, login):
+    client = login(make_user())
+    assert client.patch("/profile/photo", data=b"GIF89a", content_type="image/gif").status_code == 400
+    assert client.patch("/profile/photo", data=b"not a jpeg", content_type="image/jpeg").status_code == 400
+
+    response = client.patch("/profile/photo", data=image("JPEG"), content_type="image/jpeg")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert client.get(body["photo"]).status_code == 200
+    assert client.get("/profile/?fields=photo").get_json() == {"photo": body["photo"]}
+
+
+def test_thumbnails(tmp_path):
+    path = store_photo(BytesIO(image("PNG", (640, 480))), "image/png", tmp_path, 1 << 20)
+    schedule_thumbnail(tmp_path, path, 64, 2).result(5)
+    with Image.open(tmp_path / thumbnail_path(path)) as thumbnail:
+        assert thumbnail.size == (64, 48)
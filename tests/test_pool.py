@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+import re
+from app.app import create_app, db
+from app.utils.db_pool import InstrumentedQueuePool, engine_options
+from app.utils.metrics import Histogram
+
+POSTGRES = {"SQLALCHEMY_DATABASE_URI": "postgresql+psycopg2://user:password@db/noor", "DB_POOL_SIZE": 8,
+            "DB_MAX_OVERFLOW": 4, "DB_POOL_TIMEOUT": 10, "DB_POOL_RECYCLE": 600, "DB_POOL_PRE_PING": True,
+            "DB_STATEMENT_TIMEOUT": 5000, "DB_PGBOUNCER": False}
+
+
+def sample(text, name):
+    match = re.search(rf"^{re.escape(name)} (\S+)$", text, re.MULTILINE)
+    return float(match.group(1)) if match else None
+
+
+def test_engine_options():
+    assert engine_options({"SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"}) == {}
+    assert engine_options(POSTGRES) == {
+        "poolclass": InstrumentedQueuePool, "pool_size": 8, "max_overflow": 4, "pool_timeout": 10,
+        "pool_recycle": 600, "pool_pre_ping": True,
+        "connect_args": {"options": "-c statement_timeout=5000"},
+    }
+    # set per transaction behind PgBouncer
+    assert "connect_args" not in engine_options({**POSTGRES, "DB_PGBOUNCER": True})
+    assert "connect_args" not in engine_options({**POSTGRES, "DB_STATEMENT_TIMEOUT": 0})
+
+
+def test_pool_metrics(tmp_path):
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}", "METRICS_TOKEN": "secret",
+        "SQLALCHEMY_ENGINE_OPTIONS": {"poolclass": InstrumentedQueuePool, "pool_size": 3, "max_overflow": 1},
+    })
+    client = app.test_client()
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    before = client.get("/metrics", headers={"Authorization": "Bearer secret"}).get_data(as_text=True)
+    with app.app_context():
+        db.session.execute(db.text("SELECT 1"))
+        db.session.remove()
+    metrics = client.get("/metrics", headers={"Authorization": "Bearer secret"}).get_data(as_text=True)
+
+    assert sample(metrics, 'db_pool_size{engine="default"}') == 3
+    assert sample(metrics, 'db_pool_checked_out{engine="default"}') == 0
+    assert sample(metrics, "db_pool_checkout_wait_seconds_count") == \
+        (sample(before, "db_pool_checkout_wait_seconds_count") or 0) + 1
+
+
+def test_histogram():
+    histogram = Histogram("wait_seconds", "Wait", labels=("engine",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, engine="default")
+    assert histogram.render().splitlines() == [
+        "# HELP wait_seconds Wait",
+        "# TYPE wait_seconds histogram",
+        'wait_seconds_bucket{engine="default",le="0.1"} 1',
+        'wait_seconds_bucket{engine="default",le="1"} 2',
+        'wait_seconds_bucket{engine="default",le="+Inf"} 3',
+        'wait_seconds_count{engine="default"} 3',
+        'wait_seconds_sum{engine="default"} 5.55',
+    ]
@@ -0,0 +1,53 @@
+#!/usr/bin/python3
+import logging
+import re
+from app.app import db
+
+
+def queries(response):
+    match = re.fullmatch(r'db;dur=\d+\.\d\d;desc="(\d+) queries"', response.headers["Server-Timing"])
+    return int(match.group(1))
+
+
+def test_statements_are_counted_per_request(app, make_user, login):
+    client = login(make_user())
+    # the user is loaded from the session, then the profile is served from it
+    assert queries(client.get("/profile/?fields=id")) == 1
+    assert queries(client.get("/profile/")) > 1
+    assert queries(client.get("/metrics")) == 0
+
+    metrics = client.get("/metrics").get_data(as_text=True)
+    assert re.search(r'^http_request_db_queries_count\{endpoint="profile.get_profile"\} [1-9]', metrics, re.MULTILINE)
+    assert 'http_request_db_seconds_sum{endpoint="profile.get_profile"}' in metrics
+
+
+def test_repeated_statements_are_logged_in_debug_mode(app, caplog):
+    def repeat():
+        for number in range(5):
+            db.session.execute(db.text("SELECT :number"), {"number": number})
+        return "", 204
+
+    app.add_url_rule("/repeat", view_func=repeat)
+    app.debug = True
+    with caplog.at_level(logging.WARNING, logger=app.logger.name):
+        response = app.test_client().get("/repeat")
+    assert queries(response) == 5
+    assert "Possible N+1 in repeat: statement executed 5 times: SELECT ?" in caplog.text
+
+    app.config["QUERY_REPEAT_THRESHOLD"] = 6
+    caplog.clear()
+    app.test_client().get("/repeat")
+    assert "Possible N+1" not in caplog.text
+
+
+def test_a_failed_statement_leaves_the_next_ones_timed(app):
+    def fail():
+        try:
+            db.session.execute(db.text("SELECT * FROM missing_table"))
+        except Exception:
+            db.session.rollback()
+        db.session.execute(db.text("SELECT 1"))
+        return "", 204
+
+    app.add_url_rule("/fail", view_func=fail)
+    assert queries(app.test_client().get("/fail")) == 1
@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+from shutil import copyfile
+import pytest
+from sqlalchemy import select
+from app.app import db
+from app.utils.replicas import replica_binds
+
+
+@pytest.fixture
+def app_config(tmp_path):
+    return {"SQLALCHEMY_BINDS": {"replica_0": f"sqlite:///{tmp_path / 'replica.db'}"}, "REPLICA_PIN_SECONDS": 0}
+
+
+@pytest.fixture
+def replicate(app, tmp_path):
+    """ Make the replica a copy of the primary as it is now """
+    def replicate():
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+        copyfile(tmp_path / "test.db", tmp_path / "replica.db")
+    return replicate
+
+
+def rename(app, user_id, first_name):
+    from app.models.user import User
+
+    # outside of a request: on the primary
+    with app.app_context():
+        db.session.get(User, user_id).first_name = first_name
+        db.session.commit()
+
+
+def test_reads_go_to_the_replica(app, make_user, login, replicate):
+    user_id = make_user(first_name="Before")
+    client = login(user_id)
+    replicate()
+    rename(app, user_id, "After")
+
+    # replication lag: the replica still has the old name
+    assert client.get("/profile/?fields=first_name").get_json() == {"first_name": "Before"}
+    # the writes go to the primary, not pinned to it the user reads the replica again
+    assert client.patch("/profile/update_profile", json={"last_name": "Changed"}).status_code == 200
+    assert client.get("/profile/?fields=last_name").get_json() == {"last_name": "User"}
+    with app.app_context():
+        from app.models.user import User
+        assert db.session.get(User, user_id).last_name == "Changed"
+
+
+def test_writers_read_from_the_primary_for_a_while(app, make_user, login, replicate):
+    user_id = make_user(first_name="Before")
+    client = login(user_id)
+    replicate()
+    app.config["REPLICA_PIN_SECONDS"] = 60
+
+    assert client.patch("/profile/update_profile", json={"first_name": "After"}).status_code == 200
+    assert client.get("/profile/?fields=first_name").get_json() == {"first_name": "After"}
+
+
+def test_locking_reads_go_to_the_primary(app):
+    from app.models.user import User
+
+    with app.test_request_context("/", method="GET"):
+        replica = db.engines["replica_0"]
+        assert db.session.get_bind(clause=select(User.id)) is replica
+        assert db.session.get_bind(clause=select(User.id).with_for_update()) is not replica
+
+
+def test_replica_binds():
+    assert replica_binds(None) == {}
+    assert replica_binds("postgresql://a/db, postgresql://b/db,") == \
+        {"replica_0": "postgresql://a/db", "replica_1": "postgresql://b/db"}
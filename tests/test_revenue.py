@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+from datetime import datetime, timedelta
+import pytest
+from app.app import db, local_timezone
+
+
+@pytest.fixture
+def subscribe(app, make_user):
+    """ Subscribe a new user of `country` to a package, `age` ago """
+    from app.models.user_package import UserPackage
+
+    def subscribe(package_id, country="Egypt", age=timedelta(days=1)):
+        user_id = make_user(country=country)
+        with app.app_context():
+            db.session.add(UserPackage(user_id=user_id, package_id=package_id,
+                                       timestamp=datetime.now(local_timezone) - age))
+            db.session.commit()
+
+    return subscribe
+
+
+def revenue(client, **params):
+    response = client.get("/reports/revenue", query_string=params)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def test_incremental_refresh(app, make_user, make_package, subscribe, login):
+    from app.models.package_revenue import ReportWatermark
+    from app.utils.revenue import refresh_revenue, REPORT
+
+    client = login(make_user("admin"))
+    basic, premium = make_package(price=100), make_package(price=300)
+    subscribe(basic)
+    subscribe(basic)
+    subscribe(premium, country="Jordan")
+    with app.app_context():
+        assert refresh_revenue() == 2
+    assert revenue(client, group_by="package,country")["revenue"] == [
+        {"package": basic, "country": "Egypt", "subscriptions": 2, "revenue": 200},
+        {"package": premium, "country": "Jordan", "subscriptions": 1, "revenue": 300},
+    ]
+
+    # as if the refresh ran 10 minutes ago: only the rows since are added,
+    # those of the last seconds wait for the next refresh
+    with app.app_context():
+        watermark = db.session.get(ReportWatermark, REPORT)
+        watermark.refreshed_until -= timedelta(minutes=10)
+        db.session.commit()
+    subscribe(premium, country="Jordan", age=timedelta(minutes=5))
+    subscribe(premium, age=timedelta(seconds=0))
+    with app.app_context():
+        assert refresh_revenue() == 1
+        assert refresh_revenue() == 0
+    report = revenue(client, group_by="package")
+    assert report["revenue"] == [{"package": basic, "subscriptions": 2, "revenue": 200},
+                                 {"package": premium, "subscriptions": 2, "revenue": 600}]
+    assert (report["total_subscriptions"], report["total_revenue"]) == (4, 800)
+
+
+def test_revenue_report(app, make_user, make_package, subscribe, login):
+    from app.utils.revenue import refresh_revenue
+
+    client = login(make_user("admin"))
+    package_id = make_package(price=250)
+    subscribe(package_id, age=timedelta(days=1))
+    with app.app_context():
+        refresh_revenue()
+    month = (datetime.now(local_timezone) - timedelta(days=1)).strftime("%Y-%m")
+
+    assert revenue(client)["revenue"] == [
+        {"month": month, "package": package_id, "country": "Egypt", "subscriptions": 1, "revenue": 250}]
+    assert revenue(client, start="2000-01", end="2000-12")["revenue"] == []
+
+    csv = client.get("/reports/revenue", query_string={"format": "csv", "group_by": "month"})
+    assert csv.mimetype == "text/csv"
+    assert csv.get_data(as_text=True).splitlines() == ["month,subscriptions,revenue", f"{month},1,250.0"]
+
+    assert client.get("/reports/revenue?group_by=city").status_code == 400
+    assert client.get("/reports/revenue?start=2030").status_code == 400
+    assert login(make_user()).get("/reports/revenue").status_code == 403
@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+from datetime import date
+from app.app import db
+
+
+TERM = {"source_start": "2030-01-01", "source_end": "2030-01-31", "target_start": "2030-04-01"}
+
+
+def test_a_dry_run_writes_nothing(app, make_user, login, make_group):
+    from app.models.group import Group
+
+    client = login(make_user("admin"))
+    make_group(group="Fall A")
+    response = client.post("/groups/rollover", json={**TERM, "name_pattern": "{name} - Spring", "dry_run": True})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    body = response.get_json()
+    assert (body["groups"], body["group_days"], body["shift_days"]) == (1, 2, 90)
+    assert body["preview"][0]["group"] == "Fall A - Spring"
+    with app.app_context():
+        assert Group.query.count() == 1
+
+
+def test_groups_and_their_days_are_cloned(app, make_user, login, make_group):
+    from app.models.group import Group
+    from app.models.group_day import GroupDay
+
+    teacher_id = make_user("teacher")
+    client = login(make_user("admin"))
+    source = make_group(group="Fall A", teacher_id=teacher_id)
+    make_group(group="Fall B", days=("Sunday",))
+    make_group(group="Later Fall", start_date=date(2030, 2, 5))
+
+    response = client.post("/groups/rollover", json={**TERM, "rename": {"from": "Fall", "to": "Spring"},
+                                                     "copy_teachers": True})
+    assert response.status_code == 201, response.get_data(as_text=True)
+    assert (response.get_json()["groups"], response.get_json()["group_days"]) == (2, 3)
+
+    with app.app_context():
+        clone = Group.query.filter_by(group="Spring A").one()
+        assert (clone.start_date, clone.end_date) == (date(2030, 4, 5), date(2030, 6, 28))
+        assert clone.teacher_id == teacher_id and clone.status == "coming"
+        assert sorted(day.day_id for day in GroupDay.query.filter_by(group_id=clone.id)) == \
+            sorted(day.day_id for day in GroupDay.query.filter_by(group_id=source))
+        assert Group.query.filter_by(group="Spring B").one().teacher_id is None
+
+    # the names are taken now: nothing is cloned
+    response = client.post("/groups/rollover", json={**TERM, "rename": {"from": "Fall", "to": "Spring"}})
+    assert response.status_code == 409
+    assert {conflict["reason"] for conflict in response.get_json()["conflicts"]} == {"name_taken"}
+    with app.app_context():
+        assert Group.query.count() == 5
+
+
+def test_invalid_rollovers(app, make_user, login):
+    client = login(make_user("admin"))
+    assert client.post("/groups/rollover", json={**TERM, "name_pattern": "Spring"}).status_code == 400
+    assert client.post("/groups/rollover", json={**TERM, "target_start": "2030-01-01",
+                                                 "name_pattern": "{name} 2"}).status_code == 400
+    assert client.post("/groups/rollover", json={**TERM, "dry_run": "false",
+                                                 "name_pattern": "{name} 2"}).status_code == 400
+    assert login(make_user()).post("/groups/rollover", json=TERM).status_code == 403
@@ -0,0 +1,43 @@
+#!/usr/bin/python3
+from sqlalchemy import DateTime, select
+from app.app import create_app, db
+from app.utils.seeding import generate, Plan
+
+TABLES = ("users", "groups", "group_days", "user_groups", "group_requests")
+
+
+def snapshot():
+    """ The generated rows, without the password hashes (salted) and the times (relative to now) """
+    rows = {}
+    for name in TABLES:
+        table = db.metadata.tables[name]
+        columns = [column for column in table.c if column.name != "password" and not isinstance(column.type, DateTime)]
+        rows[name] = sorted(tuple(map(str, row)) for row in db.session.execute(select(*columns)))
+    return rows
+
+
+def generated(tmp_path, name, chunk_size, seed=7):
+    app = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / name}", "BCRYPT_LOG_ROUNDS": 4})
+    with app.app_context():
+        db.create_all(bind_key=None)
+        loaded = generate(seed, 250, 12, 40, chunk_size=chunk_size)
+        rows = snapshot()
+        db.engine.dispose()
+    return loaded, rows
+
+
+def test_the_same_seed_gives_the_same_dataset(tmp_path):
+    loaded, rows = generated(tmp_path, "a.db", 100)
+    assert generated(tmp_path, "b.db", 1000) == (loaded, rows)
+    assert generated(tmp_path, "c.db", 100, seed=8)[1] != rows
+
+    assert len(rows["users"]) == loaded["users"] == 250
+    assert len(rows["groups"]) == 12
+    assert loaded["groups"] == sum(len(rows[name]) for name in TABLES[1:])
+
+
+def test_roles_of_the_plan():
+    plan = Plan(1, 2000, 0, 0, "seed")
+    assert [plan.role(index) for index in (0, 1, 2, 101, 102)] == ["admin", "admin", "teacher", "teacher", "student"]
+    assert plan.user_id(5) == Plan(1, 10, 0, 0, "other").user_id(5)
+    assert plan.user_id(5) != Plan(2, 2000, 0, 0, "seed").user_id(5)
@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+from datetime import date, datetime, time
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+import pytest
+from app.utils.serialization import OrjsonProvider, format_datetime, format_time
+
+PAYLOAD = {
+    "name": "Nour نور 🌙",
+    "count": 3,
+    "price": 12.5,
+    "active": True,
+    "photo": None,
+    "created_at": datetime(2030, 1, 5, 13, 4, 5),
+    "birth_date": date(2000, 2, 29),
+    "groups": [{"id": 2, "days": ["Saturday", "Monday"]}, {"id": 1, "days": []}],
+}
+
+
+@pytest.fixture
+def providers():
+    app = Flask(__name__)
+    return app, DefaultJSONProvider(app), OrjsonProvider(app)
+
+
+@pytest.mark.parametrize("value", [datetime(2030, 1, 5, 0, 0, 9), datetime(2030, 12, 31, 12, 30),
+                                   datetime(2031, 6, 1, 23, 59, 59)])
+def test_dates_are_formatted_like_strftime(value):
+    assert format_datetime(value) == value.strftime("%a, %d %b %Y %I:%M:%S %p")
+    assert format_datetime(value.date()) == value.date().strftime("%a, %d %b %Y %I:%M:%S %p")
+    assert format_time(value.time()) == value.time().strftime("%I:%M:%S %p")
+    assert format_time(time(0)) == "12:00:00 AM"
+
+
+def test_orjson_responses_match_the_default_provider(providers):
+    app, default, orjson = providers
+    with app.app_context():
+        assert orjson.response(PAYLOAD).get_data() == default.response(PAYLOAD).get_data()
+        orjson.ensure_ascii = default.ensure_ascii = False
+        assert orjson.response(PAYLOAD).get_data() == default.response(PAYLOAD).get_data()
+
+
+def test_orjson_dumps_and_loads(providers):
+    _, default, orjson = providers
+    assert orjson.dumps(PAYLOAD, separators=(",", ":")) == default.dumps(PAYLOAD, separators=(",", ":"))
+    assert orjson.dumps(PAYLOAD, indent=2) == default.dumps(PAYLOAD, indent=2)
+    # the layouts orjson cannot write go to the stdlib encoder
+    assert orjson.dumps(PAYLOAD) == default.dumps(PAYLOAD)
+    assert orjson.dumps(PAYLOAD, indent=4) == default.dumps(PAYLOAD, indent=4)
+    assert orjson.loads(default.dumps({"a": [1, "b"]})) == {"a": [1, "b"]}
+
+
+def test_orjson_writes_floats_its_own_way(providers):
+    _, default, orjson = providers
+    compact = {"separators": (",", ":")}
+    assert default.dumps([1e16], **compact) == "[1e+16]"
+    assert orjson.dumps([1e16], **compact) == "[1e16]"
+    assert orjson.dumps([float("nan"), float("inf")], **compact) == "[null,null]"
@@ -0,0 +1,16 @@
+#!/usr/bin/python3
+import pytest
+from app.app import create_app
+
+
+@pytest.mark.parametrize("mode", ["default", "serve"])
+def test_serve_mode_skips_the_development_tools(tmp_path, mode):
+    app = create_app({"APP_MODE": mode, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}"})
+    serving = mode == "serve"
+
+    prefixes = {rule.rule.split("/")[1] for rule in app.url_map.iter_rules()}
+    assert {"auth", "profile", "groups", "sessions", "reports", "metrics"} <= prefixes
+    assert ("apidocs" in prefixes) is not serving
+    assert ("migrate" in app.extensions) is not serving
+    assert ("accounts" in app.cli.commands) is not serving
+    assert ("seed" in app.cli.commands) is not serving
@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+from datetime import date, time
+from app.app import db
+
+
+def session(start, end, day="2030-01-05", type="private", **fields):
+    return {"date": day, "start_time": start, "end_time": end, "type": type, **fields}
+
+
+def test_overlapping_sessions_are_refused(app, make_user, login):
+    teacher = login(make_user("teacher"))
+    created = teacher.post("/sessions/create_session", json=session("10:00:00 AM", "11:00:00 AM"))
+    assert created.status_code == 201
+    session_id = created.get_json()["session"]["id"]
+
+    overlapping = teacher.post("/sessions/create_session", json=session("10:30:00 AM", "11:30:00 AM"))
+    assert overlapping.status_code == 409
+    assert str(session_id) in overlapping.get_data(as_text=True)
+    assert teacher.post("/sessions/create_session", json=session("09:00:00 AM", "12:00:00 PM")).status_code == 409
+    # back to back, another day or another teacher
+    assert teacher.post("/sessions/create_session", json=session("11:00:00 AM", "12:00:00 PM")).status_code == 201
+    assert teacher.post("/sessions/create_session",
+                        json=session("10:00:00 AM", "11:00:00 AM", day="2030-01-06")).status_code == 201
+    other = login(make_user("teacher"))
+    assert other.post("/sessions/create_session", json=session("10:00:00 AM", "11:00:00 AM")).status_code == 201
+
+    listed = teacher.get("/sessions/?start_date=2030-01-05&end_date=2030-01-06").get_json()
+    assert [(item["date"], item["start_time"]) for item in listed["sessions"]] == [
+        ("Sat, 05 Jan 2030 12:00:00 AM", "10:00:00 AM"), ("Sat, 05 Jan 2030 12:00:00 AM", "11:00:00 AM"),
+        ("Sun, 06 Jan 2030 12:00:00 AM", "10:00:00 AM")]
+    assert listed["total_sessions"] == 3
+
+
+def test_the_database_check_catches_what_the_index_missed(app, make_user, login):
+    from app.models.session import Session
+
+    teacher_id = make_user("teacher")
+    teacher = login(teacher_id)
+    # the teacher-day is loaded in the index
+    assert teacher.post("/sessions/create_session", json=session("08:00:00 AM", "09:00:00 AM")).status_code == 201
+    with app.app_context():
+        # booked by another worker, the index does not know it
+        db.session.add(Session(date=date(2030, 1, 5), start_time=time(10), end_time=time(11), length=60,
+                               type="private", user_id=teacher_id))
+        db.session.commit()
+    assert teacher.post("/sessions/create_session", json=session("10:30:00 AM", "11:30:00 AM")).status_code == 409
+    # reloaded from the database
+    assert teacher.post("/sessions/create_session", json=session("10:15:00 AM", "10:45:00 AM")).status_code == 409
+
+
+def test_session_validation(app, make_user, login):
+    assert login(make_user()).post("/sessions/create_session", json=session("10:00:00 AM", "11:00:00 AM")) \
+        .status_code == 403
+    teacher = login(make_user("teacher"))
+    assert teacher.post("/sessions/create_session", json=session("11:00:00 AM", "10:00:00 AM")).status_code == 400
+    assert teacher.post("/sessions/create_session", json=session("10:00", "11:00")).status_code == 400
+    assert teacher.post("/sessions/create_session",
+                        json=session("10:00:00 AM", "11:00:00 AM", group_id=1)).status_code == 400
@@ -0,0 +1,8 @@
+#!/usr/bin/python3
+""" WSGI entry point of the production server (e.g. gunicorn wsgi:app) """
+import os
+
+# no migrations, Swagger UI nor CLI commands in the workers
+os.environ.setdefault("APP_MODE", "serve")
+
+from run import app  # noqa: E402